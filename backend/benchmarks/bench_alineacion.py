@@ -0,0 +1,85 @@
+# backend/benchmarks/bench_alineacion.py
+"""
+Mide la alineación por correlación de fase: el desplazamiento estimado para
+molde_ok.png y molde_rebaba.png trasladados, el veredicto con y sin
+alineación y el coste añadido por imagen.
+
+Uso:
+    python benchmarks/bench_alineacion.py [--desplazamientos 0,0 3,-2 12,9] [--repeticiones 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+import cv2
+import numpy as np
+
+from modules import analisis
+
+
+def _leer(nombre):
+    return cv2.imread(os.path.join(BACKEND_DIR, nombre), cv2.IMREAD_GRAYSCALE)
+
+
+def _trasladar(img, dx, dy):
+    matriz = np.float32([[1, 0, dx], [0, 1, dy]])
+    return cv2.warpAffine(img, matriz, (img.shape[1], img.shape[0]))
+
+
+def _analizar(img, alineacion):
+    analisis.ALINEACION = alineacion
+    return analisis.analizar_imagen(img)
+
+
+def _medir(img, alineacion, repeticiones):
+    analisis.ALINEACION = alineacion
+    tiempos = []
+
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        analisis.analizar_imagen(img)
+        tiempos.append(time.perf_counter() - inicio)
+
+    return float(np.median(tiempos)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--desplazamientos", nargs="+", default=["0,0", "3,-2", "7,5", "-12,9", "25,-30"])
+    parser.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args()
+
+    analisis.cargar_contorno_ideal()
+    moldes = {"molde_ok": _leer("molde_ok.png"), "molde_rebaba": _leer("molde_rebaba.png")}
+
+    print(f"\n{'imagen':<14}{'real':>10}{'estimado':>18}{'sin alinear':>14}{'alineado':>12}")
+
+    for nombre, img in moldes.items():
+        for texto in args.desplazamientos:
+            dx, dy = (int(v) for v in texto.split(","))
+            trasladada = _trasladar(img, dx, dy)
+
+            sin_alinear = _analizar(trasladada, False)
+            alineado = _analizar(trasladada, True)
+            estimado = "({x},{y})".format(**alineado["desplazamiento"])
+
+            print(
+                f"{nombre:<14}{f'({dx},{dy})':>10}{estimado:>18}"
+                f"{sin_alinear['status']:>14}{alineado['status']:>12}"
+            )
+
+    img = moldes["molde_rebaba"]
+    t_sin = _medir(img, False, args.repeticiones)
+    t_con = _medir(img, True, args.repeticiones)
+
+    print(f"\nAnálisis {img.shape[1]}x{img.shape[0]} (mediana): sin alinear {t_sin:.3f} ms, "
+          f"alineado {t_con:.3f} ms (+{t_con - t_sin:.3f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# backend/benchmarks/bench_analisis.py
+"""
+Suite de rendimiento de analizar_molde y de la carga de plantillas con
+imágenes sintéticas (resolución × número de rebabas × complejidad del
+contorno, ver sinteticas.py).
+
+Para cada caso mide la latencia p50/p99 y el rendimiento (imágenes/s). El
+resultado se puede guardar como línea base JSON y, más adelante, comparar
+contra ella: un caso es una regresión si su p50 empeora más que la
+tolerancia (código de salida 1).
+
+Uso:
+    python benchmarks/bench_analisis.py --guardar      # escribe benchmarks/linea_base.json
+    python benchmarks/bench_analisis.py --comparar     # compara contra esa línea base
+    python benchmarks/bench_analisis.py --resoluciones 600 1200 --rebabas 0 4 \\
+        --vertices 4 64 --repeticiones 30 --salida resultado.json
+    python benchmarks/bench_analisis.py --vertices 512 --epsilon 0 1 2   # simplificación del contorno
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+# Cargas en frío dentro de este proceso; la adopción de una plantilla ya
+# publicada por otro proceso se mide aparte (cargar_plantilla/.../compartida)
+os.environ.setdefault("PLANTILLAS_COMPARTIDAS", "0")
+
+import cv2
+import numpy as np
+
+from modules import analisis
+from modules.plantillas import (
+    PLANTILLA_POR_DEFECTO, AlmacenCompartido, RegistroPlantillas, compilar_desde_png,
+    guardar_compilada, registro_plantillas, ruta_compilada
+)
+from sinteticas import silueta, con_rebabas, codificar
+
+LINEA_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "linea_base.json")
+
+
+def _estadisticas(tiempos: list) -> dict:
+    tiempos_ms = np.array(tiempos) * 1000
+    return {
+        "n": len(tiempos),
+        "p50_ms": round(float(np.percentile(tiempos_ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(tiempos_ms, 99)), 3),
+        "media_ms": round(float(tiempos_ms.mean()), 3),
+        "por_segundo": round(len(tiempos) / float(np.sum(tiempos)), 1),
+    }
+
+
+def _cronometrar(funcion, repeticiones: int) -> list:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+# ---------------------------------------------------------
+# CASOS
+# ---------------------------------------------------------
+
+def medir_analisis(resoluciones, vertices, rebabas, repeticiones, epsilons=(0,)) -> dict:
+    """
+    analizar_molde para cada combinación de parámetros. Con epsilon > 0 el
+    contorno se simplifica antes de comparar (SIMPLIFICACION_EPSILON) y el
+    caso informa los puntos conservados.
+    """
+    casos = {}
+
+    for lado in resoluciones:
+        for n_vertices in vertices:
+            plantilla = silueta(lado, n_vertices)
+            nombre_plantilla = f"sintetica_{lado}_{n_vertices}"
+            registro_plantillas.registrar(nombre_plantilla, plantilla)
+
+            for n_rebabas, epsilon in itertools.product(rebabas, epsilons):
+                imagen_bytes = codificar(con_rebabas(plantilla, n_rebabas))
+                analisis.SIMPLIFICACION_EPSILON = epsilon
+
+                def analizar():
+                    return analisis.analizar_molde(imagen_bytes, plantilla=nombre_plantilla)
+
+                resultado = analizar()  # calentamiento (máscaras, espectros)
+                esperado = "RECHAZADO" if n_rebabas else "APROBADO"
+
+                caso = _estadisticas(_cronometrar(analizar, repeticiones))
+                caso["veredicto"] = resultado["status"]
+                caso["veredicto_correcto"] = resultado["status"] == esperado
+
+                clave = f"analizar_molde/{lado}px/v{n_vertices}/r{n_rebabas}"
+                if epsilon > 0:
+                    clave += f"/e{epsilon:g}"
+                    caso["max_distancia"] = resultado["max_distancia"]
+                    caso.update(resultado["simplificacion"])
+
+                casos[clave] = caso
+                _imprimir_caso(clave, caso)
+
+            registro_plantillas.olvidar(nombre_plantilla)
+
+    analisis.SIMPLIFICACION_EPSILON = 0
+    return casos
+
+
+def medir_carga(resoluciones, repeticiones) -> dict:
+    """
+    cargar_contorno_ideal (plantilla real, con su .npz si existe), carga en
+    frío de plantillas sintéticas desde PNG y desde .npz compilado, y
+    adopción de una plantilla ya publicada en el almacén compartido.
+    """
+    casos = {}
+
+    def cargar_ideal():
+        registro_plantillas.olvidar(PLANTILLA_POR_DEFECTO)
+        with contextlib.redirect_stdout(io.StringIO()):
+            analisis.cargar_contorno_ideal()
+
+    fuente = "npz" if os.path.exists(ruta_compilada(analisis.PLANTILLA_PATH)) else "png"
+    casos[f"cargar_contorno_ideal/{fuente}"] = _estadisticas(_cronometrar(cargar_ideal, repeticiones))
+    _imprimir_caso(f"cargar_contorno_ideal/{fuente}", casos[f"cargar_contorno_ideal/{fuente}"])
+
+    with tempfile.TemporaryDirectory() as directorio:
+        for lado in resoluciones:
+            nombre = f"sintetica_{lado}"
+            ruta = os.path.join(directorio, f"{nombre}.png")
+            cv2.imwrite(ruta, silueta(lado, 64))
+
+            def cargar():
+                # Registro nuevo en cada vuelta: siempre es una carga en frío
+                RegistroPlantillas(directorio, 1).obtener(nombre)
+
+            for fuente in ("png", "npz"):
+                if fuente == "npz":
+                    guardar_compilada(compilar_desde_png(nombre, ruta), ruta_compilada(ruta))
+
+                clave = f"cargar_plantilla/{lado}px/{fuente}"
+                casos[clave] = _estadisticas(_cronometrar(cargar, repeticiones))
+                _imprimir_caso(clave, casos[clave])
+
+            # Publicada por otro proceso: solo se mapea desde el almacén
+            almacen = AlmacenCompartido(os.path.join(directorio, "compartido"))
+            almacen.publicar(compilar_desde_png(nombre, ruta))
+
+            def adoptar():
+                RegistroPlantillas(directorio, 1, almacen).obtener(nombre)
+
+            clave = f"cargar_plantilla/{lado}px/compartida"
+            casos[clave] = _estadisticas(_cronometrar(adoptar, repeticiones))
+            _imprimir_caso(clave, casos[clave])
+
+    return casos
+
+
+# ---------------------------------------------------------
+# LÍNEA BASE Y COMPARACIÓN
+# ---------------------------------------------------------
+
+def entorno() -> dict:
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def comparar(actual: dict, base: dict, tolerancia: float) -> list:
+    """Casos cuyo p50 empeoró más que `tolerancia` (0.25 = 25 %)."""
+    regresiones = []
+
+    print(f"\n{'caso':<40}{'base p50':>10}{'actual':>10}{'cambio':>9}")
+
+    for clave, caso in actual["casos"].items():
+        previo = base["casos"].get(clave)
+        if previo is None:
+            continue
+
+        cambio = caso["p50_ms"] / previo["p50_ms"] - 1 if previo["p50_ms"] else 0.0
+        marca = ""
+
+        if cambio > tolerancia:
+            regresiones.append(clave)
+            marca = "  ⚠ REGRESIÓN"
+        if not caso.get("veredicto_correcto", True):
+            regresiones.append(clave)
+            marca += "  ❌ veredicto"
+
+        print(f"{clave:<40}{previo['p50_ms']:>10.2f}{caso['p50_ms']:>10.2f}{cambio:>+9.0%}{marca}")
+
+    return regresiones
+
+
+def _imprimir_caso(clave: str, caso: dict):
+    veredicto = ""
+    if "veredicto" in caso:
+        veredicto = caso["veredicto"] + ("" if caso["veredicto_correcto"] else " ❌")
+
+    print(
+        f"{clave:<40}{caso['p50_ms']:>10.2f}{caso['p99_ms']:>10.2f}"
+        f"{caso['por_segundo']:>11.1f}  {veredicto}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resoluciones", type=int, nargs="+", default=[600, 1200, 2400])
+    parser.add_argument("--rebabas", type=int, nargs="+", default=[0, 1, 8])
+    parser.add_argument("--vertices", type=int, nargs="+", default=[4, 64, 512],
+                        help="complejidad del contorno (4 = cuadrado)")
+    parser.add_argument("--epsilon", type=float, nargs="+", default=[0],
+                        help="simplificación del contorno en px (0 = desactivada)")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--salida", help="guardar el resultado en este JSON")
+    parser.add_argument("--guardar", action="store_true", help=f"guardar como línea base ({LINEA_BASE})")
+    parser.add_argument("--comparar", nargs="?", const=LINEA_BASE, help="comparar contra una línea base")
+    parser.add_argument("--tolerancia", type=float, default=0.25,
+                        help="empeoramiento de p50 admitido al comparar (0.25 = 25 %%)")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        analisis.cargar_contorno_ideal()
+
+    print(f"\n{'caso':<40}{'p50 ms':>10}{'p99 ms':>10}{'por seg.':>11}  veredicto")
+
+    resultado = {
+        "entorno": entorno(),
+        "casos": {
+            **medir_analisis(
+                args.resoluciones, args.vertices, args.rebabas, args.repeticiones, args.epsilon
+            ),
+            **medir_carga(args.resoluciones, args.repeticiones),
+        },
+    }
+
+    for destino in filter(None, [args.salida, LINEA_BASE if args.guardar else None]):
+        with open(destino, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"\n✅ Resultado guardado en {destino}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+
+        regresiones = comparar(resultado, base, args.tolerancia)
+
+        if regresiones:
+            print(f"\n❌ {len(regresiones)} caso(s) con regresión respecto a {args.comparar}")
+            sys.exit(1)
+
+        print(f"\n✔ Sin regresiones respecto a {args.comparar}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# backend/benchmarks/bench_arranque.py
+"""
+Tiempo de arranque del servicio: importación de main, evento de inicio,
+latencia de la primera y la segunda inspección, y tiempo hasta que
+/api/listo responde 200 (SMTP y precalentamiento en segundo plano).
+
+Cada repetición es un intérprete nuevo con MEDIR_ARRANQUE=1, una base
+SQLite temporal y un almacén de plantillas compartidas propio de la
+ejecución. La primera repetición arranca en frío: compila la plantilla y
+la publica. Las siguientes la encuentran publicada, como un worker que
+arranca junto a otros.
+
+Uso:
+    python benchmarks/bench_arranque.py --repeticiones 5
+    python benchmarks/bench_arranque.py --importtime 15   # módulos más lentos de importar
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+ETAPAS = ("importacion", "inicio", "primera_peticion", "segunda_peticion", "listo")
+
+
+# ---------------------------------------------------------
+# UNA REPETICIÓN (en su propio intérprete)
+# ---------------------------------------------------------
+
+async def _arrancar(plazo_listo: float) -> dict:
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main
+    tiempos = {"importacion": (time.perf_counter() - inicio) * 1000}
+
+    import httpx
+
+    with open(os.path.join(BACKEND_DIR, "molde_ok.png"), "rb") as f:
+        imagen = f.read()
+
+    transporte = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        t = time.perf_counter()
+        async with main.app.router.lifespan_context(main.app):
+            tiempos["inicio"] = (time.perf_counter() - t) * 1000
+
+            async with httpx.AsyncClient(transport=transporte, base_url="http://arranque") as cliente:
+                for etapa in ("primera_peticion", "segunda_peticion"):
+                    t = time.perf_counter()
+                    respuesta = await cliente.post(
+                        "/api/inspeccionar?duplicados=registrar",
+                        files={"file": ("molde_ok.png", imagen, "image/png")},
+                    )
+                    tiempos[etapa] = (time.perf_counter() - t) * 1000
+                    if respuesta.status_code != 200:
+                        raise RuntimeError(f"{etapa}: HTTP {respuesta.status_code} {respuesta.text}")
+
+                # Tiempo desde la importación hasta que /api/listo da 200
+                limite = time.perf_counter() + plazo_listo
+                while (listo := await cliente.get("/api/listo")).status_code != 200:
+                    if time.perf_counter() > limite:
+                        break
+                    await asyncio.sleep(0.005)
+                tiempos["listo"] = (time.perf_counter() - inicio) * 1000
+
+    return {
+        "tiempos": {k: round(v, 2) for k, v in tiempos.items()},
+        "servidor": listo.json(),
+    }
+
+
+def _hijo(args):
+    os.environ["MEDIR_ARRANQUE"] = "1"
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+
+    resultado = asyncio.run(_arrancar(args.plazo_listo))
+
+    with open(args.hijo, "w", encoding="utf-8") as f:
+        json.dump(resultado, f)
+
+    # Los hilos de arranque (SMTP) son daemon: no se espera su timeout
+    sys.stdout.flush()
+    os._exit(0)
+
+
+# ---------------------------------------------------------
+# IMPORTTIME
+# ---------------------------------------------------------
+
+def importtime(cantidad: int):
+    """Módulos con mayor tiempo acumulado de importación (python -X importtime)."""
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+
+    filas = []
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        # "import time:  propio |  acumulado | módulo" (en µs)
+        propio, acumulado, modulo = linea[len("import time:"):].split("|")
+        filas.append((int(acumulado), int(propio), modulo.rstrip()))
+
+    print(f"{'acumulado ms':>13}{'propio ms':>11}  módulo")
+    for acumulado, propio, modulo in sorted(filas, reverse=True)[:cantidad]:
+        print(f"{acumulado / 1000:>13.1f}{propio / 1000:>11.1f}  {modulo}")
+
+
+# ---------------------------------------------------------
+# PRINCIPAL
+# ---------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--plazo-listo", type=float, default=30.0,
+                        help="segundos máximos esperando a /api/listo")
+    parser.add_argument("--importtime", type=int, metavar="N",
+                        help="solo listar los N módulos más lentos de importar")
+    parser.add_argument("--salida", help="guardar los resultados en este JSON")
+    parser.add_argument("--hijo", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        _hijo(args)
+
+    if args.importtime:
+        importtime(args.importtime)
+        return
+
+    directorio = tempfile.mkdtemp(prefix="arranque_")
+    entorno = {
+        **os.environ,
+        "DATABASE_PATH": os.path.join(directorio, "arranque.db"),
+        "DIRECTORIO_COMPARTIDO": os.path.join(directorio, "plantillas"),
+        # Como con varios workers (un solo proceso no publica por defecto)
+        "PLANTILLAS_COMPARTIDAS": "1",
+    }
+
+    print(f"{'':<6}" + "".join(f"{e + ' ms':>20}" for e in ETAPAS) + "  smtp")
+    repeticiones = []
+
+    try:
+        for i in range(args.repeticiones):
+            salida = os.path.join(directorio, f"repeticion_{i}.json")
+            comando = [sys.executable, os.path.abspath(__file__), "--hijo", salida,
+                       "--plazo-listo", str(args.plazo_listo)]
+            if subprocess.run(comando, env=entorno).returncode != 0:
+                sys.exit(1)
+
+            with open(salida, encoding="utf-8") as f:
+                resultado = json.load(f)
+            repeticiones.append(resultado)
+
+            etiqueta = "frío" if i == 0 else f"#{i + 1}"
+            smtp = resultado["servidor"]["tareas"].get("smtp", {}).get("estado")
+            print(f"{etiqueta:<6}" + "".join(f"{resultado['tiempos'][e]:>20.1f}" for e in ETAPAS) + f"  {smtp}")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(repeticiones, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# backend/benchmarks/bench_escalonado.py
+"""
+Compara el análisis escalonado (ROI) contra el análisis de imagen completa
+usando molde_ok.png y molde_rebaba.png ampliados (por defecto 4× y 16× por lado).
+
+Uso:
+    python benchmarks/bench_escalonado.py [--escalas 1 4 16] [--repeticiones 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+import cv2
+import numpy as np
+
+from modules import analisis
+from modules.plantillas import registro_plantillas
+
+
+def _leer(nombre):
+    return cv2.imread(os.path.join(BACKEND_DIR, nombre), cv2.IMREAD_GRAYSCALE)
+
+
+def _ampliar(img, escala):
+    if escala == 1:
+        return img
+    return cv2.resize(img, None, fx=escala, fy=escala, interpolation=cv2.INTER_NEAREST)
+
+
+def _medir(imagen_bytes, plantilla, escalonado, repeticiones):
+    analisis.ANALISIS_ESCALONADO = escalonado
+    tiempos = []
+    resultado = None
+
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = analisis.analizar_molde(imagen_bytes, plantilla=plantilla)
+        tiempos.append(time.perf_counter() - inicio)
+
+    return resultado, float(np.median(tiempos)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--escalas", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    analisis.cargar_contorno_ideal()
+    analisis.AREA_MINIMA_ESCALONADO = 0
+
+    plantilla = _leer("plantilla_ideal.png")
+    moldes = {"molde_ok": _leer("molde_ok.png"), "molde_rebaba": _leer("molde_rebaba.png")}
+
+    print(f"\n{'imagen':<14}{'escala':>7}{'píxeles':>12}{'completo ms':>14}{'escalonado ms':>15}{'aceleración':>13}  veredicto")
+
+    for escala in args.escalas:
+        nombre_plantilla = f"ideal_x{escala}"
+        registro_plantillas.registrar(nombre_plantilla, _ampliar(plantilla, escala))
+
+        for nombre, img in moldes.items():
+            ampliada = _ampliar(img, escala)
+            # PNG sin compresión: la decodificación pesa igual en ambos modos
+            _, buffer = cv2.imencode(".png", ampliada, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+            imagen_bytes = buffer.tobytes()
+
+            r_completo, t_completo = _medir(imagen_bytes, nombre_plantilla, False, args.repeticiones)
+            r_escalonado, t_escalonado = _medir(imagen_bytes, nombre_plantilla, True, args.repeticiones)
+
+            coincide = (
+                r_completo["status"] == r_escalonado["status"]
+                and abs(r_completo["max_distancia"] - r_escalonado["max_distancia"]) < 1e-6
+            )
+
+            print(
+                f"{nombre:<14}{escala:>6}×{ampliada.size:>12,}{t_completo:>14.1f}{t_escalonado:>15.1f}"
+                f"{t_completo / t_escalonado:>12.2f}×  {r_escalonado['status']}"
+                f"{'' if coincide else ' (≠ completo: ' + r_completo['status'] + ')'}"
+            )
+
+        registro_plantillas.olvidar(nombre_plantilla)
+
+
+if __name__ == "__main__":
+    main()
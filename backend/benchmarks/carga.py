@@ -0,0 +1,319 @@
+# backend/benchmarks/carga.py
+"""
+Prueba de carga de la API en el mismo proceso (cliente ASGI de httpx, sin
+red ni servidor): siembra una base SQLite aparte con N inspecciones
+sintéticas y lanza peticiones concurrentes contra cada endpoint.
+
+Por endpoint informa peticiones/s, latencia p50/p90/p99/máx, códigos de
+respuesta y el pico de memoria residente (RSS) durante su tanda.
+
+Uso:
+    python benchmarks/carga.py --filas 10000 100000 --concurrencia 8 --peticiones 200
+    python benchmarks/carga.py --filas 1000000 --endpoints registros exportar --peticiones 5
+    python benchmarks/carga.py --db /tmp/carga.db --reusar     # no volver a sembrar
+
+Cada tamaño usa su propio archivo (por defecto en el directorio temporal);
+la base de datos del servicio (backend/database.db) no se toca.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+# Endpoints disponibles: nombre → (método, ruta)
+ENDPOINTS = {
+    "inspeccionar": ("POST", "/api/inspeccionar?resumen=true"),
+    "registros": ("GET", "/api/registros?resumen=true"),
+    "exportar": ("GET", "/api/exportar"),
+    "lotes": ("GET", "/api/lotes"),
+}
+
+CATEGORIAS = ["Excluido", "Borde irregular", "Corte incompleto", "Desalineación", "Error de máquina"]
+TAMANO_TANDA_SIEMBRA = 10000
+
+
+# ---------------------------------------------------------
+# MEMORIA
+# ---------------------------------------------------------
+
+def rss_actual_mb() -> float:
+    """RSS actual del proceso (Linux: /proc/self/statm)."""
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return rss_maximo_mb()
+
+
+def rss_maximo_mb() -> float:
+    """Pico de RSS de todo el proceso hasta ahora."""
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo / 2**20 if sys.platform == "darwin" else maximo / 1024
+
+
+class MonitorRSS:
+    """Muestrea el RSS en segundo plano y guarda el máximo de la tanda."""
+
+    def __init__(self, intervalo: float = 0.01):
+        self.intervalo = intervalo
+        self.pico = 0.0
+        self._parar = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+
+    def _muestrear(self):
+        while not self._parar.is_set():
+            self.pico = max(self.pico, rss_actual_mb())
+            self._parar.wait(self.intervalo)
+
+    def __enter__(self):
+        self.pico = rss_actual_mb()
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._hilo.join()
+        self.pico = max(self.pico, rss_actual_mb())
+
+
+# ---------------------------------------------------------
+# SIEMBRA
+# ---------------------------------------------------------
+
+def sembrar(filas: int, porcentaje_rechazo: float = 0.05, filas_por_lote: int = 1000):
+    """Inserta `filas` inspecciones sintéticas (y sus lotes) en tandas."""
+    from sqlalchemy import insert
+
+    from modules import analisis
+    from modules.codificacion_defectos import columnas_defectos
+    from modules.db import Base, engine
+    from modules.migraciones import migrar
+    from modules.models import Inspeccion, Lote
+
+    Base.metadata.create_all(bind=engine)
+    migrar(engine)
+
+    # Los defectos de una rebaba real, reutilizados en todas las filas rechazadas
+    with open(os.path.join(BACKEND_DIR, "molde_rebaba.png"), "rb") as f:
+        rebaba = analisis.analizar_molde(f.read())
+    defectos_rechazo = columnas_defectos(rebaba["puntos_defectuosos"], rebaba["segmentos"])
+    defectos_ok = columnas_defectos([], [])
+
+    rng = random.Random(42)
+    ahora = datetime.now()
+    n_lotes = max(1, filas // filas_por_lote)
+
+    with engine.begin() as conexion:
+        conexion.execute(insert(Lote), [
+            {"codigo_lote": f"CARGA-{i:06d}", "inspector": "carga", "estado": "EN PROCESO"}
+            for i in range(n_lotes)
+        ])
+
+    inicio = time.perf_counter()
+
+    for desde in range(0, filas, TAMANO_TANDA_SIEMBRA):
+        tanda = []
+
+        for i in range(desde, min(filas, desde + TAMANO_TANDA_SIEMBRA)):
+            rechazada = rng.random() < porcentaje_rechazo
+            tanda.append({
+                "resultado": "RECHAZADO" if rechazada else "APROBADO",
+                "max_distancia": rebaba["max_distancia"] if rechazada else 0.0,
+                "categoria": rng.choice(CATEGORIAS) if rechazada else "Excluido",
+                # Fechas crecientes: la última fila es la más reciente
+                "fecha": ahora - timedelta(seconds=(filas - i) * 5),
+                "lote_id": i // filas_por_lote + 1,
+                **(defectos_rechazo if rechazada else defectos_ok),
+            })
+
+        with engine.begin() as conexion:
+            conexion.execute(insert(Inspeccion), tanda)
+
+        print(f"\r   sembradas {min(filas, desde + TAMANO_TANDA_SIEMBRA):,}/{filas:,}", end="", flush=True)
+
+    print(f"  ({time.perf_counter() - inicio:.1f} s)")
+
+
+# ---------------------------------------------------------
+# CARGA
+# ---------------------------------------------------------
+
+def cuerpos_inspeccion(cantidad: int) -> list:
+    """
+    Imágenes distintas para /api/inspeccionar (si se repitieran, la caché
+    de resultados evitaría el análisis): cada una lleva su número escrito
+    en píxeles del fondo por debajo del umbral, sin cambiar el veredicto.
+    """
+    import cv2
+    from sinteticas import silueta, con_rebabas, codificar
+
+    base = {False: silueta(600), True: con_rebabas(silueta(600), 1)}
+    cuerpos = []
+
+    for i in range(cantidad):
+        img = base[i % 10 == 0].copy()
+        img[0, :8] = [(i >> (4 * k)) & 0xF for k in range(8)]
+        cuerpos.append(codificar(img))
+
+    return cuerpos
+
+
+async def lanzar(cliente, metodo: str, ruta: str, peticiones: int, concurrencia: int, cuerpos=None) -> dict:
+    """`peticiones` peticiones con `concurrencia` clientes simultáneos."""
+    latencias = []
+    codigos = {}
+    siguiente = iter(range(peticiones))
+
+    async def trabajador():
+        for i in siguiente:
+            kwargs = {}
+            if cuerpos is not None:
+                kwargs["files"] = {"file": ("carga.png", cuerpos[i], "image/png")}
+
+            inicio = time.perf_counter()
+            respuesta = await cliente.request(metodo, ruta, **kwargs)
+            await respuesta.aread()
+            latencias.append(time.perf_counter() - inicio)
+            codigos[respuesta.status_code] = codigos.get(respuesta.status_code, 0) + 1
+
+    with MonitorRSS() as monitor:
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+        duracion = time.perf_counter() - inicio
+
+    latencias_ms = np.array(latencias) * 1000
+    return {
+        "peticiones": peticiones,
+        "concurrencia": concurrencia,
+        "por_segundo": round(peticiones / duracion, 2),
+        "p50_ms": round(float(np.percentile(latencias_ms, 50)), 2),
+        "p90_ms": round(float(np.percentile(latencias_ms, 90)), 2),
+        "p99_ms": round(float(np.percentile(latencias_ms, 99)), 2),
+        "max_ms": round(float(latencias_ms.max()), 2),
+        "codigos": {str(k): v for k, v in sorted(codigos.items())},
+        "rss_pico_mb": round(monitor.pico, 1),
+    }
+
+
+async def probar(endpoints: list, peticiones: int, concurrencia: int) -> dict:
+    import httpx
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main
+
+    resultados = {}
+    # Los errores de la app cuentan como 500 en lugar de abortar la prueba
+    transporte = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+
+    # ASGITransport no emite los eventos de arranque: se ejecutan aquí
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transporte, base_url="http://carga", timeout=None) as cliente:
+            for nombre in endpoints:
+                metodo, ruta = ENDPOINTS[nombre]
+                cuerpos = cuerpos_inspeccion(peticiones) if nombre == "inspeccionar" else None
+
+                resultados[nombre] = await lanzar(cliente, metodo, ruta, peticiones, concurrencia, cuerpos)
+                _imprimir(nombre, resultados[nombre])
+
+    return resultados
+
+
+def _imprimir(nombre: str, r: dict):
+    print(
+        f"   {nombre:<14}{r['por_segundo']:>9.1f}{r['p50_ms']:>10.1f}{r['p90_ms']:>10.1f}"
+        f"{r['p99_ms']:>10.1f}{r['max_ms']:>10.1f}{r['rss_pico_mb']:>10.1f}  {r['codigos']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, nargs="+", default=[10000],
+                        help="tamaños de la tabla inspecciones (uno por ejecución)")
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument("--peticiones", type=int, default=100, help="peticiones por endpoint")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--db", help="archivo SQLite (solo con un tamaño; por defecto, temporal)")
+    parser.add_argument("--reusar", action="store_true", help="no sembrar si --db ya existe")
+    parser.add_argument("--salida", help="guardar los resultados en este JSON")
+    args = parser.parse_args()
+
+    if len(args.filas) > 1 and args.db:
+        parser.error("--db solo admite un tamaño de --filas (cada tamaño va en su archivo)")
+
+    # Cada tamaño se ejecuta en un subproceso: la configuración de la base
+    # se lee al importar modules.db y el RSS de un tamaño no contamina al siguiente.
+    if len(args.filas) > 1:
+        resultados = {}
+        for filas in args.filas:
+            with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+                salida = f.name
+            comando = [sys.executable, os.path.abspath(__file__), "--filas", str(filas),
+                       "--peticiones", str(args.peticiones), "--concurrencia", str(args.concurrencia),
+                       "--endpoints", *args.endpoints, "--salida", salida]
+            if os.spawnv(os.P_WAIT, sys.executable, comando) != 0:
+                sys.exit(1)
+            with open(salida, encoding="utf-8") as f:
+                resultados.update(json.load(f))
+            os.remove(salida)
+        _guardar(args.salida, resultados)
+        return
+
+    filas = args.filas[0]
+    ruta_db = args.db or os.path.join(tempfile.gettempdir(), f"carga_{filas}.db")
+    temporal = args.db is None
+
+    if os.path.exists(ruta_db) and not (args.reusar and args.db):
+        _borrar_db(ruta_db)
+
+    os.environ["DATABASE_PATH"] = ruta_db
+
+    print(f"\n📊 {filas:,} inspecciones en {ruta_db}")
+    if not os.path.exists(ruta_db):
+        with contextlib.redirect_stdout(io.StringIO()):
+            from modules import analisis
+            analisis.cargar_contorno_ideal()
+        sembrar(filas)
+
+    print(f"   {'endpoint':<14}{'req/s':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'máx ms':>10}{'RSS MB':>10}  códigos")
+
+    try:
+        resultados = asyncio.run(probar(args.endpoints, args.peticiones, args.concurrencia))
+    finally:
+        if temporal:
+            _borrar_db(ruta_db)
+
+    _guardar(args.salida, {str(filas): resultados})
+
+
+def _borrar_db(ruta_db: str):
+    """Borra la base y, en modo WAL, sus archivos -wal y -shm."""
+    for sufijo in ("", "-wal", "-shm"):
+        if os.path.exists(ruta_db + sufijo):
+            os.remove(ruta_db + sufijo)
+
+
+def _guardar(destino, resultados):
+    if destino:
+        with open(destino, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
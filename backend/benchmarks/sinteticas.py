@@ -0,0 +1,70 @@
+# backend/benchmarks/sinteticas.py
+"""
+Imágenes sintéticas parametrizadas para los benchmarks: plantilla y molde
+con una resolución, una complejidad de contorno y un número de rebabas dados.
+
+Escala como generate_assets.py: a 600x600 la pieza mide la mitad del lado
+y cada rebaba sobresale unos 10 px; todo crece con la resolución.
+"""
+
+import cv2
+import numpy as np
+
+
+def silueta(lado: int, vertices: int = 4) -> np.ndarray:
+    """
+    Pieza blanca centrada sobre fondo negro.
+
+    Con 4 vértices es un cuadrado alineado con los ejes (como
+    plantilla_ideal.png); con más, una estrella de `vertices` puntas
+    alternas, cada vez con más puntos en el contorno.
+    """
+    img = np.zeros((lado, lado), dtype=np.uint8)
+    centro = lado / 2
+    radio = lado / 4 * np.sqrt(2) if vertices == 4 else lado / 3
+
+    angulos = 2 * np.pi * np.arange(vertices) / vertices + np.pi / 4
+    radios = np.full(vertices, radio)
+    if vertices > 4:
+        radios[1::2] *= 0.85
+
+    puntos = np.stack(
+        [centro + radios * np.cos(angulos), centro + radios * np.sin(angulos)], axis=1
+    )
+    cv2.fillPoly(img, [np.round(puntos).astype(np.int32)], 255)
+    return img
+
+
+def con_rebabas(img: np.ndarray, cantidad: int, tamano: float = None) -> np.ndarray:
+    """
+    Copia de `img` con `cantidad` rebabas repartidas a lo largo del contorno.
+    Cada una sobresale ~`tamano` px hacia fuera (por defecto 10 px a 600x600).
+    """
+    molde = img.copy()
+
+    if cantidad <= 0:
+        return molde
+
+    lado = img.shape[0]
+    tamano = tamano or 10 * lado / 600
+
+    contornos, _ = cv2.findContours(img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    contorno = max(contornos, key=cv2.contourArea).reshape(-1, 2)
+    centro = contorno.mean(axis=0)
+
+    for indice in np.linspace(0, len(contorno), cantidad, endpoint=False).astype(int):
+        punto = contorno[indice].astype(np.float64)
+        direccion = (punto - centro) / np.linalg.norm(punto - centro)
+        centro_rebaba = punto + direccion * tamano / 2
+        cv2.circle(
+            molde, tuple(int(v) for v in np.round(centro_rebaba)),
+            int(round(tamano * 0.6)), 255, thickness=cv2.FILLED
+        )
+
+    return molde
+
+
+def codificar(img: np.ndarray) -> bytes:
+    """PNG con compresión mínima (como llegaría desde la cámara)."""
+    _, buffer = cv2.imencode(".png", img, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+    return buffer.tobytes()
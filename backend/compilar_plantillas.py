@@ -0,0 +1,54 @@
+# compilar_plantillas.py
+"""
+Compila las plantillas ideales a .npz (contorno, mapas derivados y hash
+del PNG de origen) para que los trabajadores arranquen sin decodificar
+ni procesar imágenes.
+
+Uso:
+    python compilar_plantillas.py              # plantilla_ideal.png + plantillas/*.png
+    python compilar_plantillas.py ruta1.png …  # solo los PNG indicados
+"""
+
+import os
+import sys
+
+from modules.analisis import PLANTILLA_PATH
+from modules.plantillas import (
+    DIRECTORIO_PLANTILLAS, PLANTILLA_POR_DEFECTO,
+    compilar_desde_png, guardar_compilada, ruta_compilada
+)
+
+
+def rutas_por_defecto():
+    """La plantilla ideal y todos los PNG de la carpeta de plantillas."""
+    rutas = [(PLANTILLA_POR_DEFECTO, PLANTILLA_PATH)]
+
+    if os.path.isdir(DIRECTORIO_PLANTILLAS):
+        for archivo in sorted(os.listdir(DIRECTORIO_PLANTILLAS)):
+            if archivo.endswith(".png"):
+                nombre = os.path.splitext(archivo)[0]
+                rutas.append((nombre, os.path.join(DIRECTORIO_PLANTILLAS, archivo)))
+
+    return rutas
+
+
+def compilar(nombre, ruta_png):
+    """Compila un PNG y escribe su .npz al lado."""
+    plantilla = compilar_desde_png(nombre, ruta_png)
+    destino = ruta_compilada(ruta_png)
+    guardar_compilada(plantilla, destino)
+    print(f"✅ Compilada: {destino} (hash {plantilla.hash_origen[:12]}…)")
+
+
+if __name__ == '__main__':
+    print("--- Compilando plantillas ---")
+
+    if len(sys.argv) > 1:
+        rutas = [(os.path.splitext(os.path.basename(r))[0], r) for r in sys.argv[1:]]
+    else:
+        rutas = rutas_por_defecto()
+
+    for nombre, ruta in rutas:
+        compilar(nombre, ruta)
+
+    print("--- Proceso Completo ---")
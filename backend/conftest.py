@@ -0,0 +1,114 @@
+# backend/conftest.py
+"""
+Configuración común de las pruebas (pytest desde la raíz o desde backend/).
+
+db.py y plantillas.py leen su configuración al importarse, así que la base
+de datos y el almacén compartido de plantillas se apuntan a un directorio
+temporal aquí, antes de que ningún archivo de pruebas importe modules.
+La base del servicio (backend/database.db) no se toca.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+DIRECTORIO_PRUEBAS = tempfile.mkdtemp(prefix="pruebas_moldes_")
+
+os.environ["DATABASE_PATH"] = os.path.join(DIRECTORIO_PRUEBAS, "pruebas.db")
+os.environ.pop("DATABASE_URL", None)
+os.environ["DIRECTORIO_COMPARTIDO"] = os.path.join(DIRECTORIO_PRUEBAS, "plantillas")
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Fecha de la primera inspección sembrada por las pruebas
+INICIO = datetime(2026, 1, 1, 8, 0, 0)
+
+
+def sembrar(filas) -> list:
+    """
+    Inserta una inspección por diccionario de columnas y devuelve las
+    inspecciones, en orden, con su id y separadas de la sesión. Por
+    defecto cada una es APROBADO, con distancia 0 y fecha INICIO + i
+    segundos.
+    """
+    from modules.db import SessionLocal
+    from modules.models import Inspeccion
+
+    db = SessionLocal()
+    try:
+        inspecciones = [
+            Inspeccion(**{
+                "resultado": "APROBADO",
+                "max_distancia": 0.0,
+                "fecha": INICIO + timedelta(seconds=i),
+                **columnas,
+            })
+            for i, columnas in enumerate(filas)
+        ]
+        db.add_all(inspecciones)
+        db.commit()
+        for inspeccion in inspecciones:
+            db.refresh(inspeccion)
+        db.expunge_all()
+        return inspecciones
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def base_de_datos():
+    """Crea las tablas y aplica las migraciones, como el startup de main.py."""
+    from modules.db import Base, engine
+    from modules.migraciones import migrar
+    from modules import models  # noqa: F401  (registra las tablas)
+
+    Base.metadata.create_all(bind=engine)
+    migrar(engine)
+
+    yield engine
+
+    engine.dispose()
+    shutil.rmtree(DIRECTORIO_PRUEBAS, ignore_errors=True)
+
+
+@pytest.fixture
+def base_vacia(base_de_datos):
+    """Borra inspecciones, lotes y alertas (y lo que apunta a ellas) antes de la prueba."""
+    from modules.alert_service import ventana_defectos
+    from modules.cache_resultados import cache_resultados
+    from modules.db import SessionLocal
+    from modules.models import Alert, Inspeccion, Lote
+
+    db = SessionLocal()
+    try:
+        for modelo in (Inspeccion, Lote, Alert):
+            db.query(modelo).delete()
+        db.commit()
+    finally:
+        db.close()
+
+    ventana_defectos.invalidar()
+    cache_resultados.vaciar()
+    yield
+
+
+@pytest.fixture
+def cliente():
+    """Cliente HTTP de la API, sin ejecutar el arranque."""
+    from fastapi.testclient import TestClient
+    import main
+
+    return TestClient(main.app)
+
+
+@pytest.fixture(scope="session")
+def contorno_ideal():
+    """Plantilla por defecto cargada en el registro."""
+    from modules import analisis
+
+    assert analisis.cargar_contorno_ideal()
+    return analisis.registro_plantillas.obtener()
@@ -0,0 +1,190 @@
+# explicar_consultas.py
+"""
+Imprime el EXPLAIN QUERY PLAN de cada consulta de crud.py, crud_lotes.py y
+alert_service.py.
+
+Las consultas no se copian aquí: se ejecutan las propias funciones sobre
+una copia de la base de datos (las de escritura también, por eso es una
+copia) y se captura cada sentencia que envían a SQLite. Los INSERT no se
+muestran: su plan no depende de los índices.
+
+Un "SCAN" de una tabla sin índice o un "USE TEMP B-TREE FOR ORDER BY" se
+marcan con ⚠: la consulta recorre o reordena la tabla entera.
+
+Uso:
+    python explicar_consultas.py                  # copia de la base del servicio (o base vacía)
+    python explicar_consultas.py --db otra.db
+    python explicar_consultas.py --version 1      # migrar la copia solo hasta la v1 (sin índices)
+    python explicar_consultas.py --estricto       # código de salida 1 si hay algún ⚠
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# La misma base que usa el servicio (ver modules/db.py)
+DATABASE_PATH = os.getenv("DATABASE_PATH", os.path.join(BACKEND_DIR, "database.db"))
+
+
+def _copiar_base(origen: str, destino: str):
+    """Copia consistente con la API de backup de SQLite (incluye el WAL)."""
+    with contextlib.closing(sqlite3.connect(origen)) as fuente, \
+            contextlib.closing(sqlite3.connect(destino)) as copia:
+        fuente.backup(copia)
+
+
+def _acortar(sentencia: str) -> str:
+    """Una línea, con la lista de columnas del SELECT abreviada."""
+    sentencia = " ".join(sentencia.split())
+    return re.sub(r"^SELECT .+? FROM ", "SELECT … FROM ", sentencia)
+
+
+def _preocupante(detalle: str) -> bool:
+    return detalle.startswith("USE TEMP B-TREE") or (
+        detalle.startswith("SCAN") and " USING " not in detalle
+    )
+
+
+def consultas_por_funcion():
+    """
+    Ejecuta las funciones CRUD en orden (con filas propias donde hace
+    falta un id) y devuelve [(función, [(sentencia, parámetros)])].
+    """
+    from sqlalchemy import event
+
+    from modules.db import engine
+    from modules import crud, crud_lotes
+    from modules.alert_service import AlertService, ventana_defectos
+
+    capturadas = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _capturar(conn, cursor, sentencia, parametros, contexto, varias):
+        if not sentencia.lstrip().upper().startswith(("INSERT", "PRAGMA")):
+            capturadas.append((sentencia, parametros))
+
+    resultados = []
+
+    def llamar(nombre, funcion, *args):
+        capturadas.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            valor = funcion(*args)
+        resultados.append((nombre, list(capturadas)))
+        return valor
+
+    # Filas propias: el análisis de las lecturas no depende de ellas, pero
+    # las escrituras por id necesitan una que exista
+    inspeccion = llamar("crud.guardar_inspeccion", crud.guardar_inspeccion, "RECHAZADO", 5.0, [[1, 1]])
+    lote = llamar("crud_lotes.crear_lote", crud_lotes.crear_lote, f"EXPLICAR-{inspeccion.id}", "explicar")
+
+    llamar("crud.listar_inspecciones", crud.listar_inspecciones)
+    llamar("crud.obtener_estadisticas_por_categoria", crud.obtener_estadisticas_por_categoria)
+    llamar("crud.filtrar_por_categoria", crud.filtrar_por_categoria, "Excluido")
+    llamar("crud.listar_pagina", crud.listar_pagina)
+    cursor = crud.codificar_cursor(inspeccion.fecha.isoformat(" ", "microseconds"), inspeccion.id)
+    llamar("crud.listar_pagina (cursor)", crud.listar_pagina, None, cursor)
+    llamar("crud.filtrar_por_categoria (cursor)", crud.filtrar_por_categoria, "Excluido", None, cursor)
+    llamar("crud.listar_pagina (desde_id)", crud.listar_pagina, None, None, inspeccion.id)
+    llamar("crud_lotes.agregar_inspeccion_a_lote", crud_lotes.agregar_inspeccion_a_lote, lote.id, inspeccion.id)
+    llamar("crud_lotes.listar_lotes", crud_lotes.listar_lotes)
+    llamar("crud_lotes.obtener_lote", crud_lotes.obtener_lote, lote.id)
+    llamar("crud_lotes.listar_inspecciones_de_lote", crud_lotes.listar_inspecciones_de_lote, lote.id)
+
+    llamar("ventana_defectos.sembrar", ventana_defectos.sembrar)
+    llamar("AlertService.calcular_porcentaje_defectos", AlertService.calcular_porcentaje_defectos)
+    alerta = llamar("AlertService.verificar_y_crear_alerta", AlertService.verificar_y_crear_alerta)
+    llamar("AlertService.obtener_alertas_pendientes", AlertService.obtener_alertas_pendientes)
+    if alerta.get("alerta_id"):
+        llamar("AlertService.marcar_alerta_como_notificada",
+               AlertService.marcar_alerta_como_notificada, alerta["alerta_id"])
+    llamar("AlertService.obtener_historial_alertas", AlertService.obtener_historial_alertas)
+
+    llamar("crud.eliminar_inspeccion", crud.eliminar_inspeccion, inspeccion.id)
+
+    event.remove(engine, "before_cursor_execute", _capturar)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=DATABASE_PATH,
+                        help="base a analizar (no se modifica; se trabaja sobre una copia; "
+                             "por defecto, DATABASE_PATH)")
+    parser.add_argument("--version", type=int,
+                        help="migrar la copia solo hasta esta versión del esquema")
+    parser.add_argument("--estricto", action="store_true",
+                        help="salir con código 1 si algún plan recorre o reordena una tabla")
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="explicar_")
+    copia = os.path.join(directorio, "copia.db")
+
+    if os.path.exists(args.db):
+        _copiar_base(args.db, copia)
+        print(f"📂 Copia de {args.db}")
+    else:
+        print(f"📂 {args.db} no existe: base vacía")
+
+    # La configuración de la base se lee al importar modules.db; sin
+    # DATABASE_URL, que tiene prioridad y apuntaría a la base original
+    os.environ["DATABASE_PATH"] = copia
+    os.environ.pop("DATABASE_URL", None)
+    sys.path.insert(0, BACKEND_DIR)
+
+    from modules.db import Base, engine, escritor_bd
+    from modules.migraciones import migrar
+    from modules import models  # noqa: F401  (registra las tablas)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        Base.metadata.create_all(bind=engine)
+        version = migrar(engine, hasta=args.version)
+    print(f"🗂  Esquema v{version}\n")
+
+    avisos = 0
+
+    try:
+        resultados = consultas_por_funcion()
+
+        with engine.connect() as conexion:
+            cursor = conexion.connection.cursor()
+
+            for funcion, sentencias in resultados:
+                if not sentencias:
+                    continue
+
+                print(f"📋 {funcion}")
+                for sentencia, parametros in sentencias:
+                    print(f"   {_acortar(sentencia)}")
+
+                    for fila in cursor.execute(f"EXPLAIN QUERY PLAN {sentencia}", parametros):
+                        detalle = fila[-1]
+                        marca = "⚠" if _preocupante(detalle) else "└"
+                        avisos += marca == "⚠"
+                        print(f"     {marca} {detalle}")
+                print()
+
+            cursor.close()
+    finally:
+        escritor_bd.cerrar()
+        engine.dispose()
+        for archivo in os.listdir(directorio):
+            os.remove(os.path.join(directorio, archivo))
+        os.rmdir(directorio)
+
+    if avisos:
+        print(f"⚠ {avisos} paso(s) recorren o reordenan una tabla completa.")
+        if args.estricto:
+            sys.exit(1)
+    else:
+        print("✔ Todas las consultas usan índices.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,51 @@
 # backend/main.py
-import csv
-from io import StringIO
+# Primero: marca el inicio de la importación para MEDIR_ARRANQUE
+from modules.arranque import estado_arranque, MEDIR_ARRANQUE
+
 from fastapi.responses import StreamingResponse
 from modules.crud import eliminar_inspeccion
 from fastapi import Path
 
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Request, WebSocket
+from typing import List, Optional
+import asyncio
+import os
+import time
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import json
-from modules.db import Base, engine
+from modules.db import Base, engine, escritor_bd
+from modules.migraciones import migrar
+from modules.codificacion_defectos import detalle_defectos, resumir_resultado
 from modules.crud import guardar_inspeccion_clasificada
-from modules.crud import filtrar_por_categoria
+from modules.crud import filtrar_por_categoria, listar_pagina
 from modules.crud import obtener_estadisticas_por_categoria
 
 from modules import models
 
 # Importamos la lógica de análisis
-from modules.analisis import analizar_molde, cargar_contorno_ideal
+from modules.analisis import analizar_molde, analizar_crudo, cargar_contorno_ideal
+from modules.plantillas import registro_plantillas, PlantillaNoEncontradaError
+from modules.cache_resultados import cache_resultados, MODO_DUPLICADOS
 
 # Importamos CRUD para guardar y listar registros
-from modules.crud import guardar_inspeccion, listar_inspecciones
+from modules.crud import guardar_inspeccion, guardar_inspecciones, listar_inspecciones
+from modules.ejecutor import (
+    cerrar_pool, ejecutar_en_hilo, control_admision,
+    ColaLlenaError, PlazoExcedidoError, REINTENTAR_TRAS,
+    precalentar as precalentar_analisis
+)
+from modules.franjas import analizar_por_franjas, usar_franjas, volcar_flujo
+from modules.filtro_fotogramas import registrar_descarte
+from modules import metricas
+from modules.transmision import (
+    SesionTransmision, crear_analizador, POLITICA_DESCARTE_WS, POLITICAS_DESCARTE
+)
 from modules.crud_lotes import crear_lote, listar_lotes, obtener_lote, agregar_inspeccion_a_lote
+from modules.crud_lotes import lote_tiene_inspecciones, listar_inspecciones_de_lote
+from modules.exportacion import exportar, tipo_y_extension
 from pydantic import BaseModel
 
 class DatosClasificacion(BaseModel):
@@ -45,7 +67,7 @@ class DatosAgregarInspeccion(BaseModel):
     id_inspeccion: int
 
 # NUEVO: Importar servicios de alertas y email
-from modules.alert_service import AlertService
+from modules.alert_service import AlertService, ventana_defectos
 from modules.email_service import EmailService
 
 # ---------------------------------------------------------
@@ -66,25 +88,111 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ---------------------------------------------------------
+# MEDICIÓN DE LA PRIMERA PETICIÓN (MEDIR_ARRANQUE=1)
+# ---------------------------------------------------------
+
+if MEDIR_ARRANQUE:
+    @app.middleware("http")
+    async def medir_primera_peticion(request: Request, call_next):
+        # Solo la primera: se marca al llegar, antes de ceder el event loop
+        if "primera_peticion_recibida" in estado_arranque.tiempos:
+            return await call_next(request)
+
+        estado_arranque.marcar("primera_peticion_recibida")
+        inicio = time.perf_counter()
+        respuesta = await call_next(request)
+
+        estado_arranque.marcar("primera_peticion", (time.perf_counter() - inicio) * 1000)
+        estado_arranque.marcar("primera_peticion_desde_importacion")
+        tiempos = estado_arranque.tiempos
+        print(
+            f"⏱ Arranque: importación {tiempos.get('importacion_main')} ms, "
+            f"inicio {tiempos.get('inicio')} ms, primera petición ({request.url.path}) "
+            f"{tiempos['primera_peticion']} ms, "
+            f"{tiempos['primera_peticion_desde_importacion']} ms desde la importación"
+        )
+        return respuesta
+
+
 # ---------------------------------------------------------
 # EVENTO DE INICIO: CARGA DE PLANTILLA IDEAL
 # ---------------------------------------------------------
 
 @app.on_event("startup")
 def startup_event():
-    """Carga la plantilla ideal y crea la base de datos si no existe."""
-    
-    # Crear tablas de SQLite
+    """
+    Carga la plantilla ideal y crea la base de datos si no existe.
+    La prueba SMTP y el precalentamiento del análisis siguen en segundo
+    plano; su estado se consulta en /api/listo.
+    """
+    inicio = time.perf_counter()
+
+    # Crear tablas de SQLite y aplicar las migraciones pendientes
     Base.metadata.create_all(bind=engine)
-    print("✔ Base de datos lista. Tablas creadas.")
+    version = migrar(engine)
+    print(f"✔ Base de datos lista. Tablas creadas (esquema v{version}).")
+
+    # Veredictos recientes para el porcentaje de defectos de las alertas
+    ventana_defectos.sembrar()
     
     # Cargar plantilla ideal
-    if not cargar_contorno_ideal():
+    plantilla_cargada = cargar_contorno_ideal()
+    estado_arranque.registrar("plantilla", plantilla_cargada)
+    if not plantilla_cargada:
         print("⚠ ADVERTENCIA: No se cargó la plantilla ideal. El análisis no funcionará.")
-    
-    # NUEVO: Probar conexión SMTP
-    print("\n🔧 Probando configuración de email...")
-    EmailService.test_conexion()
+
+    # OpenCV y los trabajadores se preparan sin bloquear el arranque
+    estado_arranque.lanzar("analisis", precalentar_analisis)
+
+    # NUEVO: Probar conexión SMTP (en segundo plano: puede tardar hasta el timeout)
+    print("\n🔧 Probando configuración de email en segundo plano...")
+    estado_arranque.lanzar("smtp", EmailService.test_conexion, requerida=False)
+
+    if MEDIR_ARRANQUE:
+        estado_arranque.marcar("inicio", (time.perf_counter() - inicio) * 1000)
+        estado_arranque.marcar("listo_para_peticiones")
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Libera el pool de procesos de análisis y espera las escrituras pendientes."""
+    cerrar_pool()
+    escritor_bd.cerrar()
+
+
+# ---------------------------------------------------------
+# VERIFICACIÓN DE ALERTAS + NOTIFICACIÓN
+# ---------------------------------------------------------
+
+def procesar_alerta(cronometro: metricas.Cronometro = None) -> dict:
+    """
+    Verifica si se debe crear una alerta automática y, si se creó,
+    envía la notificación por email y la marca como notificada.
+    Con `cronometro` se miden por separado la consulta y el envío SMTP.
+    """
+    crono = cronometro or metricas.Cronometro()
+
+    with crono.etapa("alerta_consulta"):
+        alerta_info = AlertService.verificar_y_crear_alerta()
+
+    # Si se creó una alerta, intentar enviar notificación por email
+    if alerta_info.get("alerta_creada"):
+        stats = alerta_info["estadisticas"]
+
+        with crono.etapa("smtp"):
+            email_enviado = EmailService.enviar_alerta_defectos(
+                porcentaje=stats["porcentaje_defectos"],
+                total_inspecciones=stats["total_inspecciones"],
+                total_rechazados=stats["total_rechazados"],
+                recomendacion=alerta_info["recomendacion"]
+            )
+
+        # Marcar alerta como notificada si el email se envió correctamente
+        if email_enviado:
+            AlertService.marcar_alerta_como_notificada(alerta_info["alerta_id"])
+
+    return alerta_info
 
 
 # ---------------------------------------------------------
@@ -92,65 +200,389 @@ def startup_event():
 # ---------------------------------------------------------
 
 @app.post("/api/inspeccionar")
-async def inspeccionar_calidad(file: UploadFile = File(...)):
+async def inspeccionar_calidad(
+    request: Request,
+    file: Optional[UploadFile] = File(None),
+    plantilla: Optional[str] = Query(None, description="Nombre de la plantilla (por defecto 'ideal')"),
+    duplicados: Optional[str] = Query(None, description="'vincular' o 'registrar' (imágenes repetidas)"),
+    modo: Optional[str] = Query(None, description="'contorno', 'area' o 'ambos'"),
+    resumen: bool = Query(False, description="Responder sin puntos ni segmentos, solo totales"),
+    tiempos: bool = Query(False, description="Incluir en el JSON los tiempos por etapa (ms)"),
+    franjas: Optional[bool] = Query(None, description="Análisis por franjas con memoria acotada (por defecto según el tamaño)")
+):
     """
     Recibe la imagen y devuelve si está APROBADA o RECHAZADA.
     Además guarda el resultado en SQLite y verifica si debe crear una alerta.
+    Con ?plantilla=<nombre> se compara contra otra plantilla del registro.
+    Con ?modo=area (o ambos) la respuesta incluye las regiones de material
+    sobrante y faltante con su área, bbox y centroide.
+
+    Si la misma imagen ya se analizó (caché por contenido), no se vuelve a
+    analizar: con duplicados=registrar (por defecto) se guarda una nueva
+    inspección con el mismo resultado; con duplicados=vincular se devuelve
+    la original sin crear otra (solo imágenes codificadas: los fotogramas
+    crudos siempre se registran). En ambos casos la respuesta incluye
+    "duplicado_de".
+
+    Además del multipart con PNG/JPEG, acepta fotogramas sin codificar con
+    Content-Type: application/octet-stream y las cabeceras:
+        X-Ancho, X-Alto: dimensiones del fotograma
+        X-Formato: "crudo" (uint8 gris, por defecto) o "bits" (máscara
+                   np.packbits ya umbralizada; 8 veces menos bytes)
+
+    Todo el trabajo bloqueante se ejecuta fuera del event loop. Si la cola
+    de análisis está llena responde 429 y si el análisis supera el plazo
+    responde 503, ambos con cabecera Retry-After.
+
+    Cada etapa (decodificación, umbralización, contornos, comparación,
+    guardado, consulta de alertas, SMTP...) se mide y se devuelve en la
+    cabecera Server-Timing; los histogramas por etapa están en /api/metricas.
+
+    Los fotogramas vacíos, saturados o desenfocados se responden con status
+    "DESCARTADO" y su motivo, sin guardarlos ni consultar alertas (ver
+    modules/filtro_fotogramas.py).
+
+    Los fotogramas sin codificar mayores que FRANJAS_DESDE_MB (o con
+    ?franjas=true) no se leen a memoria: se vuelcan a un archivo temporal y
+    se analizan por franjas con memoria acotada (ver modules/franjas.py).
+    Esos fotogramas no pasan por la caché de resultados. Un PNG/JPEG no se
+    puede analizar por franjas (?franjas=true responde 400).
     """
+    crono = metricas.Cronometro()
+    inicio = time.perf_counter()
+    datos = None
+    temporal = None
+
+    def _responder(contenido: dict) -> JSONResponse:
+        crono.sumar("total", (time.perf_counter() - inicio) * 1000)
+        crono.registrar("inspeccionar")
+        if tiempos:
+            contenido["tiempos"] = crono.redondeadas()
+        return JSONResponse(content=contenido, headers={"Server-Timing": crono.server_timing()})
+
     try:
-        # Leer bytes de la imagen
-        imagen_bytes = await file.read()
+        if file is not None and franjas:
+            raise HTTPException(
+                status_code=400,
+                detail="El análisis por franjas no admite PNG/JPEG: envía el fotograma sin "
+                       "codificar (application/octet-stream con X-Formato 'crudo' o 'bits')."
+            )
+
+        if file is not None:
+            # Leer bytes de la imagen
+            datos = await file.read()
+            analizador, argumentos, formato = analizar_molde, (datos,), "codificado"
+
+        elif request.headers.get("content-type", "").startswith("application/octet-stream"):
+            try:
+                ancho = int(request.headers["x-ancho"])
+                alto = int(request.headers["x-alto"])
+            except (KeyError, ValueError):
+                raise HTTPException(
+                    status_code=400,
+                    detail="Faltan las cabeceras X-Ancho y X-Alto (enteros) del fotograma."
+                )
+            tipo = request.headers.get("x-formato", "crudo")
+            formato = f"{tipo}:{ancho}x{alto}"
+
+            if usar_franjas(int(request.headers.get("content-length") or 0), franjas):
+                temporal = await volcar_flujo(request.stream())
+                analizador, argumentos = analizar_por_franjas, (temporal, tipo, ancho, alto)
+            else:
+                # El fotograma se envuelve sin copiar (np.frombuffer)
+                datos = await request.body()
+                analizador, argumentos = analizar_crudo, (datos, ancho, alto, tipo)
 
-        # Ejecutar análisis
-        resultado = analizar_molde(imagen_bytes)
+        else:
+            raise HTTPException(
+                status_code=400,
+                detail="Envía un archivo multipart 'file' o un cuerpo application/octet-stream."
+            )
+
+        # ¿Ya se analizó esta misma imagen con la misma plantilla y tolerancia?
+        clave = previo = None
+        if datos is not None:
+            with crono.etapa("cache"):
+                clave = cache_resultados.clave(datos, plantilla, formato, modo)
+                previo = cache_resultados.obtener(clave)
+
+        vincular = (duplicados or MODO_DUPLICADOS) == "vincular" and formato == "codificado"
+        if previo is not None and vincular:
+            resultado = previo.resultado
+            return _responder({
+                **(resumir_resultado(resultado) if resumen else resultado),
+                "id": previo.inspeccion_id,
+                "duplicado_de": previo.inspeccion_id,
+                "alerta_info": None
+            })
+
+        if previo is not None:
+            resultado = {**previo.resultado, "duplicado_de": previo.inspeccion_id}
+        else:
+            # Ejecutar análisis en el ejecutor, con control de admisión y plazo
+            inicio_analisis = time.perf_counter()
+            resultado = await control_admision.ejecutar(
+                analizador, *argumentos, plantilla=plantilla, modo=modo, medir=True
+            )
+
+            # Lo que no midió el trabajador es espera en la cola del ejecutor
+            etapas_analisis = resultado.pop("tiempos", {})
+            crono.agregar(etapas_analisis)
+            crono.sumar("cola", max(
+                0.0, (time.perf_counter() - inicio_analisis) * 1000 - sum(etapas_analisis.values())
+            ))
 
         # Validación de errores
         if resultado.get("status") == "ERROR":
             raise HTTPException(status_code=400, detail=resultado["mensaje"])
 
+        # Fotograma vacío, saturado o desenfocado: se responde sin guardarlo
+        if registrar_descarte(resultado):
+            return _responder(resumir_resultado(resultado) if resumen else resultado)
+
         # Guardar resultado en SQLite
-        guardar_inspeccion(
-            resultado=resultado["status"],
-            max_distancia=resultado["max_distancia"],
-            puntos_defectuosos=resultado["puntos_defectuosos"],
-        )
+        with crono.etapa("guardar"):
+            nueva = await ejecutar_en_hilo(
+                guardar_inspeccion,
+                resultado=resultado["status"],
+                max_distancia=resultado["max_distancia"],
+                puntos_defectuosos=resultado["puntos_defectuosos"],
+                segmentos=resultado.get("segmentos"),
+            )
+
+        if previo is None and clave is not None:
+            cache_resultados.guardar(clave, dict(resultado), nueva.id)
+
+        resultado["id"] = nueva.id
 
         # NUEVO: Verificar si se debe crear una alerta automática
-        alerta_info = AlertService.verificar_y_crear_alerta()
-        
-        # Si se creó una alerta, intentar enviar notificación por email
-        if alerta_info.get("alerta_creada"):
-            stats = alerta_info["estadisticas"]
-            email_enviado = EmailService.enviar_alerta_defectos(
-                porcentaje=stats["porcentaje_defectos"],
-                total_inspecciones=stats["total_inspecciones"],
-                total_rechazados=stats["total_rechazados"],
-                recomendacion=alerta_info["recomendacion"]
-            )
-            
-            # Marcar alerta como notificada si el email se envió correctamente
-            if email_enviado:
-                AlertService.marcar_alerta_como_notificada(alerta_info["alerta_id"])
+        alerta_info = await ejecutar_en_hilo(procesar_alerta, crono)
         
         # Agregar información de alerta a la respuesta
         resultado["alerta_info"] = alerta_info
 
-        return JSONResponse(content=resultado)
+        if resumen:
+            resultado = resumir_resultado(resultado)
+
+        return _responder(resultado)
 
+    except ColaLlenaError as e:
+        raise HTTPException(
+            status_code=429, detail=str(e), headers={"Retry-After": str(REINTENTAR_TRAS)}
+        )
+    except PlazoExcedidoError as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(REINTENTAR_TRAS)}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if temporal is not None:
+            os.remove(temporal)
+
+
+# ---------------------------------------------------------
+# ENDPOINT: INSPECCIÓN DE VARIAS IMÁGENES EN UNA PETICIÓN
+# ---------------------------------------------------------
+
+@app.post("/api/inspeccionar/multiple")
+async def inspeccionar_multiple(
+    files: List[UploadFile] = File(...),
+    plantilla: Optional[str] = Query(None, description="Nombre de la plantilla (por defecto 'ideal')"),
+    modo: Optional[str] = Query(None, description="'contorno', 'area' o 'ambos'"),
+    resumen: bool = Query(False, description="Responder sin puntos ni segmentos, solo totales")
+):
+    """
+    Recibe varias imágenes en una sola petición multipart.
+    Las analiza en paralelo en el ejecutor de análisis, guarda todas las
+    inspecciones válidas en una sola transacción y verifica la alerta
+    una única vez para todo el lote. Los resultados se devuelven por
+    archivo y en el mismo orden de entrada.
+
+    El lote pasa por el mismo control de admisión que /api/inspeccionar:
+    entra entero o se rechaza con 429 (413 si nunca cabría en la cola).
+    """
+    if len(files) > control_admision.capacidad:
+        raise HTTPException(
+            status_code=413,
+            detail=f"El lote supera el máximo de {control_admision.capacidad} imágenes por petición."
+        )
+
+    try:
+        imagenes = [await f.read() for f in files]
+
+        # Analizar en paralelo, con control de admisión y plazo
+        resultados = await control_admision.ejecutar_lote(
+            analizar_molde, imagenes, plantilla=plantilla, modo=modo
+        )
+
+        # Guardar solo los análisis válidos (ni errores ni fotogramas
+        # descartados), todos en una transacción
+        guardar = [r.get("status") != "ERROR" and not registrar_descarte(r) for r in resultados]
+        validos = [r for r, g in zip(resultados, guardar) if g]
+        guardadas = iter(await ejecutar_en_hilo(guardar_inspecciones, validos))
+
+        respuesta = []
+        for archivo, resultado, guardado in zip(files, resultados, guardar):
+            item = {
+                "archivo": archivo.filename,
+                **(resumir_resultado(resultado) if resumen else resultado)
+            }
+            if guardado:
+                item["id"] = next(guardadas).id
+            respuesta.append(item)
+
+        # Una sola verificación de alerta por lote
+        alerta_info = await ejecutar_en_hilo(procesar_alerta) if validos else None
+
+        return JSONResponse(content={
+            "total": len(respuesta),
+            "resultados": respuesta,
+            "alerta_info": alerta_info
+        })
+
+    except ColaLlenaError as e:
+        raise HTTPException(
+            status_code=429, detail=str(e), headers={"Retry-After": str(REINTENTAR_TRAS)}
+        )
+    except PlazoExcedidoError as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(REINTENTAR_TRAS)}
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ---------------------------------------------------------
+# ENDPOINT: INSPECCIÓN CONTINUA POR WEBSOCKET (CÁMARAS)
+# ---------------------------------------------------------
+
+@app.websocket("/ws/inspeccionar")
+async def inspeccionar_transmision(
+    websocket: WebSocket,
+    plantilla: Optional[str] = None,
+    formato: Optional[str] = None,
+    ancho: Optional[int] = None,
+    alto: Optional[int] = None,
+    politica: Optional[str] = None,
+    modo: Optional[str] = None,
+    resumen: bool = False
+):
+    """
+    Recibe un flujo de fotogramas (un mensaje binario por fotograma) y
+    devuelve un resultado por fotograma, en orden, por el mismo socket.
+
+    Parámetros de la URL:
+        formato: vacío para PNG/JPEG, o "crudo"/"bits" junto con ancho y alto
+        politica: "descartar_antiguos", "descartar_nuevos" o "bloquear"
+                  (qué hacer si el análisis no da abasto)
+        plantilla, modo, resumen: igual que en /api/inspeccionar
+
+    Los resultados se guardan en micro-lotes; ver modules/transmision.py.
+    """
+    politica = politica or POLITICA_DESCARTE_WS
+
+    if politica not in POLITICAS_DESCARTE:
+        await websocket.close(code=1008, reason=f"Política desconocida: {politica}")
+        return
+
+    if formato in ("crudo", "bits") and (not ancho or not alto):
+        await websocket.close(code=1008, reason="Los fotogramas crudos requieren ancho y alto.")
+        return
+
+    sesion = SesionTransmision(
+        websocket,
+        analizador=crear_analizador(formato, ancho, alto, plantilla, modo),
+        politica=politica,
+        resumen=resumen,
+        procesar_alerta=procesar_alerta,
+    )
+    await sesion.ejecutar()
+
+
+# ---------------------------------------------------------
+# ENDPOINT: PLANTILLAS DISPONIBLES
+# ---------------------------------------------------------
+
+@app.get("/api/plantillas")
+def listar_plantillas():
+    """
+    Lista las plantillas disponibles (backend/plantillas/<nombre>.png más
+    la plantilla por defecto) y las que ya están compiladas en memoria.
+    """
+    return {
+        "disponibles": registro_plantillas.nombres(),
+        "cargadas": registro_plantillas.cargadas()
+    }
+
+
+@app.post("/api/plantillas/{nombre}/recargar")
+def recargar_plantilla(nombre: str):
+    """
+    Vuelve a compilar una plantilla desde su PNG y la publica en el
+    almacén compartido: todos los procesos pasan a la nueva versión en su
+    siguiente análisis (no solo el que atiende esta petición).
+    """
+    try:
+        plantilla = registro_plantillas.recargar(nombre)
+    except PlantillaNoEncontradaError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return {
+        "nombre": plantilla.nombre,
+        "generacion": plantilla.generacion,
+        "hash_origen": plantilla.hash_origen,
+    }
+
+
 # ---------------------------------------------------------
 # ENDPOINT: LISTAR TODAS LAS INSPECCIONES
 # ---------------------------------------------------------
 
+# Parámetros de paginación comunes a los listados de inspecciones
+_LIMITE = Query(None, ge=1, description="Inspecciones por página (por defecto LIMITE_PAGINA)")
+_CURSOR = Query(None, description="'siguiente_cursor' de la página anterior")
+_DESDE_ID = Query(None, description="Continuar después de la inspección con este id")
+
+
+def _paginado(limit, cursor, desde_id) -> bool:
+    """Sin limit, cursor ni desde_id los listados devuelven todo, sin paginar."""
+    return limit is not None or bool(cursor) or desde_id is not None
+
+
+def _pagina(limit, cursor, desde_id, categoria=None):
+    """
+    Página de inspecciones; un cursor o desde_id inválidos son un 400.
+    Sin parámetros de paginación, todas (y el cursor None).
+    """
+    if not _paginado(limit, cursor, desde_id):
+        return listar_inspecciones(categoria), None
+
+    try:
+        if categoria:
+            return filtrar_por_categoria(categoria, limit, cursor, desde_id)
+        return listar_pagina(limit, cursor, desde_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.get("/api/registros")
-def obtener_registros():
+def obtener_registros(
+    resumen: bool = False,
+    limit: Optional[int] = _LIMITE,
+    cursor: Optional[str] = _CURSOR,
+    desde_id: Optional[int] = _DESDE_ID
+):
     """
-    Lista todas las inspecciones guardadas en SQLite.
+    Lista las inspecciones guardadas en SQLite, de la más reciente a la más
+    antigua. Sin parámetros las devuelve todas, como siempre. Con ?limit
+    (o ?cursor / ?desde_id) devuelve una página y "siguiente_cursor": la
+    siguiente se pide con ?cursor=<siguiente_cursor> (null en la última).
+    Con ?resumen=true no se envían puntos ni segmentos, solo sus totales.
     """
-    registros = listar_inspecciones()
+    registros, siguiente_cursor = _pagina(limit, cursor, desde_id)
 
     respuesta = []
     for r in registros:
@@ -158,16 +590,25 @@ def obtener_registros():
             "id": r.id,
             "resultado": r.resultado,
             "max_distancia": r.max_distancia,
-            "puntos_defectuosos": json.loads(r.puntos_defectuosos),
+            **detalle_defectos(r, resumen),
             "categoria": r.categoria,
             "fecha": r.fecha.isoformat()
         })
 
-    return {"inspecciones": respuesta}
+    if not _paginado(limit, cursor, desde_id):
+        return {"inspecciones": respuesta}
+
+    return {"inspecciones": respuesta, "siguiente_cursor": siguiente_cursor}
 
 
 @app.get("/api/defectos")
-def obtener_defectos_por_categoria(categoria: str = None):
+def obtener_defectos_por_categoria(
+    categoria: str = None,
+    resumen: bool = False,
+    limit: Optional[int] = _LIMITE,
+    cursor: Optional[str] = _CURSOR,
+    desde_id: Optional[int] = _DESDE_ID
+):
     """
     Filtro de inspecciones por categoría.
     Ejemplo:
@@ -175,12 +616,12 @@ def obtener_defectos_por_categoria(categoria: str = None):
 
     - Si se pasa 'categoria', filtra por esa categoría.
     - Si no se pasa, devuelve todas las inspecciones.
+    - Con 'resumen=true' solo se envían los totales de puntos y segmentos.
+    - Paginado como /api/registros (sin parámetros, todas); con paginación
+      'total' es el número de esta página.
     """
 
-    if categoria:
-        registros = filtrar_por_categoria(categoria)
-    else:
-        registros = listar_inspecciones()
+    registros, siguiente_cursor = _pagina(limit, cursor, desde_id, categoria)
 
     respuesta = []
     for r in registros:
@@ -189,7 +630,7 @@ def obtener_defectos_por_categoria(categoria: str = None):
             "resultado": r.resultado,
             "categoria": r.categoria,
             "max_distancia": r.max_distancia,
-            "puntos_defectuosos": json.loads(r.puntos_defectuosos),
+            **detalle_defectos(r, resumen),
             "fecha": r.fecha.isoformat()
         })
 
@@ -200,17 +641,22 @@ def obtener_defectos_por_categoria(categoria: str = None):
             if categoria
             else "No se encontraron inspecciones registradas."
         )
-        return {
+        contenido = {
             "inspecciones": [],
             "total": 0,
             "mensaje": mensaje
         }
+    else:
+        # Si sí hay resultados, devolvemos también el total
+        contenido = {
+            "inspecciones": respuesta,
+            "total": len(respuesta)
+        }
 
-    # Si sí hay resultados, devolvemos también el total
-    return {
-        "inspecciones": respuesta,
-        "total": len(respuesta)
-    }
+    if _paginado(limit, cursor, desde_id):
+        contenido["siguiente_cursor"] = siguiente_cursor
+
+    return contenido
 
 
 @app.get("/api/estadisticas/categorias")
@@ -228,12 +674,20 @@ def estadisticas_categorias():
 # ---------------------------------------------------------
 
 @app.get("/api/alertas/estadisticas")
-def obtener_estadisticas():
+def obtener_estadisticas(
+    ventana: Optional[int] = Query(None, ge=1, description="Últimas N inspecciones (por defecto CALCULATION_WINDOW)")
+):
     """
-    Obtiene estadísticas actuales de calidad y porcentaje de defectos.
+    Obtiene estadísticas actuales de calidad y porcentaje de defectos,
+    más el porcentaje de cada ventana configurada (VENTANAS_DEFECTOS).
+    Se calculan en memoria (ver ventana_defectos para varios workers).
     """
     try:
-        stats = AlertService.calcular_porcentaje_defectos()
+        if ventana:
+            stats = AlertService.calcular_porcentaje_defectos(ventana)
+        else:
+            stats = AlertService.calcular_porcentaje_defectos()
+        stats["por_ventana"] = AlertService.porcentajes_por_ventana()
         return JSONResponse(content=stats)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -260,20 +714,7 @@ def verificar_alertas_manual():
     Verifica manualmente si se debe crear una alerta (útil para pruebas).
     """
     try:
-        alerta_info = AlertService.verificar_y_crear_alerta()
-        
-        # Si se creó una alerta, enviar notificación
-        if alerta_info.get("alerta_creada"):
-            stats = alerta_info["estadisticas"]
-            email_enviado = EmailService.enviar_alerta_defectos(
-                porcentaje=stats["porcentaje_defectos"],
-                total_inspecciones=stats["total_inspecciones"],
-                total_rechazados=stats["total_rechazados"],
-                recomendacion=alerta_info["recomendacion"]
-            )
-            
-            if email_enviado:
-                AlertService.marcar_alerta_como_notificada(alerta_info["alerta_id"])
+        alerta_info = procesar_alerta()
         
         return JSONResponse(content=alerta_info)
     except Exception as e:
@@ -310,6 +751,20 @@ def probar_email():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ---------------------------------------------------------
+# MÉTRICAS INTERNAS
+# ---------------------------------------------------------
+
+@app.get("/api/metricas")
+def obtener_metricas():
+    """
+    Contadores e indicadores del servicio, como la profundidad de la
+    cola de análisis (cola_analisis_en_espera), y los histogramas de
+    latencia por etapa de /api/inspeccionar (inspeccionar.<etapa>).
+    """
+    return metricas.obtener_metricas()
+
+
 # ---------------------------------------------------------
 # HEALTH CHECK
 # ---------------------------------------------------------
@@ -324,6 +779,18 @@ def health_check():
     }
 
 
+@app.get("/api/listo")
+def readiness_check():
+    """
+    Indica si el servidor está listo para inspeccionar: plantilla cargada y
+    análisis precalentado (503 mientras no lo esté). Incluye el resultado
+    de la prueba SMTP, que no impide estar listo, y con MEDIR_ARRANQUE=1
+    los tiempos de arranque.
+    """
+    resumen = estado_arranque.resumen()
+    return JSONResponse(content=resumen, status_code=200 if resumen["listo"] else 503)
+
+
 # ---------------------------------------------------------
 # EJECUCIÓN MANUAL (opcional)
 # ---------------------------------------------------------
@@ -357,8 +824,13 @@ def clasificar_defecto_api(datos: DatosClasificacion):
 
 
 @app.get("/api/inspecciones/completas")
-def obtener_inspecciones_completas():
-    registros = listar_inspecciones()
+def obtener_inspecciones_completas(
+    resumen: bool = False,
+    limit: Optional[int] = _LIMITE,
+    cursor: Optional[str] = _CURSOR,
+    desde_id: Optional[int] = _DESDE_ID
+):
+    registros, siguiente_cursor = _pagina(limit, cursor, desde_id)
 
     respuesta = []
     for r in registros:
@@ -367,46 +839,49 @@ def obtener_inspecciones_completas():
             "resultado": r.resultado,
             "categoria": r.categoria,
             "max_distancia": r.max_distancia,
-            "puntos_defectuosos": json.loads(r.puntos_defectuosos),
+            **detalle_defectos(r, resumen),
             "fecha": r.fecha.isoformat()
         })
 
-    return {
+    contenido = {
         "total": len(respuesta),
         "inspecciones": respuesta
     }
 
-@app.get("/api/exportar")
-def exportar_inspecciones():
-    """
-    Exporta todas las inspecciones a un CSV descargable.
-    """
-    registros = listar_inspecciones()  # 👈 ya tienes esta función importada
+    if _paginado(limit, cursor, desde_id):
+        contenido["siguiente_cursor"] = siguiente_cursor
 
-    output = StringIO()
-    writer = csv.writer(output)
+    return contenido
 
-    # Cabeceras del CSV
-    writer.writerow(["ID", "Resultado", "Categoria", "Max Distancia", "Fecha"])
+# Parámetros comunes a las exportaciones
+_FORMATO = Query("csv", description="'csv' o 'ndjson'")
+_GZIP = Query(False, description="Comprimir la descarga (.gz)")
 
-    # Filas
-    for r in registros:
-        writer.writerow([
-            r.id,
-            r.resultado,
-            r.categoria,
-            r.max_distancia,
-            r.fecha.isoformat()
-        ])
 
-    output.seek(0)
+def _descarga(nombre: str, formato: str, comprimir: bool, **opciones):
+    """StreamingResponse de exportacion.exportar; un formato inválido es un 400."""
+    try:
+        contenido = exportar(formato, comprimir, **opciones)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    tipo, extension = tipo_y_extension(formato, comprimir)
     return StreamingResponse(
-        output,
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=inspecciones.csv"}
+        contenido,
+        media_type=tipo,
+        headers={"Content-Disposition": f"attachment; filename={nombre}.{extension}"}
     )
 
+
+@app.get("/api/exportar")
+def exportar_inspecciones(formato: str = _FORMATO, gzip: bool = _GZIP):
+    """
+    Exporta todas las inspecciones a un CSV (o NDJSON) descargable, en
+    streaming: se envía por bloques a medida que se lee de la base.
+    """
+    return _descarga("inspecciones", formato, gzip)
+
+
 @app.delete("/api/inspecciones/{id}")
 def eliminar_inspeccion_api(id: int = Path(...)):
     """
@@ -417,6 +892,9 @@ def eliminar_inspeccion_api(id: int = Path(...)):
     if resultado is None:
         return {"mensaje": "Inspección no encontrada"}
 
+    # Un duplicado ya no puede vincularse a una inspección eliminada
+    cache_resultados.invalidar_inspeccion(id)
+
     return {"mensaje": "Inspección eliminada correctamente"}
 
 
@@ -446,7 +924,7 @@ def api_listar_lotes():
             "inspector": l.inspector,
             "estado": l.estado,
             "fecha": l.fecha.isoformat(),
-            "total_inspecciones": len(l.inspecciones)
+            "total_inspecciones": l.total_inspecciones
         })
 
     return {"lotes": respuesta}
@@ -459,13 +937,13 @@ def api_obtener_lote(id_lote: int):
         raise HTTPException(status_code=404, detail="Lote no encontrado")
 
     inspecciones = []
-    for ins in lote.inspecciones:
+    for id_, resultado, categoria, max_distancia, fecha in listar_inspecciones_de_lote(id_lote):
         inspecciones.append({
-            "id": ins.id,
-            "resultado": ins.resultado,
-            "categoria": ins.categoria,
-            "max_distancia": ins.max_distancia,
-            "fecha": ins.fecha.isoformat()
+            "id": id_,
+            "resultado": resultado,
+            "categoria": categoria,
+            "max_distancia": max_distancia,
+            "fecha": fecha.isoformat()
         })
 
     return {
@@ -500,41 +978,27 @@ from modules.crud import listar_inspecciones  # ya lo tienes arriba
 
 
 @app.get("/api/lotes/{id_lote}/exportar")
-def exportar_lote(id_lote: int):
+def exportar_lote(id_lote: int, formato: str = _FORMATO, gzip: bool = _GZIP):
     """
-    Exporta a CSV todas las inspecciones asociadas a un lote específico.
+    Exporta a CSV (o NDJSON) todas las inspecciones asociadas a un lote
+    específico, en streaming como /api/exportar.
     """
-    lote = obtener_lote(id_lote)
+    tiene_inspecciones = lote_tiene_inspecciones(id_lote)
 
-    if not lote:
+    if tiene_inspecciones is None:
         raise HTTPException(status_code=404, detail="Lote no encontrado")
 
-    if not lote.inspecciones:
+    if not tiene_inspecciones:
         raise HTTPException(status_code=404, detail="Ese lote no tiene inspecciones asociadas")
 
-    output = StringIO()
-    writer = csv.writer(output)
-
-    # Cabeceras del CSV
-    writer.writerow(["ID Inspección", "Resultado", "Categoria", "Max Distancia", "Fecha"])
-
-    # Filas: todas las inspecciones del lote
-    for ins in lote.inspecciones:
-        writer.writerow([
-            ins.id,
-            ins.resultado,
-            ins.categoria,
-            ins.max_distancia,
-            ins.fecha.isoformat()
-        ])
+    return _descarga(
+        f"lote_{id_lote}", formato, gzip, lote_id=id_lote,
+        cabeceras=("ID Inspección", "Resultado", "Categoria", "Max Distancia", "Fecha")
+    )
 
-    output.seek(0)
 
-    return StreamingResponse(
-        output,
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename=lote_{id_lote}.csv"}
-    )
+if MEDIR_ARRANQUE:
+    estado_arranque.marcar("importacion_main")
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
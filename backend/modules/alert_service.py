@@ -6,8 +6,9 @@ Calcula el porcentaje de fallas y dispara notificaciones cuando supera el umbral
 
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from .db import SessionLocal
+from .db import SessionLocal, escritura
 from .models import Inspeccion, Alert
+from .ventana_defectos import VentanaDefectos
 import os
 from dotenv import load_dotenv
 
@@ -18,6 +19,24 @@ load_dotenv()
 ALERT_THRESHOLD = float(os.getenv("ALERT_THRESHOLD", "5.0"))  # 5% por defecto
 CALCULATION_WINDOW = int(os.getenv("CALCULATION_WINDOW", "100"))  # Últimas 100 inspecciones
 
+# Otras ventanas con porcentaje incremental en memoria (ver ventana_defectos)
+VENTANAS_DEFECTOS = [
+    int(v) for v in os.getenv("VENTANAS_DEFECTOS", "100,500,1000").split(",") if v.strip()
+]
+
+# "1" si varios procesos escriben en la base (workers de uvicorn): antes de
+# calcular el porcentaje la ventana comprueba el max(id) de SQLite y se pone
+# al día si cambió. Por defecto ("0") vive solo en memoria
+VENTANA_DEFECTOS_SINCRONIZAR = os.getenv("VENTANA_DEFECTOS_SINCRONIZAR", "0") == "1"
+VENTANA_DEFECTOS_RESIEMBRA_S = float(os.getenv("VENTANA_DEFECTOS_RESIEMBRA_S", "60"))
+
+# Veredictos recientes: crud los registra al guardar
+ventana_defectos = VentanaDefectos(
+    VENTANAS_DEFECTOS + [CALCULATION_WINDOW],
+    sincronizar=VENTANA_DEFECTOS_SINCRONIZAR,
+    resiembra_s=VENTANA_DEFECTOS_RESIEMBRA_S,
+)
+
 
 class AlertService:
     """Servicio para gestión de alertas automáticas"""
@@ -26,6 +45,9 @@ class AlertService:
     def calcular_porcentaje_defectos(limite: int = CALCULATION_WINDOW) -> dict:
         """
         Calcula el porcentaje de defectos en las últimas N inspecciones.
+        Los veredictos se leen de ventana_defectos (ver su sincronización
+        entre procesos); solo si N supera la ventana más grande se cuentan
+        en SQLite.
         
         Args:
             limite: Número de inspecciones a analizar (por defecto 100)
@@ -33,46 +55,65 @@ class AlertService:
         Returns:
             dict con estadísticas de calidad
         """
-        db = SessionLocal()
-        
-        try:
-            # Obtener las últimas N inspecciones
-            inspecciones = (
-                db.query(Inspeccion)
-                .order_by(Inspeccion.fecha.desc())
-                .limit(limite)
-                .all()
-            )
-            
-            if not inspecciones:
-                return {
-                    "total_inspecciones": 0,
-                    "total_rechazados": 0,
-                    "porcentaje_defectos": 0.0,
-                    "supera_umbral": False
-                }
-            
-            # Contar rechazados
-            total = len(inspecciones)
-            rechazados = sum(1 for i in inspecciones if i.resultado == "RECHAZADO")
-            
-            # Calcular porcentaje
-            porcentaje = (rechazados / total) * 100 if total > 0 else 0.0
-            
+        ventana_defectos.actualizar()
+        conteo = ventana_defectos.contar(limite)
+
+        if conteo is None:
+            # Ventana mayor que el anillo: se cuenta en la base (solo la columna)
+            db = SessionLocal()
+            try:
+                resultados = (
+                    db.query(Inspeccion.resultado)
+                    .order_by(Inspeccion.fecha.desc())
+                    .limit(limite)
+                    .all()
+                )
+            finally:
+                db.close()
+            conteo = (len(resultados), sum(1 for (r,) in resultados if r == "RECHAZADO"))
+
+        total, rechazados = conteo
+
+        if not total:
             return {
-                "total_inspecciones": total,
-                "total_rechazados": rechazados,
-                "total_aprobados": total - rechazados,
-                "porcentaje_defectos": round(porcentaje, 2),
-                "supera_umbral": porcentaje > ALERT_THRESHOLD,
-                "umbral_configurado": ALERT_THRESHOLD
+                "total_inspecciones": 0,
+                "total_rechazados": 0,
+                "porcentaje_defectos": 0.0,
+                "supera_umbral": False
             }
-            
-        finally:
-            db.close()
+
+        # Calcular porcentaje
+        porcentaje = (rechazados / total) * 100 if total > 0 else 0.0
+
+        return {
+            "total_inspecciones": total,
+            "total_rechazados": rechazados,
+            "total_aprobados": total - rechazados,
+            "porcentaje_defectos": round(porcentaje, 2),
+            "supera_umbral": porcentaje > ALERT_THRESHOLD,
+            "umbral_configurado": ALERT_THRESHOLD
+        }
+    
+    
+    @staticmethod
+    def porcentajes_por_ventana() -> dict:
+        """
+        Porcentaje de defectos de cada ventana configurada (en memoria;
+        no se pone al día con la base: llamar antes a
+        calcular_porcentaje_defectos).
+        
+        Returns:
+            dict {tamaño de ventana: porcentaje}
+        """
+        porcentajes = {}
+        for n in ventana_defectos.ventanas:
+            total, rechazados = ventana_defectos.contar(n)
+            porcentajes[n] = round(rechazados / total * 100, 2) if total else 0.0
+        return porcentajes
     
     
     @staticmethod
+    @escritura
     def verificar_y_crear_alerta() -> dict:
         """
         Verifica si se debe crear una alerta y la registra si es necesario.
@@ -191,6 +232,7 @@ class AlertService:
     
     
     @staticmethod
+    @escritura
     def marcar_alerta_como_notificada(alerta_id: int) -> bool:
         """
         Marca una alerta como notificada después de enviar el email.
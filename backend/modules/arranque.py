@@ -0,0 +1,98 @@
+# backend/modules/arranque.py
+"""
+Estado del arranque del servicio y medición de los tiempos de inicio.
+
+El evento de inicio solo hace lo imprescindible para atender peticiones:
+tablas, migraciones y plantilla por defecto. Lo lento pasa a segundo plano:
+- La prueba de conexión SMTP, que puede tardar hasta el timeout.
+- El precalentamiento del análisis, que importa OpenCV de forma perezosa
+  y arranca los trabajadores.
+El resultado de cada tarea se consulta en /api/listo.
+
+Con MEDIR_ARRANQUE=1 también se registran y se imprimen el tiempo de
+importación de main, la duración del evento de inicio y la latencia de la
+primera petición (ver benchmarks/bench_arranque.py).
+"""
+
+import os
+import threading
+import time
+from typing import Callable
+
+# Registrar e imprimir los tiempos de arranque y de la primera petición
+MEDIR_ARRANQUE = os.getenv("MEDIR_ARRANQUE", "0") == "1"
+
+
+class EstadoArranque:
+    """
+    Tareas de arranque en segundo plano y tiempos medidos.
+
+    Una tarea `requerida` que no terminó bien deja el servicio como no
+    listo. Las demás, como SMTP, solo se informan.
+    """
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.tiempos = {}
+        self._tareas = {}
+        self._lock = threading.Lock()
+
+    def marcar(self, nombre: str, ms: float = None):
+        """Guarda un tiempo en ms (por defecto, el transcurrido desde `inicio`)."""
+        if ms is None:
+            ms = (time.perf_counter() - self.inicio) * 1000
+
+        with self._lock:
+            self.tiempos[nombre] = round(ms, 2)
+
+    def registrar(self, nombre: str, correcto: bool, detalle: str = None, requerida: bool = True):
+        """Registra el resultado de una tarea hecha sin lanzar() (p. ej. síncrona)."""
+        with self._lock:
+            self._tareas[nombre] = {
+                "estado": "ok" if correcto else "error",
+                "requerida": requerida,
+                "detalle": detalle,
+            }
+
+    def lanzar(self, nombre: str, funcion: Callable[[], bool], requerida: bool = True):
+        """
+        Ejecuta `funcion` en un hilo en segundo plano. Si devuelve algo
+        falso o lanza una excepción, la tarea queda en "error".
+        """
+        with self._lock:
+            self._tareas[nombre] = {"estado": "pendiente", "requerida": requerida, "detalle": None}
+
+        def _ejecutar():
+            inicio = time.perf_counter()
+            try:
+                correcto, detalle = bool(funcion()), None
+            except Exception as e:
+                correcto, detalle = False, str(e)
+
+            with self._lock:
+                self._tareas[nombre].update(
+                    estado="ok" if correcto else "error",
+                    detalle=detalle,
+                    ms=round((time.perf_counter() - inicio) * 1000, 2),
+                )
+
+        threading.Thread(target=_ejecutar, name=f"arranque-{nombre}", daemon=True).start()
+
+    def listo(self) -> bool:
+        """True si todas las tareas requeridas terminaron bien."""
+        with self._lock:
+            return all(t["estado"] == "ok" for t in self._tareas.values() if t["requerida"])
+
+    def resumen(self) -> dict:
+        with self._lock:
+            tareas = {nombre: dict(tarea) for nombre, tarea in self._tareas.items()}
+            tiempos = dict(self.tiempos)
+
+        return {
+            "listo": all(t["estado"] == "ok" for t in tareas.values() if t["requerida"]),
+            "tareas": tareas,
+            "tiempos": tiempos,
+        }
+
+
+estado_arranque = EstadoArranque()
@@ -0,0 +1,123 @@
+# backend/modules/cache_resultados.py
+"""
+Caché de resultados de análisis por contenido.
+
+Los operadores y los clientes que reintentan suelen reenviar la misma
+imagen. La clave es el hash de los bytes recibidos junto con la plantilla
+(y su versión), el formato del fotograma y TOLERANCIA_MAXIMA, así que un
+reenvío idéntico obtiene el resultado sin volver a analizar la imagen.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from . import analisis
+from . import metricas
+from .plantillas import registro_plantillas, PLANTILLA_POR_DEFECTO
+
+# Límites de la caché (se expulsan primero las entradas menos usadas)
+CACHE_RESULTADOS_MAX_ENTRADAS = int(os.getenv("CACHE_RESULTADOS_MAX_ENTRADAS", "1024"))
+CACHE_RESULTADOS_MAX_BYTES = int(os.getenv("CACHE_RESULTADOS_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Qué hacer con una imagen repetida:
+#   "registrar" → se guarda una inspección nueva sin volver a analizar
+#   "vincular"  → no se crea otra inspección; se devuelve la original.
+#                 Solo para imágenes codificadas (PNG/JPEG): las máscaras
+#                 crudas o "bits" de dos piezas buenas distintas suelen ser
+#                 idénticas byte a byte, y vincularlas dejaría piezas sin
+#                 registrar (y los porcentajes de defectos falseados)
+MODO_DUPLICADOS = os.getenv("MODO_DUPLICADOS", "registrar")
+
+
+class EntradaCache(NamedTuple):
+    resultado: dict
+    inspeccion_id: int
+    tamano: int
+
+
+class CacheResultados:
+    """LRU acotada por número de entradas y por tamaño aproximado en bytes."""
+
+    def __init__(self, max_entradas: int, max_bytes: int):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.bytes_usados = 0
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def clave(
+        datos: bytes, plantilla: str = None, formato: str = "codificado", modo: str = None
+    ) -> str:
+        """Clave de contenido: hash de la imagen + plantilla + tolerancia + modo."""
+        nombre = plantilla or PLANTILLA_POR_DEFECTO
+        digest = hashlib.sha256(datos).hexdigest()
+
+        return "|".join([
+            digest,
+            formato,
+            nombre,
+            registro_plantillas.version(nombre),
+            str(analisis.TOLERANCIA_MAXIMA),
+            modo or analisis.MODO_ANALISIS,
+        ])
+
+    def obtener(self, clave: str) -> Optional[EntradaCache]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+
+            if entrada is None:
+                metricas.incrementar("cache_resultados_fallos")
+                return None
+
+            self._entradas.move_to_end(clave)
+
+        metricas.incrementar("cache_resultados_aciertos")
+        return entrada
+
+    def guardar(self, clave: str, resultado: dict, inspeccion_id: int):
+        """Guarda un resultado de análisis (sin alerta_info ni id)."""
+        tamano = len(clave) + len(json.dumps(resultado))
+
+        if tamano > self.max_bytes:
+            return
+
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self.bytes_usados -= anterior.tamano
+
+            self._entradas[clave] = EntradaCache(resultado, inspeccion_id, tamano)
+            self.bytes_usados += tamano
+
+            while (
+                len(self._entradas) > self.max_entradas
+                or self.bytes_usados > self.max_bytes
+            ):
+                _, expulsada = self._entradas.popitem(last=False)
+                self.bytes_usados -= expulsada.tamano
+
+    def invalidar_inspeccion(self, inspeccion_id: int):
+        """Quita las entradas que apuntan a una inspección eliminada."""
+        with self._lock:
+            for clave in [c for c, e in self._entradas.items() if e.inspeccion_id == inspeccion_id]:
+                self.bytes_usados -= self._entradas.pop(clave).tamano
+
+    def vaciar(self):
+        """Quita todas las entradas."""
+        with self._lock:
+            self._entradas.clear()
+            self.bytes_usados = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+cache_resultados = CacheResultados(CACHE_RESULTADOS_MAX_ENTRADAS, CACHE_RESULTADOS_MAX_BYTES)
+
+metricas.registrar_indicador("cache_resultados_entradas", lambda: len(cache_resultados))
+metricas.registrar_indicador("cache_resultados_bytes", lambda: cache_resultados.bytes_usados)
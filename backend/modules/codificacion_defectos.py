@@ -0,0 +1,210 @@
+# backend/modules/codificacion_defectos.py
+"""
+Codificación compacta de los puntos defectuosos.
+
+Una pieza con mucha rebaba produce miles de puntos; guardarlos como JSON
+infla database.db y cada respuesta de listado. En su lugar se guardan:
+
+- Segmentos: tramos consecutivos del contorno fuera de tolerancia, cada uno
+  con sus extremos, número de puntos, bounding box y distancia máxima.
+- Opcionalmente, los puntos crudos en un blob int16 codificado por deltas
+  (el primer punto absoluto y después la diferencia con el anterior):
+  4 bytes por punto frente a ~12 del JSON.
+"""
+
+import json
+import os
+
+import numpy as np
+
+# "blob" guarda los puntos crudos codificados; "no" guarda solo segmentos
+GUARDAR_PUNTOS = os.getenv("GUARDAR_PUNTOS", "blob")
+
+# Solo para filas antiguas (sin distancias ni orden del contorno): dos
+# puntos consecutivos más separados que esto abren un segmento nuevo.
+SALTO_MAXIMO_SEGMENTO = 32
+
+_INT16_MAX = np.iinfo(np.int16).max
+
+
+# ---------------------------------------------------------
+# BLOB DE PUNTOS (int16, codificado por deltas)
+# ---------------------------------------------------------
+
+def codificar_puntos(puntos) -> bytes:
+    """
+    Codifica una lista/array Nx2 de puntos (x, y) en un blob int16.
+
+    Raises:
+        ValueError: Si alguna coordenada no cabe en int16
+    """
+    arr = np.asarray(puntos, dtype=np.int32).reshape(-1, 2)
+
+    if arr.size == 0:
+        return b""
+
+    if arr.min() < 0 or arr.max() > _INT16_MAX:
+        raise ValueError("Coordenadas fuera del rango int16.")
+
+    deltas = np.empty_like(arr)
+    deltas[0] = arr[0]
+    deltas[1:] = np.diff(arr, axis=0)
+
+    return deltas.astype("<i2").tobytes()
+
+
+def decodificar_puntos(blob: bytes) -> list:
+    """Inverso de codificar_puntos: devuelve [[x, y], ...]."""
+    if not blob:
+        return []
+
+    deltas = np.frombuffer(blob, dtype="<i2").reshape(-1, 2).astype(np.int32)
+    return np.cumsum(deltas, axis=0).tolist()
+
+
+# ---------------------------------------------------------
+# SEGMENTOS
+# ---------------------------------------------------------
+
+def _segmento(pts, distancias=None) -> dict:
+    minimo, maximo = pts.min(axis=0), pts.max(axis=0)
+
+    return {
+        "inicio": pts[0].tolist(),
+        "fin": pts[-1].tolist(),
+        "puntos": int(len(pts)),
+        "bbox": [int(minimo[0]), int(minimo[1]),
+                 int(maximo[0] - minimo[0] + 1), int(maximo[1] - minimo[1] + 1)],
+        "max_distancia": None if distancias is None else round(float(-distancias.min()), 2),
+    }
+
+
+def segmentos_desde_mascara(puntos, distancias, fuera) -> list:
+    """
+    Agrupa en segmentos los tramos consecutivos de un contorno cerrado
+    cuyos puntos están fuera de tolerancia.
+
+    Args:
+        puntos: Array Nx2 del contorno real, en orden
+        distancias: Distancia con signo de cada punto a la plantilla
+        fuera: Máscara booleana de puntos defectuosos
+    """
+    n = len(fuera)
+
+    if not fuera.any():
+        return []
+
+    if fuera.all():
+        tramos = [(0, n)]
+    else:
+        # Rotamos para empezar en un punto correcto: así ningún tramo
+        # cruza el cierre del contorno.
+        giro = int(np.argmin(fuera))
+        rotada = np.roll(fuera, -giro).astype(np.int8)
+        cambios = np.diff(np.concatenate(([0], rotada, [0])))
+        inicios = np.flatnonzero(cambios == 1)
+        finales = np.flatnonzero(cambios == -1)
+        tramos = [((s + giro) % n, e - s) for s, e in zip(inicios, finales)]
+
+    segmentos = []
+    for inicio, largo in tramos:
+        indices = (inicio + np.arange(largo)) % n
+        segmentos.append(_segmento(puntos[indices], distancias[indices]))
+
+    return segmentos
+
+
+def segmentos_desde_puntos(puntos, salto_maximo: int = SALTO_MAXIMO_SEGMENTO) -> list:
+    """
+    Segmentos aproximados a partir de una lista de puntos ya filtrada
+    (filas antiguas). No se conoce la distancia de cada punto, así que
+    max_distancia queda en None.
+    """
+    arr = np.asarray(puntos, dtype=np.int32).reshape(-1, 2)
+
+    if arr.size == 0:
+        return []
+
+    saltos = np.abs(np.diff(arr, axis=0)).max(axis=1) > salto_maximo
+    cortes = np.flatnonzero(saltos) + 1
+
+    return [_segmento(tramo) for tramo in np.split(arr, cortes)]
+
+
+# ---------------------------------------------------------
+# COLUMNAS DE LA TABLA inspecciones
+# ---------------------------------------------------------
+
+def columnas_defectos(puntos_defectuosos: list, segmentos: list = None) -> dict:
+    """
+    Valores de las columnas de defectos para una inspección nueva.
+
+    Si no se reciben segmentos (p. ej. inspecciones clasificadas a mano)
+    se aproximan a partir de los puntos.
+    """
+    if segmentos is None:
+        segmentos = segmentos_desde_puntos(puntos_defectuosos)
+
+    columnas = {
+        "total_puntos": len(puntos_defectuosos),
+        "total_segmentos": len(segmentos),
+        "segmentos_defecto": json.dumps(segmentos),
+        "puntos_defectuosos": None,
+        "puntos_blob": None,
+    }
+
+    if GUARDAR_PUNTOS == "blob" and puntos_defectuosos:
+        try:
+            columnas["puntos_blob"] = codificar_puntos(puntos_defectuosos)
+        except ValueError:
+            # Imágenes de más de 32767 px: se conserva el formato JSON
+            columnas["puntos_defectuosos"] = json.dumps(puntos_defectuosos)
+
+    return columnas
+
+
+def puntos_de(inspeccion) -> list:
+    """Puntos defectuosos de una inspección (blob, JSON antiguo o nada)."""
+    if inspeccion.puntos_blob:
+        return decodificar_puntos(inspeccion.puntos_blob)
+
+    if inspeccion.puntos_defectuosos:
+        return json.loads(inspeccion.puntos_defectuosos)
+
+    return []
+
+
+def segmentos_de(inspeccion) -> list:
+    """Segmentos de defecto de una inspección."""
+    if inspeccion.segmentos_defecto:
+        return json.loads(inspeccion.segmentos_defecto)
+
+    return segmentos_desde_puntos(puntos_de(inspeccion))
+
+
+def resumir_resultado(resultado: dict) -> dict:
+    """Resultado de análisis sin puntos ni segmentos, solo con sus totales."""
+    resumido = {
+        k: v for k, v in resultado.items() if k not in ("puntos_defectuosos", "segmentos")
+    }
+    resumido["total_puntos_defectuosos"] = len(resultado.get("puntos_defectuosos", []))
+    resumido["total_segmentos"] = len(resultado.get("segmentos", []))
+    return resumido
+
+
+def detalle_defectos(inspeccion, resumen: bool = False) -> dict:
+    """
+    Campos de defectos para las respuestas de listado.
+
+    Con resumen=True solo se devuelven los totales (sin decodificar puntos).
+    """
+    if resumen:
+        return {
+            "total_puntos_defectuosos": inspeccion.total_puntos,
+            "total_segmentos": inspeccion.total_segmentos,
+        }
+
+    return {
+        "puntos_defectuosos": puntos_de(inspeccion),
+        "segmentos": segmentos_de(inspeccion),
+    }
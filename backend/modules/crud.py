@@ -1,9 +1,15 @@
+from sqlalchemy import String, and_, or_, type_coerce
 from sqlalchemy.orm import Session
-from .db import SessionLocal
+from .db import SessionLocal, escritura
 from .models import Inspeccion
+from .alert_service import ventana_defectos
+import base64
+import binascii
 import json
+import os
 from datetime import datetime
 from .rules_clasificacion import clasificar_defecto
+from .codificacion_defectos import columnas_defectos
 
 
 def get_db():
@@ -15,10 +21,14 @@ def get_db():
         db.close()
 
 
-def guardar_inspeccion(resultado: str, max_distancia: float, puntos_defectuosos: list):
+@escritura
+def guardar_inspeccion(
+    resultado: str, max_distancia: float, puntos_defectuosos: list, segmentos: list = None
+):
     """
     Guarda los datos de inspección en SQLite.
     Esta versión NO recibe 'db' porque crea su propia sesión interna.
+    Los puntos se guardan en formato compacto (segmentos + blob).
     """
     db = SessionLocal()
 
@@ -26,19 +36,57 @@ def guardar_inspeccion(resultado: str, max_distancia: float, puntos_defectuosos:
         nueva = Inspeccion(
             resultado=resultado,
             max_distancia=max_distancia,
-            puntos_defectuosos=json.dumps(puntos_defectuosos),
-            fecha=datetime.now()
+            fecha=datetime.now(),
+            **columnas_defectos(puntos_defectuosos, segmentos)
         )
 
         db.add(nueva)
         db.commit()
         db.refresh(nueva)
+        ventana_defectos.registrar([nueva])
 
         return nueva
 
     finally:
         db.close()
 
+
+@escritura
+def guardar_inspecciones(resultados: list):
+    """
+    Guarda varias inspecciones en una sola transacción.
+
+    Args:
+        resultados: Lista de diccionarios devueltos por analizar_molde
+
+    Returns:
+        Lista de objetos Inspeccion en el mismo orden
+    """
+    # expire_on_commit=False: los objetos conservan id y fecha tras el commit
+    # sin volver a consultar la base por cada fila.
+    db = SessionLocal(expire_on_commit=False)
+
+    try:
+        nuevas = [
+            Inspeccion(
+                resultado=r["status"],
+                max_distancia=r["max_distancia"],
+                fecha=datetime.now(),
+                **columnas_defectos(r["puntos_defectuosos"], r.get("segmentos"))
+            )
+            for r in resultados
+        ]
+
+        db.add_all(nuevas)
+        db.commit()
+        ventana_defectos.registrar(nuevas)
+
+        return nuevas
+
+    finally:
+        db.close()
+
+@escritura
 def guardar_inspeccion_clasificada(
     resultado: str,
     max_distancia: float,
@@ -83,24 +131,28 @@ def guardar_inspeccion_clasificada(
         nueva = Inspeccion(
             resultado=resultado,
             max_distancia=max_distancia,
-            puntos_defectuosos=json.dumps(puntos_defectuosos),
             categoria=categoria,           # 👈 AQUÍ usamos la categoría
-            fecha=datetime.now()
+            fecha=datetime.now(),
+            **columnas_defectos(puntos_defectuosos)
         )
 
         db.add(nueva)
         db.commit()
         db.refresh(nueva)
+        ventana_defectos.registrar([nueva])
 
         return nueva
 
     finally:
         db.close()
 
-def listar_inspecciones():
+def listar_inspecciones(categoria: str = None):
     db = SessionLocal()
     try:
-        return db.query(Inspeccion).order_by(Inspeccion.fecha.desc()).all()
+        consulta = db.query(Inspeccion)
+        if categoria:
+            consulta = consulta.filter(Inspeccion.categoria == categoria)
+        return consulta.order_by(Inspeccion.fecha.desc()).all()
     finally:
         db.close()
 
@@ -128,21 +180,127 @@ def obtener_estadisticas_por_categoria():
         db.close()
 
 
-def filtrar_por_categoria(categoria: str):
+def filtrar_por_categoria(
+    categoria: str, limite: int = None, cursor: str = None, desde_id: int = None
+):
+    """
+    Devuelve una página de las inspecciones de una categoría específica
+    (ver listar_pagina).
+    """
+    return listar_pagina(limite, cursor, desde_id, categoria=categoria)
+
+
+# ---------------------------------------------------------
+# PAGINACIÓN POR CURSOR (keyset sobre fecha, id)
+# ---------------------------------------------------------
+
+# Tamaño de página por defecto y máximo de los listados
+LIMITE_PAGINA = int(os.getenv("LIMITE_PAGINA", "100"))
+LIMITE_PAGINA_MAXIMO = int(os.getenv("LIMITE_PAGINA_MAXIMO", "1000"))
+
+
+# La fecha tal como está guardada en SQLite (TEXT). Las filas escritas
+# desde Python llevan microsegundos ("2026-01-01 08:00:00.000000"), pero
+# las que tomaron la fecha de func.now() (CURRENT_TIMESTAMP) no
+# ("2026-01-01 08:00:00"). SQLite las compara como texto, así que el
+# cursor guarda y compara ese mismo texto: con un datetime la misma fecha
+# se escribiría con microsegundos y un empate no sería igual a sí mismo.
+_FECHA_TEXTO = type_coerce(Inspeccion.fecha, String)
+
+
+def codificar_cursor(fecha: str, id_inspeccion: int) -> str:
+    """Cursor opaco con la (fecha guardada, id) de la última inspección de una página."""
+    clave = f"{fecha}|{id_inspeccion}"
+    return base64.urlsafe_b64encode(clave.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> tuple:
+    """
+    Devuelve (fecha guardada, id).
+
+    Raises:
+        ValueError: Si el cursor no es uno devuelto por codificar_cursor
     """
-    Devuelve todas las inspecciones que pertenecen a una categoría específica.
+    try:
+        clave = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        fecha, id_inspeccion = clave.rsplit("|", 1)
+        datetime.fromisoformat(fecha)
+        return fecha, int(id_inspeccion)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Cursor de paginación no válido.")
+
+
+def listar_pagina(
+    limite: int = None, cursor: str = None, desde_id: int = None, categoria: str = None
+):
     """
+    Una página de inspecciones, de la más reciente a la más antigua.
+
+    En lugar de OFFSET, cada página continúa justo después de la última
+    (fecha, id) de la anterior: la consulta baja por el índice de fecha
+    (o de categoría y fecha) desde ese punto y lee solo `limite` + 1 filas,
+    así que tarda lo mismo en la primera página que en la última y las
+    inserciones nuevas no desplazan las páginas siguientes.
+
+    Args:
+        limite: Filas por página (LIMITE_PAGINA por defecto, como mucho
+                LIMITE_PAGINA_MAXIMO)
+        cursor: "siguiente_cursor" de la página anterior
+        desde_id: Alternativa al cursor: continuar después de la inspección
+                  con este id
+        categoria: Solo las inspecciones de esta categoría
+
+    Returns:
+        (inspecciones, siguiente_cursor); el cursor es None en la última página
+
+    Raises:
+        ValueError: Si el cursor no es válido o desde_id no existe
+    """
+    limite = max(1, min(limite or LIMITE_PAGINA, LIMITE_PAGINA_MAXIMO))
     db = SessionLocal()
+
     try:
-        return (
-            db.query(Inspeccion)
-            .filter(Inspeccion.categoria == categoria)
-            .order_by(Inspeccion.fecha.desc())
+        consulta = db.query(Inspeccion, _FECHA_TEXTO)
+
+        if categoria:
+            consulta = consulta.filter(Inspeccion.categoria == categoria)
+
+        desde = None
+        if cursor:
+            desde = decodificar_cursor(cursor)
+        elif desde_id is not None:
+            fecha = db.query(_FECHA_TEXTO).filter(Inspeccion.id == desde_id).scalar()
+            if fecha is None:
+                raise ValueError(f"No existe la inspección {desde_id}.")
+            desde = (fecha, desde_id)
+
+        if desde is not None:
+            fecha, id_inspeccion = desde
+            # fecha <= f primero: así SQLite busca por rango en el índice en
+            # vez de recorrerlo desde el principio filtrando el OR
+            consulta = consulta.filter(
+                _FECHA_TEXTO <= fecha,
+                or_(_FECHA_TEXTO < fecha, and_(_FECHA_TEXTO == fecha, Inspeccion.id < id_inspeccion)),
+            )
+
+        filas = (
+            consulta
+            .order_by(Inspeccion.fecha.desc(), Inspeccion.id.desc())
+            .limit(limite + 1)
             .all()
         )
+
     finally:
         db.close()
 
+    siguiente = None
+    if len(filas) > limite:
+        ultima, fecha = filas[limite - 1]
+        siguiente = codificar_cursor(fecha, ultima.id)
+
+    return [inspeccion for inspeccion, _ in filas[:limite]], siguiente
+
+@escritura
 def eliminar_inspeccion(id: int):
     """
     Elimina una inspección por ID.
@@ -156,6 +314,7 @@ def eliminar_inspeccion(id: int):
 
         db.delete(objeto)
         db.commit()
+        ventana_defectos.invalidar()
 
         return True  # Eliminado correctamente
 
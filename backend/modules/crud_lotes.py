@@ -1,5 +1,6 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from .db import SessionLocal
+from .db import SessionLocal, escritura
 from .models import Lote, Inspeccion
 from datetime import datetime
 
@@ -16,6 +17,7 @@ def crear_sesion():
 # ---------------------------------------------------------
 # Crear un nuevo lote
 # ---------------------------------------------------------
+@escritura
 def crear_lote(codigo_lote: str, inspector: str):
     db = SessionLocal()
     try:
@@ -39,9 +41,32 @@ def crear_lote(codigo_lote: str, inspector: str):
 # Listar todos los lotes
 # ---------------------------------------------------------
 def listar_lotes():
+    """
+    Lotes del más reciente al más antiguo. Cada lote trae en
+    `total_inspecciones` su número de inspecciones, contado con una
+    subconsulta agrupada por lote_id: no se carga ninguna inspección.
+    """
     db = SessionLocal()
     try:
-        return db.query(Lote).order_by(Lote.fecha.desc()).all()
+        cuentas = (
+            db.query(Inspeccion.lote_id.label("lote_id"), func.count(Inspeccion.id).label("total"))
+            .filter(Inspeccion.lote_id.isnot(None))
+            .group_by(Inspeccion.lote_id)
+            .subquery()
+        )
+
+        filas = (
+            db.query(Lote, func.coalesce(cuentas.c.total, 0))
+            .outerjoin(cuentas, cuentas.c.lote_id == Lote.id)
+            .order_by(Lote.fecha.desc())
+            .all()
+        )
+
+        lotes = []
+        for lote, total in filas:
+            lote.total_inspecciones = total
+            lotes.append(lote)
+        return lotes
     finally:
         db.close()
 
@@ -50,6 +75,7 @@ def listar_lotes():
 # Obtener lote por ID
 # ---------------------------------------------------------
 def obtener_lote(id_lote: int):
+    """Solo el lote; sus inspecciones, con listar_inspecciones_de_lote."""
     db = SessionLocal()
     try:
         return db.query(Lote).filter(Lote.id == id_lote).first()
@@ -57,9 +83,36 @@ def obtener_lote(id_lote: int):
         db.close()
 
 
+# ---------------------------------------------------------
+# Inspecciones de un lote (sin puntos)
+# ---------------------------------------------------------
+def listar_inspecciones_de_lote(id_lote: int):
+    """
+    Filas (id, resultado, categoria, max_distancia, fecha) de las
+    inspecciones del lote: solo las columnas que devuelve la API.
+    """
+    db = SessionLocal()
+    try:
+        return (
+            db.query(
+                Inspeccion.id,
+                Inspeccion.resultado,
+                Inspeccion.categoria,
+                Inspeccion.max_distancia,
+                Inspeccion.fecha,
+            )
+            .filter(Inspeccion.lote_id == id_lote)
+            .order_by(Inspeccion.id)
+            .all()
+        )
+    finally:
+        db.close()
+
+
 # ---------------------------------------------------------
 # Agregar inspección a un lote
 # ---------------------------------------------------------
+@escritura
 def agregar_inspeccion_a_lote(id_lote: int, id_inspeccion: int):
     db = SessionLocal()
     try:
@@ -76,3 +129,22 @@ def agregar_inspeccion_a_lote(id_lote: int, id_inspeccion: int):
 
     finally:
         db.close()
+
+
+# ---------------------------------------------------------
+# Comprobar un lote sin cargar sus inspecciones
+# ---------------------------------------------------------
+def lote_tiene_inspecciones(id_lote: int):
+    """
+    True/False según el lote tenga inspecciones, o None si no existe.
+    Para la exportación: obtener_lote las cargaría todas en memoria.
+    """
+    db = SessionLocal()
+    try:
+        if db.query(Lote.id).filter(Lote.id == id_lote).first() is None:
+            return None
+
+        return db.query(Inspeccion.id).filter(Inspeccion.lote_id == id_lote).first() is not None
+
+    finally:
+        db.close()
@@ -1,7 +1,10 @@
 # backend/modules/db.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
+from concurrent.futures import ThreadPoolExecutor
+import functools
 import os
+import threading
 
 # ---------------------------------------------------------
 # CONFIGURACIÓN DE LA BASE DE DATOS (SQLite local)
@@ -10,21 +13,123 @@ import os
 # Carpeta backend/
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 
-# Ruta completa a database.db dentro de backend/
-DATABASE_PATH = os.path.join(BASE_DIR, "database.db")
+# Ruta completa a database.db dentro de backend/ (DATABASE_PATH permite
+# usar otro archivo, p. ej. una base de pruebas de carga)
+DATABASE_PATH = os.getenv("DATABASE_PATH", os.path.join(BASE_DIR, "database.db"))
 
-# Formato correcto para SQLite
-DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+# Formato correcto para SQLite (DATABASE_URL tiene prioridad si se define)
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DATABASE_PATH}")
+ES_SQLITE = DATABASE_URL.startswith("sqlite")
+
+# Modo de la base de datos:
+#   "produccion" → SQLite en modo WAL con los pragmas de abajo, y todas las
+#                  escrituras (crud, crud_lotes, alert_service) pasan por un
+#                  único hilo escritor. En WAL los lectores no esperan al
+#                  escritor ni lo bloquean; con un solo escritor tampoco hay
+#                  escrituras compitiendo por el cerrojo ("database is locked").
+#   "simple"     → diario por defecto y escrituras desde cualquier hilo
+#                  (comportamiento original).
+MODO_BD = os.getenv("MODO_BD", "produccion")
+
+# Pragmas del modo producción (por conexión)
+SQLITE_MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", "256"))
+SQLITE_CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", "64"))
+# Espera máxima por el cerrojo (p. ej. migraciones o un checkpoint)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+PRODUCCION = MODO_BD == "produccion" and ES_SQLITE
 
 # Crear engine
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False},  # Necesario para SQLite
+    # Necesario para SQLite
+    connect_args={"check_same_thread": False} if ES_SQLITE else {},
     echo=False  # Cambia a True si quieres ver las queries en consola
 )
 
+
+if PRODUCCION:
+    @event.listens_for(engine, "connect")
+    def _configurar_sqlite(conexion, _registro):
+        """WAL y pragmas en cada conexión nueva del pool."""
+        cursor = conexion.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # En WAL, NORMAL solo sincroniza en los checkpoints: un corte de luz
+        # puede perder las últimas transacciones, pero no corrompe la base
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}")
+        # Negativo = KiB en lugar de páginas
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+
 # Sesión de base de datos
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Base para los modelos
 Base = declarative_base()
+
+
+# ---------------------------------------------------------
+# ESCRITOR ÚNICO
+# ---------------------------------------------------------
+
+class EscritorBD:
+    """
+    Un solo hilo que ejecuta, en orden de llegada, todas las funciones de
+    escritura. Quien llama espera el resultado (o la excepción) como si
+    hubiera ejecutado la función él mismo; se llama desde hilos
+    (ejecutar_en_hilo), nunca desde el event loop.
+    """
+
+    def __init__(self):
+        self._ejecutor = None
+        self._hilo = threading.local()
+        self._lock = threading.Lock()
+
+    def _obtener(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._ejecutor is None:
+                self._ejecutor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="escritor-bd",
+                    initializer=self._marcar_hilo
+                )
+            return self._ejecutor
+
+    def _marcar_hilo(self):
+        self._hilo.es_escritor = True
+
+    def ejecutar(self, funcion, *args, **kwargs):
+        # Una escritura que llama a otra ya está en el hilo escritor:
+        # encolarla lo bloquearía esperándose a sí mismo
+        if getattr(self._hilo, "es_escritor", False):
+            return funcion(*args, **kwargs)
+
+        return self._obtener().submit(funcion, *args, **kwargs).result()
+
+    def cerrar(self):
+        """Termina las escrituras pendientes y detiene el hilo."""
+        with self._lock:
+            ejecutor, self._ejecutor = self._ejecutor, None
+
+        if ejecutor is not None:
+            ejecutor.shutdown(wait=True)
+
+
+escritor_bd = EscritorBD()
+
+
+def escritura(funcion):
+    """
+    Decorador de las funciones CRUD que escriben: en modo producción se
+    ejecutan en el escritor único; en modo simple, directamente.
+    """
+    if not PRODUCCION:
+        return funcion
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        return escritor_bd.ejecutar(funcion, *args, **kwargs)
+
+    return envoltura
@@ -0,0 +1,58 @@
+# backend/modules/dependencias.py
+"""
+Importación perezosa de dependencias pesadas.
+
+Importar OpenCV cuesta más de 100 ms y no hace falta para arrancar el
+servidor: con la plantilla ya compilada (.npz o almacén compartido) el
+arranque no llama a cv2. Los módulos que lo usan lo declaran con
+importar_perezoso("cv2"); la importación real ocurre en el primer acceso
+a un atributo (p. ej. cv2.threshold), normalmente al precalentar el
+análisis en segundo plano.
+
+No se usa importlib.util.LazyLoader: en Python 3.11 no es seguro entre
+hilos (dos hilos que tocan el módulo a la vez pueden ver un módulo a
+medio ejecutar), y el precalentamiento corre en un hilo mientras llegan
+peticiones.
+"""
+
+import importlib
+import importlib.util
+import sys
+import threading
+import types
+
+
+class _ModuloPerezoso(types.ModuleType):
+    """
+    Sustituto de un módulo que lo importa, bajo un cerrojo, en el primer
+    acceso a un atributo. Después copia los atributos del módulo real a
+    su propio __dict__: los accesos siguientes no pasan por __getattr__.
+    """
+
+    def __init__(self, nombre: str):
+        super().__init__(nombre)
+        self.__dict__["_cerrojo"] = threading.Lock()
+
+    def __getattr__(self, atributo: str):
+        with self.__dict__["_cerrojo"]:
+            modulo = importlib.import_module(self.__name__)
+            self.__dict__.update(modulo.__dict__)
+
+        return getattr(modulo, atributo)
+
+
+def importar_perezoso(nombre: str):
+    """
+    Devuelve el módulo `nombre` sin ejecutarlo todavía. Si ya estaba
+    importado se devuelve tal cual.
+
+    Raises:
+        ModuleNotFoundError: Si el módulo no está instalado (se comprueba ya)
+    """
+    if nombre in sys.modules:
+        return sys.modules[nombre]
+
+    if importlib.util.find_spec(nombre) is None:
+        raise ModuleNotFoundError(f"No module named '{nombre}'", name=nombre)
+
+    return _ModuloPerezoso(nombre)
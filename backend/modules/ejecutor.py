@@ -0,0 +1,246 @@
+# backend/modules/ejecutor.py
+"""
+Ejecutores para el trabajo bloqueante del servicio.
+
+- Pool de procesos para el análisis de imágenes: cada proceso trabajador
+  carga la plantilla ideal una sola vez al arrancar, de modo que las
+  imágenes solo pagan el análisis.
+- Ejecutor de análisis configurable (hilos o procesos) con control de
+  admisión: un número acotado de análisis en curso más una cola limitada.
+  Si la cola está llena la petición se rechaza de inmediato en lugar de
+  bloquear el event loop. Todo análisis pasa por él: una imagen, un lote
+  de /api/inspeccionar/multiple o un fotograma de la transmisión.
+- Pool de hilos para E/S bloqueante (SQLite, consulta de alertas, SMTP).
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .analisis import cargar_contorno_ideal, precalentar as precalentar_analisis
+from . import metricas
+
+# Número de procesos del pool (por defecto, uno por CPU)
+TRABAJADORES_ANALISIS = int(os.getenv("TRABAJADORES_ANALISIS", str(os.cpu_count() or 1)))
+
+# "hilos" (OpenCV libera el GIL) o "procesos" (usa el pool de procesos)
+EJECUTOR_ANALISIS = os.getenv("EJECUTOR_ANALISIS", "hilos")
+
+# Análisis en espera admitidos además de los que están en curso
+COLA_MAXIMA_ANALISIS = int(os.getenv("COLA_MAXIMA_ANALISIS", "32"))
+
+# Tiempo máximo (segundos) desde la admisión hasta obtener el resultado
+PLAZO_ANALISIS = float(os.getenv("PLAZO_ANALISIS", "30"))
+
+# Valor de la cabecera Retry-After cuando se rechaza una petición
+REINTENTAR_TRAS = int(os.getenv("REINTENTAR_TRAS", "1"))
+
+# Hilos para el trabajo de E/S (base de datos, alertas, email)
+TRABAJADORES_IO = int(os.getenv("TRABAJADORES_IO", "8"))
+
+_pool = None
+_pool_hilos = None
+_pool_io = None
+
+
+class ColaLlenaError(Exception):
+    """La cola de análisis está llena; el cliente debe reintentar más tarde."""
+
+
+class PlazoExcedidoError(Exception):
+    """El análisis no terminó dentro del plazo configurado."""
+
+
+def _inicializar_trabajador():
+    """Se ejecuta una vez en cada proceso del pool: precarga la plantilla."""
+    cargar_contorno_ideal()
+
+
+def obtener_pool() -> ProcessPoolExecutor:
+    """Devuelve el pool de procesos, creándolo la primera vez que se usa."""
+    global _pool
+
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=TRABAJADORES_ANALISIS,
+            initializer=_inicializar_trabajador,
+        )
+
+    return _pool
+
+
+def obtener_ejecutor():
+    """Devuelve el ejecutor de análisis según EJECUTOR_ANALISIS."""
+    global _pool_hilos
+
+    if EJECUTOR_ANALISIS == "procesos":
+        return obtener_pool()
+
+    if _pool_hilos is None:
+        _pool_hilos = ThreadPoolExecutor(
+            max_workers=TRABAJADORES_ANALISIS,
+            thread_name_prefix="analisis",
+        )
+
+    return _pool_hilos
+
+
+def precalentar() -> bool:
+    """
+    Arranca el ejecutor de análisis y hace un análisis de prueba en él:
+    con hilos, en este proceso; con procesos, en un trabajador del pool
+    (que además carga la plantilla en su inicializador).
+    """
+    if EJECUTOR_ANALISIS == "procesos":
+        return obtener_pool().submit(precalentar_analisis).result()
+
+    return obtener_ejecutor().submit(precalentar_analisis).result()
+
+
+async def ejecutar_en_hilo(funcion, *args, **kwargs):
+    """Ejecuta una función bloqueante de E/S fuera del event loop."""
+    global _pool_io
+
+    if _pool_io is None:
+        _pool_io = ThreadPoolExecutor(max_workers=TRABAJADORES_IO, thread_name_prefix="io")
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool_io, lambda: funcion(*args, **kwargs))
+
+
+# ---------------------------------------------------------
+# CONTROL DE ADMISIÓN
+# ---------------------------------------------------------
+
+class ControlAdmision:
+    """
+    Limita los análisis pendientes (en curso + en cola) del ejecutor.
+
+    Un trabajo ocupa su plaza hasta que termina de verdad, aunque el
+    cliente ya haya recibido el error de plazo excedido: así la cola
+    refleja la carga real de los trabajadores.
+    """
+
+    def __init__(self, concurrentes: int, cola_maxima: int):
+        self.concurrentes = concurrentes
+        self.cola_maxima = cola_maxima
+        self.pendientes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def en_cola(self) -> int:
+        """Trabajos admitidos que todavía esperan un trabajador libre."""
+        return max(0, self.pendientes - self.concurrentes)
+
+    @property
+    def en_curso(self) -> int:
+        return min(self.pendientes, self.concurrentes)
+
+    @property
+    def capacidad(self) -> int:
+        """Trabajos pendientes admitidos como máximo (en curso + cola)."""
+        return self.concurrentes + self.cola_maxima
+
+    def _liberar(self, _future):
+        with self._lock:
+            self.pendientes -= 1
+
+    def _admitir(self, cantidad: int):
+        """Reserva `cantidad` plazas a la vez, o ninguna."""
+        with self._lock:
+            if self.pendientes + cantidad > self.capacidad:
+                metricas.incrementar("analisis_rechazados_cola_llena", cantidad)
+                raise ColaLlenaError("La cola de análisis está llena.")
+            self.pendientes += cantidad
+
+    def _enviar(self, funcion, args, kwargs):
+        """Envía un trabajo ya admitido; su plaza se libera al terminar."""
+        try:
+            future = obtener_ejecutor().submit(funcion, *args, **kwargs)
+        except Exception:
+            self._liberar(None)
+            raise
+
+        future.add_done_callback(self._liberar)
+        return asyncio.wrap_future(future)
+
+    async def _esperar(self, espera, plazo: float):
+        try:
+            return await asyncio.wait_for(espera, timeout=plazo)
+        except asyncio.TimeoutError:
+            metricas.incrementar("analisis_plazo_excedido")
+            raise PlazoExcedidoError(
+                f"El análisis superó el plazo de {plazo:g} s."
+            )
+
+    def enviar(self, funcion, *args, plazo: float = PLAZO_ANALISIS, **kwargs) -> asyncio.Future:
+        """
+        Admite y envía `funcion(*args, **kwargs)` sin esperar el resultado
+        (para quien encadena varios, como la transmisión). Se llama desde
+        el event loop.
+
+        Returns:
+            Future con el resultado, o PlazoExcedidoError pasado `plazo`
+
+        Raises:
+            ColaLlenaError: Si no queda sitio en la cola (en el momento)
+        """
+        self._admitir(1)
+        return asyncio.ensure_future(self._esperar(self._enviar(funcion, args, kwargs), plazo))
+
+    async def ejecutar(self, funcion, *args, plazo: float = PLAZO_ANALISIS, **kwargs):
+        """
+        Ejecuta `funcion(*args, **kwargs)` en el ejecutor de análisis.
+
+        Raises:
+            ColaLlenaError: Si no queda sitio en la cola
+            PlazoExcedidoError: Si el resultado no llega dentro de `plazo`
+        """
+        return await self.enviar(funcion, *args, plazo=plazo, **kwargs)
+
+    async def ejecutar_lote(self, funcion, entradas: list, plazo: float = PLAZO_ANALISIS, **kwargs) -> list:
+        """
+        Ejecuta `funcion(entrada, **kwargs)` para cada entrada, admitiendo
+        el lote entero o nada: un lote a medias solo ocuparía trabajadores
+        para acabar en error. Los resultados llegan en el orden de entrada.
+
+        Raises:
+            ColaLlenaError: Si el lote no cabe en la cola
+            PlazoExcedidoError: Si el lote no termina dentro de `plazo`
+        """
+        self._admitir(len(entradas))
+
+        esperas = []
+        try:
+            for entrada in entradas:
+                esperas.append(self._enviar(funcion, (entrada,), kwargs))
+        except Exception:
+            # Las plazas de los que no se llegaron a enviar
+            for _ in range(len(entradas) - len(esperas) - 1):
+                self._liberar(None)
+            raise
+
+        return await self._esperar(asyncio.gather(*esperas), plazo)
+
+
+control_admision = ControlAdmision(TRABAJADORES_ANALISIS, COLA_MAXIMA_ANALISIS)
+
+metricas.registrar_indicador("cola_analisis_en_espera", lambda: control_admision.en_cola)
+metricas.registrar_indicador("analisis_en_curso", lambda: control_admision.en_curso)
+
+
+def cerrar_pool():
+    """Detiene los ejecutores (al apagar el servidor)."""
+    global _pool, _pool_hilos, _pool_io
+
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+    for ejecutor in (_pool_hilos, _pool_io):
+        if ejecutor is not None:
+            ejecutor.shutdown(wait=False, cancel_futures=True)
+
+    _pool_hilos = None
+    _pool_io = None
@@ -0,0 +1,145 @@
+# backend/modules/exportacion.py
+"""
+Exportación de inspecciones en streaming (CSV o NDJSON, opcionalmente gzip).
+
+Antes /api/exportar y /api/lotes/{id}/exportar cargaban todas las
+inspecciones como objetos ORM (con sus puntos) y escribían el CSV entero
+en un StringIO antes de enviar el primer byte. Ahora se consultan solo las
+columnas exportadas, las filas llegan de SQLite de FILAS_POR_BLOQUE en
+FILAS_POR_BLOQUE (yield_per) y cada bloque se convierte en bytes y se envía
+antes de leer el siguiente: la memoria no depende del número de filas.
+
+Si el cliente corta la descarga, Starlette cierra el generador y la sesión
+se cierra en el finally.
+"""
+
+import csv
+import io
+import json
+import os
+import zlib
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+
+from .db import SessionLocal
+from .models import Inspeccion
+
+# Filas que se leen de la base (y se envían) de una vez
+FILAS_POR_BLOQUE = int(os.getenv("EXPORTACION_FILAS_POR_BLOQUE", "1000"))
+
+# Nivel de compresión de las variantes .gz (6 = el de gzip por defecto)
+NIVEL_GZIP = int(os.getenv("EXPORTACION_NIVEL_GZIP", "6"))
+
+FORMATOS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+# Columnas exportadas: (clave NDJSON, columna)
+_COLUMNAS = (
+    ("id", Inspeccion.id),
+    ("resultado", Inspeccion.resultado),
+    ("categoria", Inspeccion.categoria),
+    ("max_distancia", Inspeccion.max_distancia),
+    ("fecha", Inspeccion.fecha),
+)
+
+
+def iterar_bloques(lote_id: Optional[int] = None) -> Iterator[list]:
+    """
+    Listas de hasta FILAS_POR_BLOQUE filas (tuplas de _COLUMNAS), de la
+    inspección más reciente a la más antigua. Las de un lote, en el orden
+    en que se inspeccionaron (por id, como listar_inspecciones_de_lote).
+    """
+    db = SessionLocal()
+    try:
+        consulta = select(*(columna for _, columna in _COLUMNAS))
+        if lote_id is not None:
+            consulta = consulta.where(Inspeccion.lote_id == lote_id).order_by(Inspeccion.id)
+        else:
+            consulta = consulta.order_by(Inspeccion.fecha.desc())
+
+        # yield_per: el cursor entrega las filas por bloques en lugar de
+        # cargarlas todas al empezar
+        resultado = db.execute(
+            consulta.execution_options(yield_per=FILAS_POR_BLOQUE)
+        )
+        for bloque in resultado.partitions():
+            yield bloque
+    finally:
+        db.close()
+
+
+def _csv(bloques, cabeceras) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(cabeceras)
+
+    for bloque in bloques:
+        escritor.writerows(
+            (id_, resultado, categoria, distancia, fecha.isoformat())
+            for id_, resultado, categoria, distancia, fecha in bloque
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _ndjson(bloques) -> Iterator[bytes]:
+    claves = [clave for clave, _ in _COLUMNAS]
+
+    for bloque in bloques:
+        lineas = []
+        for fila in bloque:
+            registro = dict(zip(claves, fila))
+            registro["fecha"] = registro["fecha"].isoformat()
+            lineas.append(json.dumps(registro, ensure_ascii=False))
+        lineas.append("")
+        yield "\n".join(lineas).encode()
+
+
+def _gzip(trozos: Iterator[bytes]) -> Iterator[bytes]:
+    """Comprime el flujo sin acumularlo (wbits=31 → formato gzip)."""
+    compresor = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 31)
+    for trozo in trozos:
+        comprimido = compresor.compress(trozo)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+def exportar(
+    formato: str = "csv", comprimir: bool = False, lote_id: Optional[int] = None,
+    cabeceras=("ID", "Resultado", "Categoria", "Max Distancia", "Fecha")
+) -> Iterator[bytes]:
+    """
+    Generador con el contenido del archivo exportado.
+
+    Args:
+        formato: "csv" o "ndjson"
+        comprimir: Comprimir el flujo en gzip
+        lote_id: Solo las inspecciones de este lote
+        cabeceras: Primera fila del CSV
+
+    Raises:
+        ValueError: Si el formato no es uno de FORMATOS
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato '{formato}' no válido. Opciones: {', '.join(FORMATOS)}")
+
+    bloques = iterar_bloques(lote_id)
+    trozos = _csv(bloques, cabeceras) if formato == "csv" else _ndjson(bloques)
+
+    return _gzip(trozos) if comprimir else trozos
+
+
+def tipo_y_extension(formato: str, comprimir: bool) -> tuple:
+    """(media_type, extensión del archivo) de una exportación."""
+    tipo, extension = FORMATOS[formato]
+    if comprimir:
+        return "application/gzip", f"{extension}.gz"
+    return tipo, extension
@@ -0,0 +1,138 @@
+# backend/modules/filtro_fotogramas.py
+"""
+Descarte rápido de fotogramas inservibles antes de buscar contornos.
+
+Una cinta vacía, una captura sobreexpuesta o una imagen desenfocada
+pasaban por la umbralización, findContours y la comparación para acabar en
+"No se detectó ningún contorno" (o, desenfocada, en un rechazo falso: el
+umbral desplaza el borde difuminado hacia fuera). Este filtro las detecta
+sobre una muestra del fotograma y el análisis devuelve status "DESCARTADO"
+con el motivo; esos resultados no se guardan como inspecciones y se cuentan
+por motivo en /api/metricas (fotogramas_descartados_<motivo>).
+
+Motivos:
+    "vacio"       → menos de MATERIAL_MINIMO de la imagen supera el umbral.
+    "saturado"    → más de MATERIAL_MAXIMO la supera (sobreexposición o
+                    pieza que llena el encuadre).
+    "desenfocado" → el borde de la pieza mide más de ANCHO_BORDE_MAXIMO px.
+
+El ancho del borde se estima en unas pocas filas y columnas a resolución
+completa: en cada cruce del nivel medio entre fondo y pieza, el contraste
+dividido por el salto entre los dos píxeles del cruce. Un borde nítido da
+1 px; un desenfoque gaussiano de sigma s da unos 2.5·s px. Se usa la
+mediana de los cruces, así que no depende del tamaño de la pieza ni del
+contraste (la varianza del laplaciano sí).
+"""
+
+import os
+from typing import Optional
+
+import numpy as np
+
+from . import metricas
+from .plantillas import UMBRAL_BINARIZACION
+
+FILTRO_FOTOGRAMAS = os.getenv("FILTRO_FOTOGRAMAS", "1") == "1"
+
+# Fracción de píxeles por encima del umbral admitida
+MATERIAL_MINIMO = float(os.getenv("MATERIAL_MINIMO", "0.005"))
+MATERIAL_MAXIMO = float(os.getenv("MATERIAL_MAXIMO", "0.95"))
+
+# Ancho máximo del borde en px (~2.5 veces la sigma del desenfoque)
+ANCHO_BORDE_MAXIMO = float(os.getenv("ANCHO_BORDE_MAXIMO", "3"))
+
+MOTIVOS_DESCARTE = ("vacio", "saturado", "desenfocado")
+
+# Lado aproximado de la muestra del histograma y número de filas (y de
+# columnas) en las que se mide el borde
+_LADO_MUESTRA = 128
+_LINEAS_BORDE = 32
+
+# Con menos cruces no se estima el enfoque
+_CRUCES_MINIMOS = 8
+
+
+def _ancho_borde(imagen, fondo: float, pieza: float) -> Optional[float]:
+    """Mediana del ancho de borde en px, o None si hay pocos cruces."""
+    alto, ancho = imagen.shape
+    paso = max(1, min(alto, ancho) // _LINEAS_BORDE)
+    medio = (fondo + pieza) / 2
+
+    saltos = []
+    for lineas in (imagen[::paso], imagen[:, ::paso].T):
+        sobre = lineas > medio
+        cruce = sobre[:, 1:] != sobre[:, :-1]
+        saltos.append(np.abs(
+            lineas[:, 1:][cruce].astype(np.int16) - lineas[:, :-1][cruce].astype(np.int16)
+        ))
+
+    saltos = np.concatenate(saltos)
+    if len(saltos) < _CRUCES_MINIMOS:
+        return None
+
+    return (pieza - fondo) / max(1.0, float(np.median(saltos)))
+
+
+def evaluar_fotograma(imagen, binaria: bool = False) -> Optional[dict]:
+    """
+    Devuelve el resultado DESCARTADO si el fotograma no sirve, o None.
+
+    Args:
+        imagen: Imagen 2D uint8 en escala de grises
+        binaria: True si ya es una máscara; solo se comprueba el material
+    """
+    alto, ancho = imagen.shape
+    paso = max(1, max(alto, ancho) // _LADO_MUESTRA)
+    muestra = imagen[::paso, ::paso]
+
+    material = muestra > (0 if binaria else UMBRAL_BINARIZACION)
+    fraccion = float(material.mean())
+    indicadores = {"material": round(fraccion, 4)}
+
+    if fraccion < MATERIAL_MINIMO:
+        return _descartado("vacio", f"no hay pieza (material {fraccion:.1%})", indicadores)
+
+    if fraccion > MATERIAL_MAXIMO:
+        return _descartado("saturado", f"imagen saturada (material {fraccion:.1%})", indicadores)
+
+    if binaria:
+        return None
+
+    fondo = float(muestra[~material].mean())
+    pieza = float(muestra[material].mean())
+    borde = _ancho_borde(imagen, fondo, pieza)
+
+    if borde is not None:
+        indicadores["ancho_borde"] = round(borde, 2)
+
+        if borde > ANCHO_BORDE_MAXIMO:
+            return _descartado("desenfocado", f"imagen desenfocada (borde de {borde:.1f}px)", indicadores)
+
+    return None
+
+
+def _descartado(motivo: str, detalle: str, indicadores: dict) -> dict:
+    # Mismos campos que un resultado normal: los clientes leen puntos y
+    # distancia en toda respuesta 200
+    return {
+        "status": "DESCARTADO",
+        "motivo": motivo,
+        "mensaje": f"⚠ Fotograma descartado: {detalle}.",
+        "max_distancia": 0.0,
+        "puntos_defectuosos": [],
+        "segmentos": [],
+        "indicadores": indicadores,
+    }
+
+
+def registrar_descarte(resultado: dict) -> bool:
+    """
+    True si el análisis descartó el fotograma, y lo cuenta por motivo.
+    Se llama en el proceso del servidor: el análisis puede haberse hecho
+    en el pool de procesos, cuyos contadores no llegan a /api/metricas.
+    """
+    if resultado.get("status") != "DESCARTADO":
+        return False
+
+    metricas.incrementar(f"fotogramas_descartados_{resultado['motivo']}")
+    return True
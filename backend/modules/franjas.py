@@ -0,0 +1,479 @@
+# backend/modules/franjas.py
+"""
+Análisis por franjas, con memoria acotada, para fotogramas muy grandes.
+
+La ruta normal lee la subida entera a un bytes, y la decodificación, la
+umbralización y la ROI crean copias del fotograma completo. Con cámaras
+lineales de decenas de megapíxeles eso dispara la memoria de cada
+trabajador. Esta ruta hace lo siguiente:
+
+- Mapea (mmap) el archivo temporal donde ya está la subida, sin copiarla.
+- Lee los formatos "crudo" y "bits" franja a franja directamente del mapa.
+  Un PNG/JPEG no se admite: el decodificador necesita la imagen entera y
+  eso rompería el presupuesto de memoria.
+- Pasada 1: cada franja se umbraliza y se reduce por bloques (basta un
+  píxel de material para que el bloque cuente). Así se localiza la pieza y
+  su contorno grueso, sin perder rebabas finas.
+- Pasada 2: solo se recorren las filas de la ROI. En cada franja se buscan
+  los píxeles del borde exterior de la pieza dentro de una banda alrededor
+  del contorno grueso, con una fila de contexto arriba y abajo para que
+  los cortes entre franjas no creen bordes falsos. Como findContours con
+  RETR_EXTERNAL en la ruta normal, no cuentan los huecos interiores (el
+  fondo que no se une con el exterior de la pieza gruesa) ni las manchas
+  sueltas fuera de la pieza.
+- Costura: cada punto se ordena por el tramo del contorno grueso que lo
+  cubre y por su posición a lo largo de ese tramo. Así se reconstruye el
+  orden del contorno para los segmentos.
+
+El alto de franja se elige para que la memoria de trabajo quede dentro de
+PRESUPUESTO_FRANJAS_MB. Solo admite el modo "contorno". Los puntos son
+todos los píxeles del borde exterior (no solo los vértices de
+CHAIN_APPROX_SIMPLE).
+"""
+
+import mmap
+import os
+import tempfile
+
+import numpy as np
+
+from .analisis import (
+    FACTOR_REDUCCION, DESPLAZAMIENTO_MAXIMO, ALINEACION, ALINEACION_MAXIMA, MODO_ANALISIS,
+    _binarizar, _contorno_mayor, _desplazamiento_bbox, _limitar_alineacion,
+    desplazamiento_por_perfiles, resultado_contorno, resultado_fuera_de_posicion,
+)
+from .dependencias import importar_perezoso
+from .filtro_fotogramas import evaluar_fotograma, FILTRO_FOTOGRAMAS
+from .metricas import Cronometro
+from .plantillas import registro_plantillas, PlantillaNoEncontradaError
+
+cv2 = importar_perezoso("cv2")
+
+# Subidas mayores que esto (MB) se analizan por franjas; 0 desactiva la
+# selección automática (sigue disponible con ?franjas=true)
+FRANJAS_DESDE_MB = float(os.getenv("FRANJAS_DESDE_MB", "64"))
+
+# Memoria de trabajo máxima por franja (MB)
+PRESUPUESTO_FRANJAS_MB = float(os.getenv("PRESUPUESTO_FRANJAS_MB", "32"))
+
+# Directorio de los temporales de subida (por defecto el del sistema)
+DIRECTORIO_FRANJAS = os.getenv("DIRECTORIO_FRANJAS") or None
+
+# Bytes de trabajo por píxel de franja: umbral, erosión y borde (uint8),
+# etiquetas de fondo y de pieza y guía del contorno (int32) y la pieza
+# gruesa, su núcleo y la pieza rellena ampliados a la franja (uint8)
+_BYTES_POR_PIXEL = 24
+
+
+# ---------------------------------------------------------
+# SUBIDAS A ARCHIVO TEMPORAL
+# ---------------------------------------------------------
+
+def usar_franjas(tamano: int, forzar: bool = None) -> bool:
+    """Decide si una subida de `tamano` bytes va por franjas (`forzar` manda si no es None)."""
+    if forzar is not None:
+        return forzar
+
+    return FRANJAS_DESDE_MB > 0 and tamano > FRANJAS_DESDE_MB * 1024 * 1024
+
+
+def _temporal():
+    return tempfile.NamedTemporaryFile(
+        prefix="franjas_", suffix=".bin", dir=DIRECTORIO_FRANJAS, delete=False
+    )
+
+
+async def volcar_flujo(flujo) -> str:
+    """
+    Vuelca un cuerpo recibido por trozos (request.stream()) a un temporal
+    con nombre y devuelve su ruta. El cuerpo nunca está entero en memoria.
+    """
+    with _temporal() as destino:
+        # Escrituras de un trozo ASGI (decenas de KB) a la caché de páginas
+        async for trozo in flujo:
+            destino.write(trozo)
+
+    return destino.name
+
+
+def _mapear(origen) -> mmap.mmap:
+    """Mapea en solo lectura una ruta o un archivo abierto (con fileno())."""
+    if isinstance(origen, str):
+        with open(origen, "rb") as archivo:
+            return mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # fileno() vuelca a disco un SpooledTemporaryFile que aún esté en memoria
+    origen.flush()
+    return mmap.mmap(origen.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# ---------------------------------------------------------
+# LECTURA POR FILAS DEL FOTOGRAMA MAPEADO
+# ---------------------------------------------------------
+
+def _fuente(mapa, formato: str, ancho: int, alto: int):
+    """
+    Devuelve (leer_filas, ancho, alto, binaria): leer_filas(y0, y1) da las
+    filas [y0, y1) como uint8 sin leer el resto del fotograma.
+
+    Raises:
+        ValueError: Si el contenido no corresponde al formato o las dimensiones
+    """
+    if formato == "codificado":
+        raise ValueError(
+            "El análisis por franjas no admite PNG/JPEG (habría que decodificar la imagen "
+            "entera): envía el fotograma sin codificar, con X-Formato 'crudo' o 'bits'."
+        )
+
+    buffer = np.frombuffer(mapa, np.uint8)
+
+    if ancho <= 0 or alto <= 0:
+        raise ValueError("Las dimensiones del fotograma deben ser positivas.")
+
+    if formato == "crudo":
+        if buffer.size != ancho * alto:
+            raise ValueError(
+                f"Se esperaban {ancho * alto} bytes para {ancho}x{alto} y llegaron {buffer.size}."
+            )
+        imagen = buffer.reshape(alto, ancho)
+        return (lambda y0, y1: imagen[y0:y1]), ancho, alto, False
+
+    if formato == "bits":
+        # Solo empaquetada por filas: así cada franja se desempaqueta sola.
+        # Con ancho múltiplo de 8 la forma aplanada es la misma.
+        bytes_fila = (ancho + 7) // 8
+        if buffer.size != alto * bytes_fila:
+            raise ValueError(
+                f"Por franjas la máscara debe venir empaquetada por filas "
+                f"({alto * bytes_fila} bytes para {ancho}x{alto}); llegaron {buffer.size}."
+            )
+        filas = buffer.reshape(alto, bytes_fila)
+        return (lambda y0, y1: np.unpackbits(filas[y0:y1], axis=1, count=ancho)), ancho, alto, True
+
+    raise ValueError(f"Formato de fotograma desconocido: '{formato}'.")
+
+
+def alto_franja(ancho: int, presupuesto_mb: float = None, multiplo: int = 1) -> int:
+    """Filas por franja para que `ancho` px por fila quepan en el presupuesto."""
+    presupuesto = (presupuesto_mb or PRESUPUESTO_FRANJAS_MB) * 1024 * 1024
+    filas = int(presupuesto // (max(1, ancho) * _BYTES_POR_PIXEL))
+
+    return max(multiplo, filas // multiplo * multiplo)
+
+
+# ---------------------------------------------------------
+# PASADAS
+# ---------------------------------------------------------
+
+def _reducir(leer, ancho: int, alto: int, binaria: bool, f: int):
+    """
+    Pasada 1: máscara reducida f veces por bloques, franja a franja. Un
+    bloque vale 255 si contiene algún píxel de material.
+    """
+    paso = alto_franja(ancho, multiplo=f)
+    reducida = np.zeros((alto // f, ancho // f), dtype=np.uint8)
+
+    for y0 in range(0, (alto // f) * f, paso):
+        y1 = min(y0 + paso, (alto // f) * f)
+        thresh = _binarizar(leer(y0, y1)[:, :(ancho // f) * f], binaria)
+        if binaria:
+            thresh = thresh * np.uint8(255)
+
+        # INTER_AREA con factor entero promedia cada bloque: un solo píxel a
+        # 255 deja el bloque en 255 / f² > 0 (para f <= 22)
+        bloques = cv2.resize(thresh, (ancho // f, (y1 - y0) // f), interpolation=cv2.INTER_AREA)
+        reducida[y0 // f:y1 // f] = np.where(bloques > 0, 255, 0)
+
+    return reducida
+
+
+def _tramos_guia(contorno_grueso, f: int):
+    """Vértices del contorno grueso en resolución completa (centro de cada bloque)."""
+    return contorno_grueso.reshape(-1, 2).astype(np.int64) * f + f // 2
+
+
+def _grosores(banda: int) -> list:
+    """Grosores de línea decrecientes, de toda la banda a 1 px."""
+    grosores = []
+    radio = banda
+    while radio >= 1:
+        grosores.append(2 * radio + 1)
+        radio //= 2
+    return grosores + [1]
+
+
+def _por_bloques(reducida, filas: slice, columnas: slice, f: int):
+    """Valores de la máscara reducida para cada píxel de filas x columnas."""
+    alto, ancho = reducida.shape
+    b0, a0 = filas.start // f, columnas.start // f
+    # Bloques que cubren la zona (los píxeles del resto de la división, más
+    # allá de la máscara reducida, toman el último bloque)
+    ys = np.minimum(np.arange(b0, (filas.stop - 1) // f + 1), alto - 1)
+    xs = np.minimum(np.arange(a0, (columnas.stop - 1) // f + 1), ancho - 1)
+    trozo = reducida[np.ix_(ys, xs)]
+
+    ampliado = cv2.resize(trozo, (len(xs) * f, len(ys) * f), interpolation=cv2.INTER_NEAREST)
+    return ampliado[filas.start - b0 * f:filas.stop - b0 * f, columnas.start - a0 * f:columnas.stop - a0 * f]
+
+
+def _pieza_exterior(thresh, pieza, nucleo, anterior, f: int):
+    """
+    Pieza de una franja (0/1) con los huecos rellenos y sin manchas
+    sueltas, a partir de la pieza gruesa (`pieza`, rellena) y su interior
+    (`nucleo`), ya ampliados a la franja (0/255).
+
+    - Fondo exterior: componentes de fondo (4-conexas) que tocan algún
+      bloque fuera de la pieza gruesa. El resto del fondo son huecos.
+    - De lo que no es exterior, dentro de la pieza gruesa, se quedan las
+      componentes (8-conexas) que llegan al núcleo o que continúan la pieza
+      de la franja anterior (`anterior`: su última fila, que aquí es la de
+      contexto de arriba); si ninguna, la mayor.
+    """
+    fondo = cv2.compare(thresh, 0, cv2.CMP_EQ)
+    n, etiquetas = cv2.connectedComponents(fondo, connectivity=4)
+    exteriores = np.zeros(n, dtype=bool)
+    # El material tiene la etiqueta 0
+    exteriores[etiquetas[pieza == 0]] = True
+    exteriores[0] = False
+
+    # Solo el fondo dentro de la pieza gruesa (la franja entre el borde real
+    # y el grueso, y los huecos) puede ser hueco
+    rellena = cv2.bitwise_and(cv2.compare(thresh, 0, cv2.CMP_GT), pieza)
+    ys, xs = np.nonzero(cv2.bitwise_and(fondo, pieza))
+    rellena[ys[~exteriores[etiquetas[ys, xs]]], xs[~exteriores[etiquetas[ys, xs]]]] = 255
+
+    n, etiquetas, estadisticas, _ = cv2.connectedComponentsWithStats(rellena, connectivity=8)
+    rellena //= 255
+    if n <= 1:
+        return rellena
+
+    # El núcleo se comprueba en un píxel por bloque: basta para tocarlo
+    conservar = np.zeros(n, dtype=bool)
+    conservar[etiquetas[::f, ::f][nucleo[::f, ::f] != 0]] = True
+    if anterior is not None:
+        conservar[etiquetas[0][anterior]] = True
+    conservar[0] = False
+
+    if not conservar.any():
+        conservar[1 + int(np.argmax(estadisticas[1:, cv2.CC_STAT_AREA]))] = True
+
+    for k in np.flatnonzero(~conservar[1:]) + 1:
+        x, y, w, h = estadisticas[k, :4]
+        caja = (slice(y, y + h), slice(x, x + w))
+        rellena[caja][etiquetas[caja] == k] = 0
+
+    return rellena
+
+
+def _bordes(leer, roi, alto: int, binaria: bool, guia, banda: int, gruesa: tuple, crono: Cronometro):
+    """
+    Pasada 2: píxeles del borde exterior de la pieza en cada franja de la
+    ROI, dentro de la banda del contorno grueso, con el índice del tramo
+    que los cubre. Acumula también las proyecciones de la máscara para la
+    alineación.
+
+    Args:
+        gruesa: (pieza, nucleo, f): pieza gruesa rellena y su interior (un
+                bloque hacia dentro), en la máscara reducida f veces
+
+    Returns:
+        (puntos Nx2, tramos N, columnas, filas)
+    """
+    x0, y0, x1, y1 = roi
+    pieza_reducida, nucleo_reducido, f = gruesa
+    siguiente = np.roll(guia, -1, axis=0)
+    y_min = np.minimum(guia[:, 1], siguiente[:, 1]) - banda
+    y_max = np.maximum(guia[:, 1], siguiente[:, 1]) + banda
+    cruz = cv2.getStructuringElement(cv2.MORPH_CROSS, (3, 3))
+
+    columnas = np.zeros(x1 - x0, dtype=np.float32)
+    filas = np.zeros(y1 - y0, dtype=np.float32)
+    puntos, tramos = [], []
+    paso = alto_franja(x1 - x0)
+    # Última fila de la pieza en la franja anterior
+    anterior = None
+
+    for ya in range(y0, y1, paso):
+        yb = min(ya + paso, y1)
+        # Una fila de contexto a cada lado: el corte no es un borde
+        c0, c1 = max(0, ya - 1), min(alto, yb + 1)
+        r0, r1 = ya - c0, yb - c0
+
+        with crono.etapa("umbralizacion"):
+            thresh = _binarizar(leer(c0, c1)[:, x0:x1], binaria)
+            propias = thresh[r0:r1]
+            columnas += cv2.reduce(propias, 0, cv2.REDUCE_SUM, dtype=cv2.CV_32F).ravel()
+            filas[ya - y0:yb - y0] = cv2.reduce(propias, 1, cv2.REDUCE_SUM, dtype=cv2.CV_32F).ravel()
+
+        with crono.etapa("contornos"):
+            # Solo la pieza principal, sin huecos: su borde es el exterior
+            zona = (slice(c0, c1), slice(x0, x1))
+            pieza = _pieza_exterior(
+                thresh if not binaria else thresh * np.uint8(255),
+                _por_bloques(pieza_reducida, *zona, f),
+                _por_bloques(nucleo_reducido, *zona, f),
+                anterior if r0 else None,
+                f,
+            )
+            anterior = pieza[r1 - 1] != 0
+
+            # Borde: píxel de la pieza con algún vecino (4-conexo) fuera
+            erosion = cv2.erode(pieza, cruz, borderType=cv2.BORDER_CONSTANT, borderValue=0)
+            borde = cv2.subtract(pieza, erosion)
+
+            # Guía: cada tramo del contorno grueso pinta su índice (1..n) en la
+            # banda. Se pinta de más grueso a más fino para que cada píxel
+            # quede (aproximadamente) con el tramo más cercano.
+            mapa_guia = np.zeros(thresh.shape, dtype=np.int32)
+            origen = np.array([x0, c0])
+            cercanos = np.flatnonzero((y_max >= c0) & (y_min < c1))
+            for grosor in _grosores(banda):
+                for k in cercanos:
+                    a = tuple(int(v) for v in guia[k] - origen)
+                    b = tuple(int(v) for v in siguiente[k] - origen)
+                    cv2.line(mapa_guia, a, b, int(k) + 1, thickness=grosor)
+
+            guia_propia = mapa_guia[r0:r1]
+            ys, xs = np.nonzero((borde[r0:r1] != 0) & (guia_propia != 0))
+            puntos.append(np.column_stack((xs + x0, ys + ya)))
+            tramos.append(guia_propia[ys, xs] - 1)
+
+    return np.concatenate(puntos), np.concatenate(tramos), columnas, filas
+
+
+def _coser(puntos, tramos, guia):
+    """
+    Ordena los puntos a lo largo del contorno: por tramo del contorno
+    grueso y, dentro del tramo, por la proyección sobre su dirección.
+    """
+    a = guia[tramos]
+    d = np.roll(guia, -1, axis=0)[tramos] - a
+    t = ((puntos - a) * d).sum(axis=1) / np.maximum((d * d).sum(axis=1), 1)
+
+    return puntos[np.lexsort((t, tramos))]
+
+
+# ---------------------------------------------------------
+# ANÁLISIS
+# ---------------------------------------------------------
+
+def analizar_por_franjas(
+    origen, formato: str = "crudo", ancho: int = 0, alto: int = 0,
+    motor: str = None, plantilla: str = None, modo: str = None, medir: bool = False
+):
+    """
+    Analiza una subida mapeada desde disco por franjas de filas.
+
+    Args:
+        origen: Ruta del temporal o archivo abierto con fileno() (solo con
+                el ejecutor de hilos)
+        formato: "crudo" o "bits" (ver decodificar_crudo); "codificado"
+                 (PNG/JPEG) da un resultado ERROR
+        ancho, alto: Dimensiones, para "crudo" y "bits"
+        motor, plantilla, modo, medir: Como en analizar_imagen
+    """
+    crono = Cronometro()
+
+    try:
+        mapa = _mapear(origen)
+    except (OSError, ValueError) as e:
+        # mmap de un archivo vacío da ValueError
+        return {"status": "ERROR", "mensaje": f"No se pudo leer la subida: {str(e)}"}
+
+    try:
+        resultado = _analizar_mapa(mapa, formato, ancho, alto, motor, plantilla, modo, crono)
+    finally:
+        try:
+            mapa.close()
+        except BufferError:
+            # Algún array aún apunta al mapa; se libera con él
+            pass
+
+    if medir:
+        resultado["tiempos"] = crono.etapas
+
+    return resultado
+
+
+def _analizar_mapa(mapa, formato, ancho, alto, motor, plantilla, modo, crono: Cronometro) -> dict:
+    """Cuerpo de analizar_por_franjas; cada etapa se mide en `crono`."""
+    if (modo or MODO_ANALISIS) != "contorno":
+        return {"status": "ERROR", "mensaje": "El análisis por franjas solo admite el modo 'contorno'."}
+
+    try:
+        ideal = registro_plantillas.obtener(plantilla)
+    except PlantillaNoEncontradaError as e:
+        return {"status": "ERROR", "mensaje": str(e)}
+
+    try:
+        with crono.etapa("decodificacion"):
+            leer, ancho, alto, binaria = _fuente(mapa, formato, ancho, alto)
+    except ValueError as e:
+        return {"status": "ERROR", "mensaje": str(e)}
+
+    try:
+        f = max(1, min(FACTOR_REDUCCION, ancho, alto))
+
+        # Pasada 1: localización en la máscara reducida; antes, el filtro de
+        # fotogramas vacíos o saturados (el enfoque no se ve en la máscara)
+        with crono.etapa("localizacion"):
+            reducida = _reducir(leer, ancho, alto, binaria, f)
+
+        if FILTRO_FOTOGRAMAS:
+            with crono.etapa("filtro"):
+                descarte = evaluar_fotograma(reducida, binaria=True)
+
+            if descarte is not None:
+                return descarte
+
+        with crono.etapa("localizacion"):
+            contorno_grueso = _contorno_mayor(reducida)
+
+        if contorno_grueso is None:
+            return {"status": "ERROR", "mensaje": "No se detectó ningún contorno."}
+
+        x, y, w, h = cv2.boundingRect(contorno_grueso)
+        bbox = (x * f, y * f, w * f, h * f)
+
+        # Mismo prefiltro que el análisis escalonado
+        limite = max(DESPLAZAMIENTO_MAXIMO, ALINEACION_MAXIMA) if ALINEACION else DESPLAZAMIENTO_MAXIMO
+        desplazamiento, sobresale = _desplazamiento_bbox(bbox, ideal.bbox)
+        if desplazamiento - f > limite:
+            return resultado_fuera_de_posicion(max(desplazamiento, sobresale) - f, ideal, (0.0, 0.0))
+
+        # Pasada 2: bordes a resolución completa, solo en las filas de la ROI
+        margen = 2 * f
+        roi = (
+            max(0, bbox[0] - margen), max(0, bbox[1] - margen),
+            min(ancho, bbox[0] + bbox[2] + margen), min(alto, bbox[1] + bbox[3] + margen),
+        )
+        # Pieza gruesa rellena (sin manchas sueltas ni huecos) y su interior
+        pieza_gruesa = np.zeros_like(reducida)
+        cv2.drawContours(pieza_gruesa, [contorno_grueso], -1, 255, thickness=cv2.FILLED)
+        nucleo = cv2.erode(pieza_gruesa, np.ones((3, 3), np.uint8), borderType=cv2.BORDER_CONSTANT, borderValue=0)
+
+        guia = _tramos_guia(contorno_grueso, f)
+        puntos, tramos, columnas, filas = _bordes(
+            leer, roi, alto, binaria, guia, margen, (pieza_gruesa, nucleo, f), crono
+        )
+
+        if len(puntos) == 0:
+            return {"status": "ERROR", "mensaje": "No se detectó ningún contorno."}
+
+        with crono.etapa("alineacion"):
+            alineacion = (0.0, 0.0)
+            if ALINEACION:
+                alineacion = _limitar_alineacion(
+                    *desplazamiento_por_perfiles(columnas, filas, ideal, origen=roi[:2])
+                )
+
+        with crono.etapa("contornos"):
+            puntos = _coser(puntos, tramos, guia)
+
+        return resultado_contorno(puntos, ideal, motor, alineacion, crono)
+
+    except Exception as e:
+        return {
+            "status": "ERROR",
+            "mensaje": f"Error durante el análisis: {str(e)}"
+        }
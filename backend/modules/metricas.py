@@ -0,0 +1,143 @@
+# backend/modules/metricas.py
+"""
+Métricas internas del servicio (contadores, indicadores instantáneos e
+histogramas de latencia). Se exponen en JSON a través de GET /api/metricas.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable
+
+# Límites superiores (ms) de las cubetas de los histogramas de latencia
+CUBETAS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_lock = threading.Lock()
+_contadores = defaultdict(int)
+_indicadores = {}
+_histogramas = {}
+
+
+def incrementar(nombre: str, cantidad: int = 1):
+    """Suma `cantidad` al contador `nombre`."""
+    with _lock:
+        _contadores[nombre] += cantidad
+
+
+def registrar_indicador(nombre: str, funcion: Callable[[], float]):
+    """
+    Registra un indicador cuyo valor se lee en el momento de la consulta
+    (por ejemplo, la profundidad de una cola).
+    """
+    _indicadores[nombre] = funcion
+
+
+# ---------------------------------------------------------
+# HISTOGRAMAS DE LATENCIA
+# ---------------------------------------------------------
+
+class Histograma:
+    """Histograma de cubetas fijas (CUBETAS_MS) con suma, total y máximo."""
+
+    def __init__(self):
+        self.cuentas = [0] * (len(CUBETAS_MS) + 1)
+        self.total = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+
+    def observar(self, valor_ms: float):
+        self.cuentas[bisect_left(CUBETAS_MS, valor_ms)] += 1
+        self.total += 1
+        self.suma += valor_ms
+        self.maximo = max(self.maximo, valor_ms)
+
+    def percentil(self, p: float) -> float:
+        """
+        Límite superior de la cubeta que contiene el percentil `p` (0-100),
+        sin pasar del máximo observado.
+        """
+        objetivo = self.total * p / 100
+        acumulado = 0
+
+        for i, cuenta in enumerate(self.cuentas):
+            acumulado += cuenta
+            if cuenta and acumulado >= objetivo:
+                return min(CUBETAS_MS[i], round(self.maximo, 3)) if i < len(CUBETAS_MS) else round(self.maximo, 3)
+
+        return 0.0
+
+    def resumen(self) -> dict:
+        return {
+            "total": self.total,
+            "media_ms": round(self.suma / self.total, 3) if self.total else 0.0,
+            "p50_ms": self.percentil(50),
+            "p90_ms": self.percentil(90),
+            "p99_ms": self.percentil(99),
+            "max_ms": round(self.maximo, 3),
+            "cubetas": {
+                **{str(limite): cuenta for limite, cuenta in zip(CUBETAS_MS, self.cuentas)},
+                "inf": self.cuentas[-1],
+            },
+        }
+
+
+def observar(nombre: str, valor_ms: float):
+    """Añade una medición (ms) al histograma `nombre`."""
+    with _lock:
+        histograma = _histogramas.get(nombre)
+        if histograma is None:
+            histograma = _histogramas[nombre] = Histograma()
+        histograma.observar(valor_ms)
+
+
+class Cronometro:
+    """
+    Tiempos por etapa de una petición, medidos con time.perf_counter
+    (reloj monotónico). Una etapa repetida acumula su duración.
+    """
+
+    def __init__(self):
+        self.etapas = {}
+
+    @contextmanager
+    def etapa(self, nombre: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sumar(nombre, (time.perf_counter() - inicio) * 1000)
+
+    def sumar(self, nombre: str, ms: float):
+        self.etapas[nombre] = self.etapas.get(nombre, 0.0) + ms
+
+    def agregar(self, etapas: dict):
+        """Incorpora etapas medidas en otro hilo o proceso."""
+        for nombre, ms in etapas.items():
+            self.sumar(nombre, ms)
+
+    def redondeadas(self) -> dict:
+        return {nombre: round(ms, 3) for nombre, ms in self.etapas.items()}
+
+    def server_timing(self) -> str:
+        """Valor de la cabecera Server-Timing (ms por etapa)."""
+        return ", ".join(f"{nombre};dur={ms:.2f}" for nombre, ms in self.etapas.items())
+
+    def registrar(self, prefijo: str):
+        """Vuelca cada etapa en el histograma `<prefijo>.<etapa>`."""
+        for nombre, ms in self.etapas.items():
+            observar(f"{prefijo}.{nombre}", ms)
+
+
+def obtener_metricas() -> dict:
+    """Devuelve una instantánea de contadores, indicadores e histogramas."""
+    with _lock:
+        contadores = dict(_contadores)
+        histogramas = {nombre: h.resumen() for nombre, h in sorted(_histogramas.items())}
+
+    return {
+        "contadores": contadores,
+        "indicadores": {nombre: funcion() for nombre, funcion in _indicadores.items()},
+        "histogramas": histogramas,
+    }
@@ -0,0 +1,197 @@
+# backend/modules/migraciones.py
+"""
+Migraciones versionadas del esquema para bases de datos creadas con
+versiones anteriores. Base.metadata.create_all crea las tablas nuevas
+(con sus índices), pero no añade columnas ni índices a las existentes ni
+convierte datos; eso se hace aquí.
+
+Cada migración tiene un número de versión y se aplica una sola vez, en
+orden, dentro de su propia transacción junto con su fila en la tabla
+schema_version. Todas son idempotentes: en una base recién creada por
+create_all no cambian nada y solo quedan registradas.
+
+Para añadir una: escribir la función (recibe la conexión) y agregarla al
+final de MIGRACIONES con la versión siguiente. Si cambia el esquema,
+reflejarlo también en models.py para las bases nuevas.
+"""
+
+import json
+from datetime import datetime
+
+from sqlalchemy import bindparam, inspect, text
+from sqlalchemy.exc import IntegrityError
+
+from .codificacion_defectos import columnas_defectos, decodificar_puntos
+
+# Columnas añadidas a inspecciones para la codificación compacta de defectos
+COLUMNAS_DEFECTOS = {
+    "segmentos_defecto": "TEXT",
+    "puntos_blob": "BLOB",
+    "total_puntos": "INTEGER DEFAULT 0",
+    "total_segmentos": "INTEGER DEFAULT 0",
+}
+
+TAMANO_LOTE_MIGRACION = 500
+
+
+def migrar_codificacion_defectos(conn) -> int:
+    """
+    Añade las columnas de defectos compactos y convierte las filas que
+    todavía guardan los puntos como JSON. Es idempotente.
+
+    El JSON de cada fila solo se borra cuando su blob ya está escrito y,
+    releído, da los mismos puntos. Si no se guarda blob (GUARDAR_PUNTOS=no
+    o coordenadas fuera de int16) el JSON se conserva: es la única copia
+    de los puntos crudos.
+
+    Returns:
+        Número de filas convertidas
+    """
+    existentes = {c["name"] for c in inspect(conn).get_columns("inspecciones")}
+
+    for nombre, tipo in COLUMNAS_DEFECTOS.items():
+        if nombre not in existentes:
+            conn.execute(text(f"ALTER TABLE inspecciones ADD COLUMN {nombre} {tipo}"))
+
+    convertidas = 0
+
+    while True:
+        filas = conn.execute(
+            text(
+                "SELECT id, puntos_defectuosos FROM inspecciones "
+                "WHERE segmentos_defecto IS NULL LIMIT :limite"
+            ),
+            {"limite": TAMANO_LOTE_MIGRACION},
+        ).fetchall()
+
+        if not filas:
+            break
+
+        con_blob = {}
+        for id_fila, puntos_json in filas:
+            puntos = json.loads(puntos_json) if puntos_json else []
+            columnas = columnas_defectos(puntos)
+            columnas["puntos_defectuosos"] = puntos_json
+            conn.execute(
+                text(
+                    "UPDATE inspecciones SET "
+                    "puntos_defectuosos = :puntos_defectuosos, puntos_blob = :puntos_blob, "
+                    "segmentos_defecto = :segmentos_defecto, total_puntos = :total_puntos, "
+                    "total_segmentos = :total_segmentos "
+                    "WHERE id = :id"
+                ),
+                {"id": id_fila, **columnas},
+            )
+            if columnas["puntos_blob"] is not None:
+                con_blob[id_fila] = puntos
+
+        if con_blob:
+            _borrar_json_verificado(conn, con_blob)
+
+        convertidas += len(filas)
+
+    if convertidas:
+        print(f"✔ Migración: {convertidas} inspecciones convertidas a defectos compactos.")
+
+    return convertidas
+
+
+def _borrar_json_verificado(conn, puntos_por_id: dict):
+    """Relee los blobs recién escritos y borra el JSON de los que coinciden."""
+    escritos = conn.execute(
+        text("SELECT id, puntos_blob FROM inspecciones WHERE id IN :ids").bindparams(
+            bindparam("ids", expanding=True)
+        ),
+        {"ids": list(puntos_por_id)},
+    ).fetchall()
+
+    verificados = [
+        {"id": id_fila} for id_fila, blob in escritos
+        if decodificar_puntos(blob) == puntos_por_id[id_fila]
+    ]
+
+    if verificados:
+        conn.execute(text("UPDATE inspecciones SET puntos_defectuosos = NULL WHERE id = :id"), verificados)
+
+
+# Índices de las consultas frecuentes (mismos nombres que en models.py):
+#   - Todos los listados y la ventana de alertas: ORDER BY inspecciones.fecha DESC
+#   - Filtro por categoría, ordenado por fecha
+#   - Inspecciones de un lote (lote_id)
+#   - Alerta reciente: WHERE tipo_alerta = ? AND fecha >= ?
+#   - Historial y pendientes de alertas, y listado de lotes: ORDER BY fecha DESC
+INDICES_CONSULTAS = {
+    "ix_inspecciones_fecha": "inspecciones (fecha)",
+    "ix_inspecciones_categoria_fecha": "inspecciones (categoria, fecha)",
+    "ix_inspecciones_lote_id": "inspecciones (lote_id)",
+    "ix_alertas_tipo_alerta_fecha": "alertas (tipo_alerta, fecha)",
+    "ix_alertas_fecha": "alertas (fecha)",
+    "ix_lotes_fecha": "lotes (fecha)",
+}
+
+
+def crear_indices_consultas(conn):
+    """Crea los índices de INDICES_CONSULTAS que falten."""
+    for nombre, definicion in INDICES_CONSULTAS.items():
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {nombre} ON {definicion}"))
+
+    # Estadísticas para que el planificador elija bien entre índices
+    conn.execute(text("ANALYZE"))
+
+
+# (versión, descripción, función); la versión solo puede crecer
+MIGRACIONES = [
+    (1, "codificación compacta de defectos", migrar_codificacion_defectos),
+    (2, "índices de las consultas frecuentes", crear_indices_consultas),
+]
+
+
+# ---------------------------------------------------------
+# APLICACIÓN
+# ---------------------------------------------------------
+
+def version_esquema(engine) -> int:
+    """Última versión aplicada (0 si la base no tiene schema_version)."""
+    if not inspect(engine).has_table("schema_version"):
+        return 0
+
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+def migrar(engine, hasta: int = None) -> int:
+    """
+    Aplica en orden las migraciones pendientes (hasta la versión `hasta`,
+    si se indica). Si otro proceso (otro worker arrancando a la vez) aplica
+    la misma versión, el INSERT en schema_version choca con la clave
+    primaria y esta se omite.
+
+    Returns:
+        Versión del esquema tras migrar
+    """
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER PRIMARY KEY, descripcion TEXT, fecha TEXT)"
+        ))
+
+    actual = version_esquema(engine)
+
+    for version, descripcion, funcion in MIGRACIONES:
+        if version <= actual or (hasta is not None and version > hasta):
+            continue
+
+        try:
+            with engine.begin() as conn:
+                # Primero la fila de la versión: toma el cerrojo de escritura
+                conn.execute(
+                    text("INSERT INTO schema_version (version, descripcion, fecha) VALUES (:v, :d, :f)"),
+                    {"v": version, "d": descripcion, "f": datetime.now().isoformat()},
+                )
+                funcion(conn)
+        except IntegrityError:
+            continue
+
+        print(f"✔ Migración {version} aplicada: {descripcion}.")
+
+    return version_esquema(engine)
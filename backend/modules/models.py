@@ -1,5 +1,5 @@
 # backend/modules/models.py
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, LargeBinary, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from .db import Base
@@ -14,7 +14,7 @@ class Lote(Base):
     codigo_lote = Column(String(30), unique=True, index=True)
     inspector = Column(String(100))
     estado = Column(String(20), default="EN PROCESO")
-    fecha = Column(DateTime(timezone=True), server_default=func.now())
+    fecha = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
     # 1:N (un lote tiene muchas inspecciones)
     inspecciones = relationship("Inspeccion", back_populates="lote")
@@ -29,16 +29,32 @@ class Inspeccion(Base):
     id = Column(Integer, primary_key=True, index=True)
     resultado = Column(String(20))
     max_distancia = Column(Float)
-    puntos_defectuosos = Column(String)
+
+    # Formato antiguo (JSON). Las filas nuevas usan segmentos + blob
+    # (ver modules/codificacion_defectos.py); aquí queda NULL.
+    puntos_defectuosos = Column(String, nullable=True)
+
+    # Defectos compactos: tramos del contorno fuera de tolerancia (JSON)
+    # y puntos crudos como blob int16 codificado por deltas (opcional)
+    segmentos_defecto = Column(Text, nullable=True)
+    puntos_blob = Column(LargeBinary, nullable=True)
+    total_puntos = Column(Integer, default=0)
+    total_segmentos = Column(Integer, default=0)
 
     categoria = Column(String(50), index=True, default="Excluido")
 
-    fecha = Column(DateTime(timezone=True), default=func.now())
+    fecha = Column(DateTime(timezone=True), default=func.now(), index=True)
 
     # Relación con Lote (opcional)
-    lote_id = Column(Integer, ForeignKey("lotes.id"), nullable=True)
+    lote_id = Column(Integer, ForeignKey("lotes.id"), nullable=True, index=True)
     lote = relationship("Lote", back_populates="inspecciones")
 
+    # Índices de las consultas frecuentes (las bases existentes los reciben
+    # con la migración 2, ver migraciones.py)
+    __table_args__ = (
+        Index("ix_inspecciones_categoria_fecha", "categoria", "fecha"),
+    )
+
 
 # ----------------------------
 # MODELO ALERTA
@@ -57,4 +73,9 @@ class Alert(Base):
     umbral_configurado = Column(Float)
     recomendacion = Column(Text)
     notificacion_enviada = Column(Boolean, default=False)
-    fecha = Column(DateTime(timezone=True), default=func.now())
+    fecha = Column(DateTime(timezone=True), default=func.now(), index=True)
+
+    # Búsqueda de la alerta reciente de un tipo (ver migraciones.py)
+    __table_args__ = (
+        Index("ix_alertas_tipo_alerta_fecha", "tipo_alerta", "fecha"),
+    )
@@ -0,0 +1,813 @@
+# backend/modules/plantillas.py
+"""
+Registro de plantillas ideales por nombre.
+
+Cada plantilla se decodifica y se procesa una sola vez: la entrada guarda
+el contorno, su bounding box, su área y los mapas derivados (mapa de
+distancias con signo). El registro mantiene un número limitado de
+plantillas (LRU) y vuelve a compilar una plantilla automáticamente cuando
+cambia la fecha de modificación de su PNG, sin reiniciar el servidor.
+
+Las plantillas también pueden compilarse de antemano a un .npz junto al
+PNG (ver compilar_plantillas.py). Al cargar, si el hash del PNG coincide
+con el guardado en el .npz, los arreglos se mapean en memoria directamente
+desde el archivo y no se decodifica ni se procesa ninguna imagen.
+
+Con varios procesos (workers de uvicorn o el pool de análisis), la
+plantilla se publica una sola vez en un directorio compartido (por
+defecto en /dev/shm; ver PLANTILLAS_COMPARTIDAS). Los demás procesos la mapean en solo lectura y
+comparten las mismas páginas. Un contador de generación en ese directorio
+avisa de cada publicación: cuando una plantilla se recarga, todos los
+procesos pasan a la nueva versión en su siguiente uso.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import stat
+import struct
+import tempfile
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+from .dependencias import importar_perezoso
+
+try:
+    import fcntl
+except ImportError:  # Windows: se usa un archivo de cerrojo exclusivo
+    fcntl = None
+
+# OpenCV se importa en el primer uso (ver dependencias.py)
+cv2 = importar_perezoso("cv2")
+
+# Carpeta backend/
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Carpeta con las plantillas adicionales: plantillas/<nombre>.png
+DIRECTORIO_PLANTILLAS = os.getenv(
+    "DIRECTORIO_PLANTILLAS", os.path.join(BACKEND_DIR, "plantillas")
+)
+
+# Nombre de la plantilla por defecto (plantilla_ideal.png)
+PLANTILLA_POR_DEFECTO = "ideal"
+
+# Máximo de plantillas compiladas en memoria
+CAPACIDAD_PLANTILLAS = int(os.getenv("CAPACIDAD_PLANTILLAS", "8"))
+
+# Umbral de binarización (el mismo que se aplica a las imágenes reales)
+UMBRAL_BINARIZACION = 50
+
+
+def _compartir_plantillas() -> bool:
+    """
+    Si se publican las plantillas compiladas para que los demás procesos
+    las mapeen. PLANTILLAS_COMPARTIDAS: "1" siempre, "0" nunca y "auto"
+    (por defecto) solo con varios procesos: workers de uvicorn
+    (WEB_CONCURRENCY > 1) o el pool de procesos de análisis
+    (EJECUTOR_ANALISIS=procesos). Con un solo proceso el almacén no ahorra
+    memoria y costaría escribir en /dev/shm y leer el contador de
+    generación en cada obtener.
+    """
+    valor = os.getenv("PLANTILLAS_COMPARTIDAS", "auto")
+    if valor != "auto":
+        return valor == "1"
+
+    try:
+        workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    except ValueError:
+        workers = 1
+
+    return workers > 1 or os.getenv("EJECUTOR_ANALISIS", "hilos") == "procesos"
+
+
+PLANTILLAS_COMPARTIDAS = _compartir_plantillas()
+
+# Directorio compartido entre procesos (por defecto en memoria, /dev/shm,
+# con un nombre propio de esta instalación y de este usuario; se crea
+# privado, ver AlmacenCompartido)
+DIRECTORIO_COMPARTIDO = os.getenv("DIRECTORIO_COMPARTIDO") or os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+    "plantillas_" + hashlib.sha1(
+        f"{BACKEND_DIR}|{os.getuid() if hasattr(os, 'getuid') else ''}".encode()
+    ).hexdigest()[:8],
+)
+
+# Versión del formato .npz: si cambian los artefactos, los .npz antiguos
+# dejan de ser válidos y se vuelve a compilar desde el PNG.
+VERSION_COMPILADA = 1
+
+_NOMBRE_VALIDO = re.compile(r"^[\w\-]+$")
+
+
+class PlantillaNoEncontradaError(Exception):
+    """No existe una plantilla con ese nombre o no se pudo procesar."""
+
+
+@dataclass
+class Plantilla:
+    """Plantilla ideal con todos sus artefactos precalculados."""
+    nombre: str
+    ruta: Optional[str]
+    mtime: Optional[int]
+    forma: tuple
+    contorno: np.ndarray
+    bbox: tuple          # (x, y, ancho, alto)
+    area: float
+    mapa_distancia: np.ndarray
+    hash_origen: Optional[str] = None
+    # Generación con la que se publicó en el directorio compartido (0 = local)
+    generacion: int = 0
+    # Máscaras del análisis por área, por tolerancia (se calculan al primer uso)
+    _mascaras_area: dict = field(default_factory=dict, repr=False, compare=False)
+    # Espectros de las proyecciones de la silueta (alineación; al primer uso)
+    _espectros: Optional[tuple] = field(default=None, repr=False, compare=False)
+
+    def mascaras_area(self, tolerancia: float) -> tuple:
+        """
+        Máscaras uint8 (0/255) de la plantilla para el análisis por área.
+
+        Returns:
+            (fuera, nucleo): `fuera` son los píxeles a más de `tolerancia`
+            px por fuera del contorno ideal (ahí no puede haber material);
+            `nucleo` los que están a más de `tolerancia` px por dentro
+            (ahí tiene que haberlo). Es la plantilla dilatada y erosionada
+            por la tolerancia, sacadas del mapa de distancias.
+        """
+        mascaras = self._mascaras_area.get(tolerancia)
+
+        if mascaras is None:
+            fuera = np.where(self.mapa_distancia < -tolerancia, 255, 0).astype(np.uint8)
+            nucleo = np.where(self.mapa_distancia > tolerancia, 255, 0).astype(np.uint8)
+            mascaras = self._mascaras_area[tolerancia] = (fuera, nucleo)
+
+        return mascaras
+
+    def espectros_perfiles(self) -> tuple:
+        """
+        Conjugado de la FFT de las proyecciones de la silueta (material por
+        columna y por fila), para la correlación de fase de la alineación.
+        Se calcula una sola vez por plantilla.
+
+        Returns:
+            (espectro_x, espectro_y)
+        """
+        if self._espectros is None:
+            # Con numpy: cargar una plantilla ya compilada no necesita OpenCV
+            silueta = self.mapa_distancia >= 0
+            perfil_x = silueta.sum(axis=0, dtype=np.float32)
+            perfil_y = silueta.sum(axis=1, dtype=np.float32)
+            self._espectros = (np.conj(np.fft.rfft(perfil_x)), np.conj(np.fft.rfft(perfil_y)))
+
+        return self._espectros
+
+
+# ---------------------------------------------------------
+# COMPILACIÓN DE UNA PLANTILLA
+# ---------------------------------------------------------
+
+def construir_mapa_distancia(contorno, forma):
+    """
+    Calcula el mapa de distancias con signo de un contorno.
+
+    Cada píxel guarda su distancia euclídea al borde del contorno:
+    positiva dentro, negativa fuera y 0 sobre el propio borde.
+    """
+    mascara = np.zeros(forma, dtype=np.uint8)
+    cv2.drawContours(mascara, [contorno], -1, 255, thickness=cv2.FILLED)
+
+    dist_fuera = cv2.distanceTransform(
+        cv2.bitwise_not(mascara), cv2.DIST_L2, cv2.DIST_MASK_PRECISE
+    )
+    dist_dentro = cv2.distanceTransform(mascara, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+
+    # Los píxeles del borde pertenecen a la máscara y distan 1 del fondo;
+    # restamos 1 para que el borde quede en 0 como en pointPolygonTest.
+    return np.where(mascara > 0, dist_dentro - 1.0, -dist_fuera).astype(np.float32)
+
+
+def compilar_plantilla(
+    nombre: str, img: np.ndarray, ruta: str = None, mtime: int = None, hash_origen: str = None
+) -> Plantilla:
+    """
+    Extrae el contorno de una imagen en escala de grises y precalcula
+    todos los artefactos de la plantilla.
+
+    Raises:
+        PlantillaNoEncontradaError: Si la imagen no tiene contornos
+    """
+    # Umbralización (sin blur)
+    _, thresh = cv2.threshold(img, UMBRAL_BINARIZACION, 255, cv2.THRESH_BINARY)
+
+    contornos, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    if not contornos:
+        raise PlantillaNoEncontradaError(
+            f"No se detectaron contornos en la plantilla '{nombre}'."
+        )
+
+    # Nos quedamos con el contorno más grande
+    contorno = max(contornos, key=cv2.contourArea)
+
+    return Plantilla(
+        nombre=nombre,
+        ruta=ruta,
+        mtime=mtime,
+        forma=img.shape,
+        contorno=contorno,
+        bbox=tuple(int(v) for v in cv2.boundingRect(contorno)),
+        area=float(cv2.contourArea(contorno)),
+        mapa_distancia=construir_mapa_distancia(contorno, img.shape),
+        hash_origen=hash_origen,
+    )
+
+
+# ---------------------------------------------------------
+# PLANTILLAS COMPILADAS EN DISCO (.npz)
+# ---------------------------------------------------------
+
+def calcular_hash(datos: bytes) -> str:
+    """Hash SHA-256 de los bytes del PNG de origen."""
+    return hashlib.sha256(datos).hexdigest()
+
+
+def ruta_compilada(ruta_png: str) -> str:
+    """plantilla_ideal.png → plantilla_ideal.npz (en la misma carpeta)."""
+    return os.path.splitext(ruta_png)[0] + ".npz"
+
+
+def guardar_compilada(plantilla: Plantilla, ruta_npz: str):
+    """
+    Guarda los artefactos de la plantilla en un .npz sin comprimir, para
+    que después se puedan mapear en memoria sin copiarlos.
+    """
+    temporal = ruta_npz + ".tmp"
+
+    with open(temporal, "wb") as f:
+        np.savez(
+            f,
+            contorno=plantilla.contorno,
+            mapa_distancia=plantilla.mapa_distancia,
+            forma=np.array(plantilla.forma, dtype=np.int64),
+            bbox=np.array(plantilla.bbox, dtype=np.int64),
+            area=np.array(plantilla.area, dtype=np.float64),
+            hash_origen=np.array(plantilla.hash_origen or ""),
+            umbral=np.array(UMBRAL_BINARIZACION),
+            version=np.array(VERSION_COMPILADA),
+        )
+
+    # Reemplazo atómico: un trabajador nunca ve un .npz a medio escribir
+    os.replace(temporal, ruta_npz)
+
+
+def _abrir_npz_mapeado(ruta_npz: str) -> dict:
+    """
+    Abre un .npz devolviendo cada arreglo como np.memmap de solo lectura.
+
+    np.load no mapea los miembros de un .npz, así que se localiza el
+    .npy de cada miembro (guardado sin comprimir) dentro del zip y se
+    mapea directamente. Los miembros comprimidos se leen de forma normal.
+    """
+    arreglos = {}
+
+    with zipfile.ZipFile(ruta_npz) as zf, open(ruta_npz, "rb") as f:
+        for info in zf.infolist():
+            nombre = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+
+            if info.compress_type != zipfile.ZIP_STORED:
+                with zf.open(info) as miembro:
+                    arreglos[nombre] = np.lib.format.read_array(miembro)
+                continue
+
+            # Cabecera local del zip: 30 bytes + nombre + campo extra
+            f.seek(info.header_offset)
+            cabecera = f.read(30)
+            largo_nombre, largo_extra = struct.unpack("<HH", cabecera[26:30])
+            inicio = info.header_offset + 30 + largo_nombre + largo_extra
+            f.seek(inicio)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                forma, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                forma, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+
+            if not forma or 0 in forma:
+                # Escalares y arreglos vacíos: no se pueden mapear
+                f.seek(inicio)
+                arreglos[nombre] = np.lib.format.read_array(f)
+            else:
+                arreglos[nombre] = np.memmap(
+                    ruta_npz, dtype=dtype, mode="r", offset=f.tell(),
+                    shape=forma, order="F" if fortran else "C",
+                )
+
+    return arreglos
+
+
+def cargar_compilada(
+    nombre: str, ruta_npz: str, hash_origen: str, ruta: str = None, mtime: int = None
+) -> Optional[Plantilla]:
+    """
+    Carga una plantilla compilada si existe y corresponde al PNG actual.
+
+    Returns:
+        La plantilla mapeada en memoria, o None si no hay .npz o si su
+        hash, umbral o versión ya no coinciden (hay que usar el PNG).
+    """
+    if not os.path.exists(ruta_npz):
+        return None
+
+    try:
+        datos = _abrir_npz_mapeado(ruta_npz)
+
+        if (
+            str(datos["hash_origen"]) != hash_origen
+            or int(datos["umbral"]) != UMBRAL_BINARIZACION
+            or int(datos["version"]) != VERSION_COMPILADA
+        ):
+            return None
+
+        return Plantilla(
+            nombre=nombre,
+            ruta=ruta,
+            mtime=mtime,
+            forma=tuple(int(v) for v in datos["forma"]),
+            contorno=datos["contorno"],
+            bbox=tuple(int(v) for v in datos["bbox"]),
+            area=float(datos["area"]),
+            mapa_distancia=datos["mapa_distancia"],
+            hash_origen=hash_origen,
+        )
+
+    except Exception as e:
+        print(f"⚠ No se pudo usar la plantilla compilada {ruta_npz}: {e}")
+        return None
+
+
+def compilar_desde_png(nombre: str, ruta: str) -> Plantilla:
+    """
+    Lee el PNG de una plantilla y la compila (sin usar ni escribir el .npz).
+
+    Raises:
+        PlantillaNoEncontradaError: Si el PNG no existe o no es válido
+    """
+    try:
+        with open(ruta, "rb") as f:
+            datos = f.read()
+        mtime = os.stat(ruta).st_mtime_ns
+    except OSError:
+        raise PlantillaNoEncontradaError(f"No existe la plantilla '{nombre}'.")
+
+    img = cv2.imdecode(np.frombuffer(datos, np.uint8), cv2.IMREAD_GRAYSCALE)
+
+    if img is None:
+        raise PlantillaNoEncontradaError(f"No se pudo leer la plantilla '{nombre}'.")
+
+    return compilar_plantilla(nombre, img, ruta=ruta, mtime=mtime, hash_origen=calcular_hash(datos))
+
+
+# ---------------------------------------------------------
+# PUBLICACIÓN COMPARTIDA ENTRE PROCESOS
+# ---------------------------------------------------------
+
+class AlmacenCompartido:
+    """
+    Plantillas compiladas publicadas en un directorio común a todos los
+    procesos del servicio.
+
+    - generacion: contador de 8 bytes mapeado en memoria. Cada publicación
+      lo incrementa, y leerlo en cada petición cuesta una lectura de memoria.
+    - <nombre>.json: índice de la versión vigente (generación, archivo,
+      mtime y ruta del PNG). Se reemplaza de forma atómica.
+    - <nombre>-g<generación>.npz: artefactos de esa versión. No se
+      modifican nunca, así que un proceso nunca ve una versión a medias.
+
+    Publicar y avanzar el contador se hace con un cerrojo de archivo.
+
+    El directorio se crea con permisos 0700 y, antes de usarlo, se comprueba
+    que pertenece al usuario del servicio y que nadie más puede escribir en
+    él: si otro usuario lo hubiera creado antes (el nombre por defecto es
+    predecible y /dev/shm admite escritura de todos), podría dejar ahí una
+    plantilla falsa que todos los procesos cargarían. Si la comprobación
+    falla, cada proceso usa su propia copia.
+    """
+
+    def __init__(self, directorio: str):
+        self.directorio = directorio
+        self._contador = None
+        self._verificado = False
+        self._lock = threading.Lock()
+
+    def _ruta(self, archivo: str) -> str:
+        return os.path.join(self.directorio, archivo)
+
+    def _preparar(self):
+        """
+        Crea el directorio (0700) o comprueba que es nuestro y privado.
+
+        Raises:
+            PermissionError: Si es de otro usuario, un enlace simbólico o
+                             admite escritura del grupo o de otros
+        """
+        if self._verificado:
+            return
+
+        os.makedirs(self.directorio, mode=0o700, exist_ok=True)
+        info = os.lstat(self.directorio)
+
+        if not stat.S_ISDIR(info.st_mode):
+            raise PermissionError(f"{self.directorio} no es un directorio.")
+
+        if hasattr(os, "getuid"):
+            if info.st_uid != os.getuid():
+                raise PermissionError(f"{self.directorio} pertenece a otro usuario.")
+
+            if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+                raise PermissionError(f"{self.directorio} admite escritura de otros usuarios.")
+
+        self._verificado = True
+
+    def _mapa_contador(self) -> mmap.mmap:
+        if self._contador is None:
+            with self._lock:
+                if self._contador is None:
+                    self._preparar()
+                    ruta = self._ruta("generacion")
+                    with open(ruta, "a+b") as f:
+                        if os.fstat(f.fileno()).st_size < 8:
+                            f.write(b"\0" * (8 - os.fstat(f.fileno()).st_size))
+                            f.flush()
+                        self._contador = mmap.mmap(f.fileno(), 8)
+        return self._contador
+
+    def generacion(self) -> int:
+        """Valor actual del contador de generación."""
+        return struct.unpack_from("<q", self._mapa_contador())[0]
+
+    @contextmanager
+    def _cerrojo(self):
+        """Exclusión entre procesos para publicar (flock o archivo exclusivo)."""
+        self._preparar()
+        ruta = self._ruta("cerrojo")
+
+        if fcntl is not None:
+            with open(ruta, "a+b") as f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            return
+
+        limite = time.monotonic() + 10
+        while True:
+            try:
+                fd = os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                if time.monotonic() > limite:
+                    # Cerrojo huérfano de un proceso que murió
+                    os.remove(ruta)
+                time.sleep(0.01)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            os.remove(ruta)
+
+    def indice(self, nombre: str) -> Optional[dict]:
+        """Índice de la versión publicada de una plantilla (o None)."""
+        try:
+            self._preparar()
+            with open(self._ruta(f"{nombre}.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def adjuntar(self, nombre: str, indice: dict = None) -> Optional[Plantilla]:
+        """
+        Mapea en solo lectura la versión publicada de una plantilla.
+
+        Returns:
+            La plantilla, o None si no hay ninguna publicada o ya no es válida
+        """
+        indice = indice or self.indice(nombre)
+
+        if indice is None:
+            return None
+
+        try:
+            self._preparar()
+            datos = _abrir_npz_mapeado(indice["archivo"])
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            return None
+
+        if int(datos["umbral"]) != UMBRAL_BINARIZACION or int(datos["version"]) != VERSION_COMPILADA:
+            return None
+
+        return Plantilla(
+            nombre=nombre,
+            ruta=indice["ruta"],
+            mtime=indice["mtime"],
+            forma=tuple(int(v) for v in datos["forma"]),
+            contorno=datos["contorno"],
+            bbox=tuple(int(v) for v in datos["bbox"]),
+            area=float(datos["area"]),
+            mapa_distancia=datos["mapa_distancia"],
+            hash_origen=str(datos["hash_origen"]) or None,
+            generacion=indice["generacion"],
+        )
+
+    def publicar(self, plantilla: Plantilla) -> Plantilla:
+        """
+        Publica una plantilla compilada como la versión vigente y avanza la
+        generación. Devuelve la copia mapeada desde el directorio compartido,
+        que es la que debe usar también este proceso.
+        """
+        with self._cerrojo():
+            generacion = self.generacion() + 1
+            anterior = self.indice(plantilla.nombre)
+
+            # Una plantilla ya mapeada desde su .npz se publica sin copiarla
+            archivo = getattr(plantilla.mapa_distancia, "filename", None)
+            if archivo is None:
+                archivo = self._ruta(f"{plantilla.nombre}-g{generacion}.npz")
+                guardar_compilada(plantilla, archivo)
+
+            indice = {
+                "generacion": generacion,
+                "archivo": archivo,
+                "mtime": plantilla.mtime,
+                "ruta": plantilla.ruta,
+            }
+            temporal = self._ruta(f"{plantilla.nombre}.json.tmp")
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(indice, f)
+            os.replace(temporal, self._ruta(f"{plantilla.nombre}.json"))
+
+            struct.pack_into("<q", self._mapa_contador(), 0, generacion)
+
+        # Los procesos que aún mapean la versión anterior la conservan
+        # hasta soltarla (el archivo borrado sigue mapeado)
+        if (
+            anterior and anterior["archivo"] != archivo
+            and anterior["archivo"].startswith(self.directorio + os.sep)
+        ):
+            try:
+                os.remove(anterior["archivo"])
+            except OSError:
+                pass
+
+        return self.adjuntar(plantilla.nombre, indice) or plantilla
+
+
+# ---------------------------------------------------------
+# REGISTRO CON LRU Y RECARGA AUTOMÁTICA
+# ---------------------------------------------------------
+
+class RegistroPlantillas:
+    """Plantillas compiladas, indexadas por nombre."""
+
+    def __init__(self, directorio: str, capacidad: int, compartido: AlmacenCompartido = None):
+        self.directorio = directorio
+        self.capacidad = capacidad
+        self.compartido = compartido
+        self._rutas = {}
+        self._entradas = OrderedDict()
+        # Generación del almacén compartido vista por última vez, por nombre
+        self._vistas = {}
+        self._lock = threading.Lock()
+
+    def asignar_ruta(self, nombre: str, ruta: str):
+        """Asocia un nombre a un PNG fuera del directorio de plantillas."""
+        self._rutas[nombre] = ruta
+
+    def ruta_de(self, nombre: str) -> str:
+        if nombre in self._rutas:
+            return self._rutas[nombre]
+
+        if not _NOMBRE_VALIDO.match(nombre):
+            raise PlantillaNoEncontradaError(f"Nombre de plantilla no válido: '{nombre}'.")
+
+        return os.path.join(self.directorio, f"{nombre}.png")
+
+    def nombres(self) -> list:
+        """Nombres de todas las plantillas disponibles."""
+        nombres = set(self._rutas)
+
+        if os.path.isdir(self.directorio):
+            nombres.update(
+                os.path.splitext(f)[0]
+                for f in os.listdir(self.directorio)
+                if f.endswith(".png")
+            )
+
+        return sorted(nombres)
+
+    def cargadas(self) -> list:
+        """Nombres de las plantillas compiladas en memoria (de menos a más reciente)."""
+        with self._lock:
+            return list(self._entradas)
+
+    def version(self, nombre: str = None) -> str:
+        """
+        Identifica la versión actual de una plantilla sin compilarla
+        (mtime de su PNG). Sirve para invalidar resultados cacheados.
+        """
+        nombre = nombre or PLANTILLA_POR_DEFECTO
+
+        with self._lock:
+            entrada = self._entradas.get(nombre)
+
+        if entrada is not None and entrada.ruta is None:
+            return f"memoria:{id(entrada)}"
+
+        try:
+            return str(os.stat(self.ruta_de(nombre)).st_mtime_ns)
+        except (OSError, PlantillaNoEncontradaError):
+            return ""
+
+    def obtener(self, nombre: str = None) -> Plantilla:
+        """
+        Devuelve la plantilla compilada. Solo se vuelve a leer el PNG si es
+        la primera vez que se pide o si su mtime cambió desde la compilación.
+        Si junto al PNG hay un .npz con el mismo hash, se usa ese archivo
+        (mapeado en memoria) en lugar de decodificar la imagen.
+
+        Raises:
+            PlantillaNoEncontradaError: Si la plantilla no existe o no es válida
+        """
+        nombre = nombre or PLANTILLA_POR_DEFECTO
+
+        with self._lock:
+            entrada = self._entradas.get(nombre)
+
+        # Otro proceso publicó una versión más nueva: se adopta
+        if self.compartido is not None:
+            entrada = self._sincronizar(nombre, entrada)
+
+        # Plantillas registradas en memoria: no dependen de ningún archivo
+        if entrada is not None and entrada.ruta is None:
+            self._tocar(nombre)
+            return entrada
+
+        ruta = self.ruta_de(nombre)
+
+        try:
+            mtime = os.stat(ruta).st_mtime_ns
+        except OSError:
+            raise PlantillaNoEncontradaError(f"No existe la plantilla '{nombre}'.")
+
+        if entrada is not None and entrada.mtime == mtime:
+            self._tocar(nombre)
+            return entrada
+
+        plantilla = self._compilar(nombre, ruta, mtime)
+
+        if entrada is not None:
+            print(f"🔄 Plantilla '{nombre}' recargada (el PNG cambió).")
+
+        return plantilla
+
+    def recargar(self, nombre: str = None) -> Plantilla:
+        """
+        Vuelve a compilar una plantilla desde su PNG aunque no haya cambiado
+        y, con el almacén compartido, la publica para todos los procesos.
+
+        Raises:
+            PlantillaNoEncontradaError: Si la plantilla no existe o no es válida
+        """
+        nombre = nombre or PLANTILLA_POR_DEFECTO
+        ruta = self.ruta_de(nombre)
+
+        try:
+            mtime = os.stat(ruta).st_mtime_ns
+        except OSError:
+            raise PlantillaNoEncontradaError(f"No existe la plantilla '{nombre}'.")
+
+        return self._compilar(nombre, ruta, mtime, forzar=True)
+
+    def olvidar(self, nombre: str = None) -> bool:
+        """
+        Quita una plantilla de la memoria de este proceso (el PNG y el
+        almacén compartido no se tocan): la siguiente vez que se pida se
+        vuelve a compilar o a adoptar. Devuelve si estaba cargada.
+        """
+        nombre = nombre or PLANTILLA_POR_DEFECTO
+
+        with self._lock:
+            self._vistas.pop(nombre, None)
+            return self._entradas.pop(nombre, None) is not None
+
+    def _sincronizar(self, nombre: str, entrada: Optional[Plantilla]) -> Optional[Plantilla]:
+        """
+        Si la generación compartida cambió desde la última vez, adopta la
+        versión publicada de `nombre` cuando es distinta de la que hay en
+        memoria. En el caso normal cuesta una lectura del contador.
+        """
+        try:
+            generacion = self.compartido.generacion()
+        except OSError:
+            # Sin directorio compartido utilizable cada proceso usa su copia
+            return entrada
+
+        if self._vistas.get(nombre) == generacion:
+            return entrada
+
+        indice = self.compartido.indice(nombre)
+        self._vistas[nombre] = generacion
+
+        if indice is None or (entrada is not None and entrada.generacion == indice["generacion"]):
+            return entrada
+
+        publicada = self.compartido.adjuntar(nombre, indice)
+        if publicada is None:
+            return entrada
+
+        self._guardar(publicada)
+        return publicada
+
+    def _compilar(self, nombre: str, ruta: str, mtime: int, forzar: bool = False) -> Plantilla:
+        """
+        Compila la plantilla desde su .npz o su PNG y la publica en el
+        almacén compartido. Sin `forzar`, si otro proceso ya publicó esta
+        misma versión del PNG (mismo mtime), se mapea esa en lugar de compilar.
+        """
+        if self.compartido is not None and not forzar:
+            indice = self.compartido.indice(nombre)
+            if indice is not None and indice["mtime"] == mtime:
+                publicada = self.compartido.adjuntar(nombre, indice)
+                if publicada is not None:
+                    self._guardar(publicada)
+                    return publicada
+
+        try:
+            with open(ruta, "rb") as f:
+                datos = f.read()
+        except OSError:
+            raise PlantillaNoEncontradaError(f"No existe la plantilla '{nombre}'.")
+
+        hash_origen = calcular_hash(datos)
+        plantilla = cargar_compilada(nombre, ruta_compilada(ruta), hash_origen, ruta, mtime)
+
+        if plantilla is None:
+            img = cv2.imdecode(np.frombuffer(datos, np.uint8), cv2.IMREAD_GRAYSCALE)
+
+            if img is None:
+                raise PlantillaNoEncontradaError(f"No se pudo leer la plantilla '{nombre}'.")
+
+            plantilla = compilar_plantilla(
+                nombre, img, ruta=ruta, mtime=mtime, hash_origen=hash_origen
+            )
+
+        return self._publicar(plantilla)
+
+    def registrar(self, nombre: str, img: np.ndarray) -> Plantilla:
+        """
+        Compila y registra una plantilla a partir de una imagen en memoria.
+        Con el almacén compartido, también la ven los demás procesos.
+        """
+        return self._publicar(compilar_plantilla(nombre, img))
+
+    def _publicar(self, plantilla: Plantilla) -> Plantilla:
+        if self.compartido is not None and _NOMBRE_VALIDO.match(plantilla.nombre):
+            try:
+                plantilla = self.compartido.publicar(plantilla)
+                self._vistas[plantilla.nombre] = plantilla.generacion
+            except OSError as e:
+                print(f"⚠ No se pudo publicar la plantilla '{plantilla.nombre}': {e}")
+
+        self._guardar(plantilla)
+        return plantilla
+
+    def _tocar(self, nombre: str):
+        with self._lock:
+            if nombre in self._entradas:
+                self._entradas.move_to_end(nombre)
+
+    def _guardar(self, plantilla: Plantilla):
+        with self._lock:
+            self._entradas[plantilla.nombre] = plantilla
+            self._entradas.move_to_end(plantilla.nombre)
+
+            # Expulsar las menos usadas (nunca la plantilla por defecto)
+            for nombre in list(self._entradas):
+                if len(self._entradas) <= self.capacidad:
+                    break
+                if nombre != PLANTILLA_POR_DEFECTO:
+                    del self._entradas[nombre]
+
+
+registro_plantillas = RegistroPlantillas(
+    DIRECTORIO_PLANTILLAS, CAPACIDAD_PLANTILLAS,
+    AlmacenCompartido(DIRECTORIO_COMPARTIDO) if PLANTILLAS_COMPARTIDAS else None,
+)
@@ -0,0 +1,256 @@
+# backend/modules/transmision.py
+"""
+Inspección continua por WebSocket para las cámaras de la línea.
+
+Cada mensaje binario es un fotograma. Por conexión:
+- Los fotogramas entran en una cola acotada. Si el análisis se queda atrás,
+  la política de descarte decide qué hacer y se informa cuántos se
+  descartaron.
+- Se analizan hasta EN_VUELO_WS fotogramas a la vez en el ejecutor de
+  análisis, pero los resultados se envían siempre en orden de llegada.
+  Cada fotograma pasa por el control de admisión común (ejecutor.py): si
+  la cola de análisis está llena se descarta, y si no termina dentro del
+  plazo su resultado es un ERROR.
+- Los resultados válidos se guardan en micro-lotes (una transacción y una
+  verificación de alerta por lote). Los que el filtro de fotogramas marca
+  como "DESCARTADO" (cinta vacía, desenfoque...) se envían pero no se
+  guardan; "descartados" cuenta solo los que la cola de la conexión o el
+  control de admisión no admitieron.
+
+Mensajes del servidor (JSON):
+    {"tipo": "resultado", "secuencia": n, "descartados": d, ...resultado}
+    {"tipo": "persistido", "secuencias": [...], "ids": [...], "alerta_info": {...}}
+    {"tipo": "fin", "recibidos": r, "procesados": p, "descartados": d}
+El cliente puede enviar el texto "fin" para cerrar ordenadamente.
+"""
+
+import asyncio
+import os
+import time
+from functools import partial
+
+from fastapi import WebSocket
+
+from . import metricas
+from .analisis import analizar_molde, analizar_crudo
+from .codificacion_defectos import resumir_resultado
+from .crud import guardar_inspecciones
+from .ejecutor import (
+    control_admision, ejecutar_en_hilo, ColaLlenaError, PlazoExcedidoError, TRABAJADORES_ANALISIS
+)
+from .filtro_fotogramas import registrar_descarte
+
+# Qué hacer con un fotograma nuevo cuando la cola está llena:
+#   "descartar_antiguos" → se descarta el más antiguo en cola (prioriza lo reciente)
+#   "descartar_nuevos"   → se descarta el que acaba de llegar
+#   "bloquear"           → no se descarta nada; se deja de leer del socket
+POLITICA_DESCARTE_WS = os.getenv("POLITICA_DESCARTE_WS", "descartar_antiguos")
+POLITICAS_DESCARTE = ("descartar_antiguos", "descartar_nuevos", "bloquear")
+
+COLA_FOTOGRAMAS_WS = int(os.getenv("COLA_FOTOGRAMAS_WS", "8"))
+EN_VUELO_WS = int(os.getenv("EN_VUELO_WS", str(TRABAJADORES_ANALISIS)))
+
+# Un micro-lote se guarda al llegar a este tamaño o tras este intervalo
+LOTE_PERSISTENCIA_WS = int(os.getenv("LOTE_PERSISTENCIA_WS", "25"))
+INTERVALO_PERSISTENCIA_WS = float(os.getenv("INTERVALO_PERSISTENCIA_WS", "1.0"))
+
+_conexiones_activas = 0
+
+
+class SesionTransmision:
+    """Estado de una conexión WebSocket de inspección continua."""
+
+    def __init__(self, websocket: WebSocket, analizador, politica: str, resumen: bool, procesar_alerta):
+        self.websocket = websocket
+        self.analizador = analizador
+        self.politica = politica
+        self.resumen = resumen
+        self.procesar_alerta = procesar_alerta
+
+        self.cola = asyncio.Queue(maxsize=COLA_FOTOGRAMAS_WS)
+        self.en_vuelo = asyncio.Queue(maxsize=EN_VUELO_WS)
+
+        self.recibidos = 0
+        self.procesados = 0
+        self.descartados = 0
+        self.conectado = True
+
+        self._pendientes = []
+        self._ultimo_guardado = time.monotonic()
+
+    async def _enviar_json(self, mensaje: dict):
+        if not self.conectado:
+            return
+        try:
+            await self.websocket.send_json(mensaje)
+        except Exception:
+            self.conectado = False
+
+    # -----------------------------------------------------
+    # ETAPA 1: recepción y política de descarte
+    # -----------------------------------------------------
+    async def _recibir(self):
+        while True:
+            mensaje = await self.websocket.receive()
+
+            if mensaje["type"] == "websocket.disconnect":
+                self.conectado = False
+                break
+
+            if mensaje.get("text") == "fin":
+                break
+
+            datos = mensaje.get("bytes")
+            if not datos:
+                continue
+
+            self.recibidos += 1
+            metricas.incrementar("ws_fotogramas_recibidos")
+            fotograma = (self.recibidos, datos)
+
+            if self.politica == "bloquear":
+                await self.cola.put(fotograma)
+            elif not self.cola.full():
+                self.cola.put_nowait(fotograma)
+            else:
+                if self.politica == "descartar_antiguos":
+                    self.cola.get_nowait()
+                    self.cola.put_nowait(fotograma)
+                self.descartados += 1
+                metricas.incrementar("ws_fotogramas_descartados")
+
+        # Marca de fin para las demás etapas (si la recepción falla no
+        # llega a ponerse: ejecutar() las cancela)
+        await self.cola.put(None)
+
+    # -----------------------------------------------------
+    # ETAPA 2: envío al ejecutor (hasta EN_VUELO_WS a la vez)
+    # -----------------------------------------------------
+    async def _analizar(self):
+        while True:
+            fotograma = await self.cola.get()
+
+            if fotograma is None:
+                await self.en_vuelo.put(None)
+                break
+
+            # Mismo control de admisión que /api/inspeccionar: una
+            # transmisión no puede dejar sin trabajadores a las peticiones
+            secuencia, datos = fotograma
+            try:
+                future = control_admision.enviar(self.analizador, datos)
+            except ColaLlenaError:
+                self.descartados += 1
+                metricas.incrementar("ws_fotogramas_descartados")
+                continue
+
+            await self.en_vuelo.put((secuencia, future))
+
+    # -----------------------------------------------------
+    # ETAPA 3: resultados en orden + persistencia en micro-lotes
+    # -----------------------------------------------------
+    async def _responder(self):
+        while True:
+            try:
+                item = await asyncio.wait_for(self.en_vuelo.get(), timeout=INTERVALO_PERSISTENCIA_WS)
+            except asyncio.TimeoutError:
+                await self._persistir()
+                continue
+
+            if item is None:
+                break
+
+            secuencia, future = item
+            try:
+                resultado = await future
+            except PlazoExcedidoError as e:
+                resultado = {"status": "ERROR", "mensaje": str(e)}
+            except Exception as e:
+                # Un fotograma que rompe el analizador no cierra la conexión
+                resultado = {"status": "ERROR", "mensaje": f"Error durante el análisis: {str(e)}"}
+            self.procesados += 1
+
+            await self._enviar_json({
+                "tipo": "resultado",
+                "secuencia": secuencia,
+                "descartados": self.descartados,
+                **(resumir_resultado(resultado) if self.resumen else resultado),
+            })
+
+            if resultado.get("status") != "ERROR" and not registrar_descarte(resultado):
+                self._pendientes.append((secuencia, resultado))
+
+            if (
+                len(self._pendientes) >= LOTE_PERSISTENCIA_WS
+                or time.monotonic() - self._ultimo_guardado >= INTERVALO_PERSISTENCIA_WS
+            ):
+                await self._persistir()
+
+        await self._persistir()
+
+    async def _persistir(self):
+        self._ultimo_guardado = time.monotonic()
+
+        if not self._pendientes:
+            return
+
+        lote, self._pendientes = self._pendientes, []
+        guardadas = await ejecutar_en_hilo(guardar_inspecciones, [r for _, r in lote])
+        alerta_info = await ejecutar_en_hilo(self.procesar_alerta)
+
+        await self._enviar_json({
+            "tipo": "persistido",
+            "secuencias": [secuencia for secuencia, _ in lote],
+            "ids": [g.id for g in guardadas],
+            "alerta_info": alerta_info,
+        })
+
+    async def ejecutar(self):
+        global _conexiones_activas
+
+        await self.websocket.accept()
+        _conexiones_activas += 1
+
+        etapas = [
+            asyncio.ensure_future(etapa())
+            for etapa in (self._recibir, self._analizar, self._responder)
+        ]
+
+        try:
+            await asyncio.gather(*etapas)
+
+            await self._enviar_json({
+                "tipo": "fin",
+                "recibidos": self.recibidos,
+                "procesados": self.procesados,
+                "descartados": self.descartados,
+            })
+
+            if self.conectado:
+                await self.websocket.close()
+        finally:
+            # Si una etapa falla, las otras se quedarían esperando en sus colas
+            for etapa in etapas:
+                etapa.cancel()
+            await asyncio.gather(*etapas, return_exceptions=True)
+            _conexiones_activas -= 1
+
+
+def crear_analizador(
+    formato: str = None, ancho: int = None, alto: int = None, plantilla: str = None, modo: str = None
+):
+    """
+    Función (picklable, válida también para el pool de procesos) que analiza
+    un fotograma según el formato declarado al abrir la conexión.
+    """
+    if formato in ("crudo", "bits"):
+        return partial(_analizar_fotograma_crudo, ancho, alto, formato, plantilla, modo)
+
+    return partial(analizar_molde, plantilla=plantilla, modo=modo)
+
+
+def _analizar_fotograma_crudo(ancho, alto, formato, plantilla, modo, datos):
+    return analizar_crudo(datos, ancho, alto, formato, plantilla=plantilla, modo=modo)
+
+
+metricas.registrar_indicador("ws_conexiones_activas", lambda: _conexiones_activas)
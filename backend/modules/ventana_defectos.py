@@ -0,0 +1,186 @@
+# backend/modules/ventana_defectos.py
+"""
+Porcentaje de rechazos de las últimas N inspecciones, en memoria.
+
+AlertService.calcular_porcentaje_defectos se ejecuta tras cada inspección
+y cargaba las últimas CALCULATION_WINDOW filas completas (con sus puntos)
+solo para contar los RECHAZADO. Ahora crud registra cada veredicto al
+guardarlo en un anillo de la última ventana más grande, y para cada
+ventana configurada se lleva la cuenta de rechazos: al entrar un veredicto
+se suma, y el que sale de la ventana se resta. Registrar cuesta O(número
+de ventanas) y consultar una ventana configurada, O(1).
+
+La instancia es alert_service.ventana_defectos. El anillo se siembra desde
+la base la primera vez que se usa (el startup lo hace al arrancar). Borrar
+una inspección lo invalida: se vuelve a sembrar en la siguiente consulta.
+
+Cada proceso tiene su propio anillo y, por defecto, registrar y contar no
+tocan SQLite. Con varios workers de uvicorn (o scripts que escriben en la
+misma base), uno no ve las escrituras de los otros; con sincronizar=True,
+actualizar() —una vez por petición, antes de contar— comprueba el
+max(id) de la tabla (una búsqueda en la clave primaria) y, solo si cambió,
+añade las inspecciones con id mayor que el último contado. Cada
+`resiembra_s` segundos se vuelve a sembrar entero, que es como se ven los
+borrados hechos en otro proceso.
+"""
+
+import threading
+import time
+
+from sqlalchemy import func, select
+
+from .db import SessionLocal
+from .models import Inspeccion
+
+
+class VentanaDefectos:
+    """Anillo de los últimos veredictos (1 = RECHAZADO) con cuentas por ventana."""
+
+    def __init__(self, ventanas, sincronizar: bool = True, resiembra_s: float = 60.0):
+        self.ventanas = sorted(set(ventanas))
+        self.capacidad = self.ventanas[-1]
+        self.sincronizar = sincronizar
+        self.resiembra_s = resiembra_s
+
+        self._lock = threading.Lock()
+        self._vaciar()
+
+    def _vaciar(self):
+        self._anillo = bytearray(self.capacidad)
+        self._posicion = 0
+        self._llenos = 0
+        self._rechazados = dict.fromkeys(self.ventanas, 0)
+        self._sembrado = False
+        self._sembrado_en = 0.0
+        # Id más alto ya contado: lo guardado antes de sembrar ya está en la
+        # siembra y no se vuelve a sumar
+        self._ultimo_id = 0
+
+    def _agregar(self, rechazado: int):
+        for n in self.ventanas:
+            # El veredicto que sale de la ventana n (aún no sobrescrito:
+            # n <= capacidad)
+            if self._llenos >= n:
+                self._rechazados[n] -= self._anillo[(self._posicion - n) % self.capacidad]
+            self._rechazados[n] += rechazado
+
+        self._anillo[self._posicion] = rechazado
+        self._posicion = (self._posicion + 1) % self.capacidad
+        self._llenos = min(self._llenos + 1, self.capacidad)
+
+    def _sembrar(self):
+        """Carga los últimos `capacidad` resultados (solo esa columna)."""
+        db = SessionLocal()
+        try:
+            filas = db.execute(
+                select(Inspeccion.id, Inspeccion.resultado)
+                .order_by(Inspeccion.fecha.desc(), Inspeccion.id.desc())
+                .limit(self.capacidad)
+            ).all()
+        finally:
+            db.close()
+
+        self._vaciar()
+        for _, resultado in reversed(filas):
+            self._agregar(int(resultado == "RECHAZADO"))
+        self._ultimo_id = max((id_ for id_, _ in filas), default=0)
+        self._sembrado = True
+        self._sembrado_en = time.monotonic()
+
+    def _ponerse_al_dia(self):
+        """
+        Siembra si hace falta y, sincronizando, añade lo que otros
+        procesos hayan guardado después del último id contado.
+        """
+        if not self._sembrado or (
+            self.sincronizar and time.monotonic() - self._sembrado_en >= self.resiembra_s
+        ):
+            self._sembrar()
+            return
+
+        if not self.sincronizar:
+            return
+
+        db = SessionLocal()
+        try:
+            ultimo = db.execute(select(func.max(Inspeccion.id))).scalar() or 0
+            if ultimo == self._ultimo_id:
+                return
+
+            nuevas = db.execute(
+                select(Inspeccion.id, Inspeccion.resultado)
+                .where(Inspeccion.id > self._ultimo_id)
+                .order_by(Inspeccion.id)
+            ).all()
+        finally:
+            db.close()
+
+        for id_, resultado in nuevas:
+            self._agregar(int(resultado == "RECHAZADO"))
+            self._ultimo_id = id_
+
+    def sembrar(self):
+        with self._lock:
+            self._sembrar()
+
+    def actualizar(self):
+        """
+        Pone el anillo al día con la base (ver sincronizar). Se llama una
+        vez por petición antes de contar; sin sincronizar solo siembra si
+        hace falta.
+        """
+        with self._lock:
+            self._ponerse_al_dia()
+
+    def registrar(self, inspecciones: list):
+        """
+        Añade los veredictos de inspecciones recién guardadas (tras el
+        commit, en el orden en que se guardaron). No consulta la base.
+        """
+        with self._lock:
+            if not self._sembrado:
+                # La siembra de la primera consulta ya las incluirá
+                return
+
+            for inspeccion in inspecciones:
+                if inspeccion.id <= self._ultimo_id:
+                    continue
+
+                # Sincronizando, un hueco en los ids es una inspección de
+                # otro proceso: sumarla aquí la dejaría atrás; esta y las
+                # siguientes se leen en orden en el próximo actualizar()
+                if self.sincronizar and inspeccion.id != self._ultimo_id + 1:
+                    return
+
+                self._agregar(int(inspeccion.resultado == "RECHAZADO"))
+                self._ultimo_id = inspeccion.id
+
+    def invalidar(self):
+        """Tras borrar inspecciones: se vuelve a sembrar al consultar."""
+        with self._lock:
+            self._sembrado = False
+
+    def contar(self, n: int):
+        """
+        (total, rechazados) de las últimas n inspecciones, o None si n
+        supera la capacidad del anillo. Solo lee la memoria (salvo la
+        primera siembra); ver actualizar().
+        """
+        if n > self.capacidad:
+            return None
+
+        with self._lock:
+            if not self._sembrado:
+                self._sembrar()
+
+            total = min(n, self._llenos)
+
+            if n in self._rechazados:
+                return total, self._rechazados[n]
+
+            # Ventana no configurada: se suman los últimos n del anillo
+            inicio = self._posicion - total
+            if inicio >= 0:
+                return total, sum(self._anillo[inicio:self._posicion])
+            return total, sum(self._anillo[inicio:]) + sum(self._anillo[:self._posicion])
+
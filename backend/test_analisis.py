@@ -0,0 +1,173 @@
+# backend/test_analisis.py
+"""
+Pruebas del análisis de moldes: motores de comparación ("mapa" frente a
+"poligono") y simplificación del contorno.
+"""
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from modules import analisis
+from modules.plantillas import compilar_plantilla
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Diferencia admitida entre motores en bordes inclinados (media diagonal de
+# un píxel: el mapa guarda la distancia del centro del píxel)
+TOLERANCIA_MOTORES = 0.71
+
+
+def leer(nombre: str) -> bytes:
+    with open(os.path.join(BACKEND_DIR, nombre), "rb") as f:
+        return f.read()
+
+
+def pieza_girada(lado: int = 400, angulo: float = 17.0) -> np.ndarray:
+    """Rectángulo girado: todos sus bordes son inclinados."""
+    imagen = np.zeros((lado, lado), np.uint8)
+    caja = cv2.boxPoints(((lado / 2, lado / 2), (lado * 0.5, lado * 0.35), angulo))
+    cv2.fillPoly(imagen, [np.round(caja).astype(np.int32)], 255)
+    return imagen
+
+
+def puntos_de_prueba(forma, n: int = 2000, semilla: int = 0) -> np.ndarray:
+    """Puntos al azar dentro de la imagen, a ambos lados del contorno."""
+    generador = np.random.default_rng(semilla)
+    alto, ancho = forma
+    return np.column_stack([
+        generador.integers(0, ancho, n),
+        generador.integers(0, alto, n),
+    ]).astype(np.int32)
+
+
+# ---------------------------------------------------------
+# Motores de comparación
+# ---------------------------------------------------------
+
+def test_motores_coinciden_en_bordes_rectos(contorno_ideal):
+    puntos = contorno_ideal.contorno.reshape(-1, 2)
+
+    mapa = analisis.calcular_distancias(puntos, contorno_ideal, "mapa")
+    poligono = analisis.calcular_distancias(puntos, contorno_ideal, "poligono")
+
+    np.testing.assert_allclose(mapa, poligono, atol=1e-6)
+
+
+def test_motores_dentro_de_tolerancia_en_bordes_inclinados():
+    plantilla = compilar_plantilla("girada", pieza_girada())
+    puntos = puntos_de_prueba(plantilla.mapa_distancia.shape)
+
+    mapa = analisis.calcular_distancias(puntos, plantilla, "mapa")
+    poligono = analisis.calcular_distancias(puntos, plantilla, "poligono")
+
+    assert np.abs(mapa - poligono).max() < TOLERANCIA_MOTORES
+    # Mismo lado del contorno salvo, como mucho, en el propio borde
+    assert np.all((np.sign(mapa) == np.sign(poligono)) | (np.abs(poligono) < TOLERANCIA_MOTORES))
+
+
+def test_motor_mapa_fuera_de_la_plantilla_usa_el_metodo_exacto(contorno_ideal):
+    alto, ancho = contorno_ideal.mapa_distancia.shape
+    puntos = np.array([[ancho + 10, alto // 2], [-5, -5], [ancho // 2, alto + 50]], np.int32)
+
+    mapa = analisis.calcular_distancias(puntos, contorno_ideal, "mapa")
+    poligono = analisis.calcular_distancias(puntos, contorno_ideal, "poligono")
+
+    np.testing.assert_array_equal(mapa, poligono)
+
+
+def test_motor_desconocido(contorno_ideal):
+    with pytest.raises(ValueError):
+        analisis.calcular_distancias(np.zeros((1, 2), np.int32), contorno_ideal, "otro")
+
+
+@pytest.mark.parametrize("archivo, esperado", [
+    ("molde_ok.png", "APROBADO"),
+    ("molde_rebaba.png", "RECHAZADO"),
+])
+def test_analizar_molde_mismo_veredicto_con_ambos_motores(contorno_ideal, archivo, esperado):
+    mapa = analisis.analizar_molde(leer(archivo), motor="mapa")
+    poligono = analisis.analizar_molde(leer(archivo), motor="poligono")
+
+    assert mapa["status"] == poligono["status"] == esperado
+    assert mapa["max_distancia"] == pytest.approx(poligono["max_distancia"], abs=TOLERANCIA_MOTORES)
+    assert len(mapa["puntos_defectuosos"]) == len(poligono["puntos_defectuosos"])
+
+
+# ---------------------------------------------------------
+# Simplificación del contorno (SIMPLIFICACION_EPSILON)
+# ---------------------------------------------------------
+
+def circulo(lado: int = 400, radio: int = 150, rebabas=()) -> np.ndarray:
+    """Disco centrado con rebabas triangulares de (ángulo, altura px) en el borde."""
+    imagen = np.zeros((lado, lado), np.uint8)
+    centro = np.array([lado / 2, lado / 2])
+    cv2.circle(imagen, (lado // 2, lado // 2), radio, 255, -1)
+
+    for angulo, altura in rebabas:
+        direccion = np.array([np.cos(np.radians(angulo)), np.sin(np.radians(angulo))])
+        normal = np.array([-direccion[1], direccion[0]])
+        base = centro + direccion * (radio - 2)
+        triangulo = [base + normal * 4, base - normal * 4, centro + direccion * (radio + altura)]
+        cv2.fillPoly(imagen, [np.round(triangulo).astype(np.int32)], 255)
+
+    return imagen
+
+
+@pytest.fixture
+def plantilla_circulo(contorno_ideal):
+    analisis.registro_plantillas.registrar("circulo", circulo())
+    yield "circulo"
+    analisis.registro_plantillas.olvidar("circulo")
+
+
+def codificar(imagen: np.ndarray) -> bytes:
+    return cv2.imencode(".png", imagen)[1].tobytes()
+
+
+def test_simplificar_sin_epsilon_no_cambia_el_contorno():
+    puntos = np.array([[0, 0], [5, 1], [10, 0], [10, 10], [0, 10]], np.int32)
+
+    assert analisis.simplificar_contorno(puntos, 0) is puntos
+
+
+def test_simplificar_conserva_el_contorno_dentro_de_epsilon():
+    contornos, _ = cv2.findContours(circulo(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    puntos = contornos[0].reshape(-1, 2)
+    epsilon = 1.5
+
+    simplificado = analisis.simplificar_contorno(puntos, epsilon)
+
+    assert len(simplificado) < len(puntos) // 5
+    poligono = simplificado.reshape(-1, 1, 2).astype(np.int32)
+    desvios = [abs(cv2.pointPolygonTest(poligono, (float(x), float(y)), True)) for x, y in puntos]
+    assert max(desvios) <= epsilon + 1e-6
+
+
+@pytest.mark.parametrize("epsilon", [1.0, 2.0])
+@pytest.mark.parametrize("motor", ["mapa", "poligono"])
+def test_simplificar_no_cambia_el_veredicto_ni_la_distancia(monkeypatch, plantilla_circulo, epsilon, motor):
+    imagenes = {
+        "limpia": codificar(circulo()),
+        "rebabas": codificar(circulo(rebabas=[(0, 2.5), (70, 3), (150, 5), (250, 10)])),
+    }
+
+    for nombre, datos in imagenes.items():
+        monkeypatch.setattr(analisis, "SIMPLIFICACION_EPSILON", 0.0)
+        completo = analisis.analizar_molde(datos, motor=motor, plantilla=plantilla_circulo)
+
+        monkeypatch.setattr(analisis, "SIMPLIFICACION_EPSILON", epsilon)
+        simplificado = analisis.analizar_molde(datos, motor=motor, plantilla=plantilla_circulo)
+
+        assert simplificado["status"] == completo["status"], nombre
+        assert simplificado["max_distancia"] == pytest.approx(completo["max_distancia"], abs=0.01), nombre
+
+        informe = simplificado["simplificacion"]
+        assert informe["epsilon"] == epsilon
+        assert informe["puntos_conservados"] < informe["puntos_originales"]
+        assert "simplificacion" not in completo
+
+    assert completo["status"] == "RECHAZADO"
+    assert completo["max_distancia"] > 9
@@ -0,0 +1,95 @@
+# backend/test_arranque.py
+"""
+Pruebas del arranque: importación perezosa de dependencias
+(modules/dependencias.py) y precalentamiento del análisis.
+"""
+
+import sys
+import threading
+
+import pytest
+
+from modules import analisis, filtro_fotogramas
+from modules.dependencias import importar_perezoso
+
+HILOS = 8
+
+
+@pytest.fixture
+def modulo_lento(tmp_path, monkeypatch):
+    """Módulo de prueba que tarda en importarse y cuenta sus ejecuciones."""
+    nombre = "modulo_lento_pruebas"
+    (tmp_path / f"{nombre}.py").write_text(
+        "import time\n"
+        "import builtins\n"
+        "builtins.ejecuciones_modulo_lento = getattr(builtins, 'ejecuciones_modulo_lento', 0) + 1\n"
+        "time.sleep(0.2)\n"
+        "VALOR = 42\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield nombre
+
+    import builtins
+    sys.modules.pop(nombre, None)
+    if hasattr(builtins, "ejecuciones_modulo_lento"):
+        del builtins.ejecuciones_modulo_lento
+
+
+# ---------------------------------------------------------
+# Importación perezosa
+# ---------------------------------------------------------
+
+def test_no_importa_hasta_el_primer_acceso(modulo_lento):
+    modulo = importar_perezoso(modulo_lento)
+
+    assert modulo_lento not in sys.modules
+    assert modulo.VALOR == 42
+    assert modulo_lento in sys.modules
+
+
+def test_primer_acceso_desde_varios_hilos(modulo_lento):
+    import builtins
+
+    modulo = importar_perezoso(modulo_lento)
+    barrera = threading.Barrier(HILOS)
+    valores = []
+
+    def acceder():
+        barrera.wait()
+        valores.append(modulo.VALOR)
+
+    hilos = [threading.Thread(target=acceder) for _ in range(HILOS)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    # Ningún hilo ve el módulo a medio ejecutar, y se ejecuta una sola vez
+    assert valores == [42] * HILOS
+    assert builtins.ejecuciones_modulo_lento == 1
+
+
+def test_modulo_no_instalado():
+    with pytest.raises(ModuleNotFoundError):
+        importar_perezoso("modulo_que_no_existe_pruebas")
+
+
+# ---------------------------------------------------------
+# Precalentamiento
+# ---------------------------------------------------------
+
+def test_precalentar(contorno_ideal):
+    assert analisis.precalentar()
+
+
+def test_precalentar_aunque_el_filtro_descarte_la_silueta(contorno_ideal, monkeypatch):
+    # Con este mínimo de material la silueta de la plantilla se descarta
+    monkeypatch.setattr(filtro_fotogramas, "MATERIAL_MINIMO", 0.999)
+
+    assert analisis.precalentar()
+
+
+def test_precalentar_falla_si_el_analisis_da_error(contorno_ideal, monkeypatch):
+    monkeypatch.setattr(analisis, "analizar_imagen", lambda imagen: {"status": "ERROR", "mensaje": "x"})
+
+    assert not analisis.precalentar()
@@ -0,0 +1,139 @@
+# backend/test_cache_resultados.py
+"""
+Pruebas de la caché de resultados por contenido
+(modules/cache_resultados.py): qué cambia la clave, expulsión LRU e
+invalidación al borrar la inspección original.
+"""
+
+import os
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import main
+from modules import analisis, crud
+from modules.cache_resultados import CacheResultados
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DATOS = b"misma imagen"
+
+
+def leer(nombre: str) -> bytes:
+    with open(os.path.join(BACKEND_DIR, nombre), "rb") as f:
+        return f.read()
+
+
+# ---------------------------------------------------------
+# Clave
+# ---------------------------------------------------------
+
+def test_clave_misma_imagen_misma_clave(contorno_ideal):
+    assert CacheResultados.clave(DATOS) == CacheResultados.clave(bytes(DATOS))
+    # Sin plantilla ni modo equivale a los valores por defecto
+    assert CacheResultados.clave(DATOS) == CacheResultados.clave(
+        DATOS, analisis.PLANTILLA_POR_DEFECTO, "codificado", analisis.MODO_ANALISIS
+    )
+
+
+def test_clave_cambia_con_la_imagen_y_los_parametros(contorno_ideal):
+    base = CacheResultados.clave(DATOS)
+
+    distintas = [
+        CacheResultados.clave(DATOS + b"!"),
+        CacheResultados.clave(DATOS, formato="crudo:4x3"),
+        CacheResultados.clave(DATOS, modo="area"),
+        CacheResultados.clave(DATOS, plantilla="otra"),
+    ]
+
+    assert len({base, *distintas}) == 1 + len(distintas)
+
+
+def test_clave_cambia_con_la_tolerancia(contorno_ideal, monkeypatch):
+    base = CacheResultados.clave(DATOS)
+    monkeypatch.setattr(analisis, "TOLERANCIA_MAXIMA", analisis.TOLERANCIA_MAXIMA + 1)
+
+    assert CacheResultados.clave(DATOS) != base
+
+
+def test_clave_cambia_al_volver_a_registrar_la_plantilla(contorno_ideal):
+    silueta = np.zeros((50, 50), np.uint8)
+    silueta[10:40, 10:40] = 255
+
+    try:
+        primera = analisis.registro_plantillas.registrar("cache_prueba", silueta)
+        antes = CacheResultados.clave(DATOS, plantilla="cache_prueba")
+        segunda = analisis.registro_plantillas.registrar("cache_prueba", silueta)
+        despues = CacheResultados.clave(DATOS, plantilla="cache_prueba")
+    finally:
+        analisis.registro_plantillas.olvidar("cache_prueba")
+
+    assert primera is not segunda
+    assert antes != despues
+
+
+# ---------------------------------------------------------
+# Entradas
+# ---------------------------------------------------------
+
+def test_expulsa_la_menos_usada():
+    cache = CacheResultados(max_entradas=2, max_bytes=10_000)
+    cache.guardar("a", {"status": "APROBADO"}, 1)
+    cache.guardar("b", {"status": "APROBADO"}, 2)
+
+    assert cache.obtener("a").inspeccion_id == 1
+    cache.guardar("c", {"status": "RECHAZADO"}, 3)
+
+    assert cache.obtener("b") is None
+    assert [cache.obtener(c).inspeccion_id for c in "ac"] == [1, 3]
+
+
+def test_limite_de_bytes():
+    cache = CacheResultados(max_entradas=100, max_bytes=200)
+    grande = {"puntos_defectuosos": [[1, 2]] * 100}
+
+    # Mayor que todo el límite: no se guarda
+    cache.guardar("grande", grande, 1)
+    assert len(cache) == 0
+
+    for i in range(10):
+        cache.guardar(str(i), {"status": "APROBADO"}, i)
+
+    assert 0 < cache.bytes_usados <= 200
+    assert cache.obtener("9") is not None
+    assert cache.obtener("0") is None
+
+
+def test_invalidar_inspeccion():
+    cache = CacheResultados(max_entradas=10, max_bytes=10_000)
+    cache.guardar("a", {"status": "APROBADO"}, 1)
+    cache.guardar("b", {"status": "APROBADO"}, 1)
+    cache.guardar("c", {"status": "APROBADO"}, 2)
+
+    cache.invalidar_inspeccion(1)
+
+    assert len(cache) == 1
+    assert cache.obtener("c").inspeccion_id == 2
+    assert cache.bytes_usados == len("c") + len('{"status": "APROBADO"}')
+
+
+# ---------------------------------------------------------
+# /api/inspeccionar
+# ---------------------------------------------------------
+
+def test_api_duplicado_y_borrado(base_vacia, contorno_ideal):
+    imagen = {"file": ("molde_rebaba.png", leer("molde_rebaba.png"), "image/png")}
+    vincular = {"duplicados": "vincular", "resumen": True}
+
+    with TestClient(main.app) as cliente:
+        original = cliente.post("/api/inspeccionar", params={"resumen": True}, files=imagen).json()
+        repetida = cliente.post("/api/inspeccionar", params=vincular, files=imagen).json()
+        assert repetida["duplicado_de"] == repetida["id"] == original["id"]
+        assert repetida["max_distancia"] == original["max_distancia"]
+
+        cliente.delete(f"/api/inspecciones/{original['id']}")
+        nueva = cliente.post("/api/inspeccionar", params=vincular, files=imagen).json()
+
+    # La original ya no existe: se analiza y se guarda otra vez
+    assert "duplicado_de" not in nueva
+    assert [i.id for i in crud.listar_inspecciones()] == [nueva["id"]]
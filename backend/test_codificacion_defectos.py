@@ -0,0 +1,128 @@
+# backend/test_codificacion_defectos.py
+"""
+Pruebas de la codificación compacta de defectos
+(modules/codificacion_defectos.py) y de la migración que convierte las
+filas con puntos en JSON (migraciones.migrar_codificacion_defectos).
+"""
+
+import json
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, text
+
+from modules import codificacion_defectos, migraciones
+from modules.codificacion_defectos import codificar_puntos, decodificar_puntos
+
+# Esquema de inspecciones anterior a la codificación compacta
+ESQUEMA_ANTIGUO = (
+    "CREATE TABLE inspecciones ("
+    "id INTEGER PRIMARY KEY, resultado TEXT, max_distancia REAL, "
+    "puntos_defectuosos TEXT, fecha DATETIME)"
+)
+
+
+def contorno(n: int = 300, semilla: int = 0) -> list:
+    """Puntos consecutivos de un contorno, con saltos de como mucho un píxel."""
+    pasos = np.random.default_rng(semilla).integers(-1, 2, (n, 2))
+    return (np.cumsum(pasos, axis=0) + 1000).tolist()
+
+
+# ---------------------------------------------------------
+# Blob de puntos
+# ---------------------------------------------------------
+
+@pytest.mark.parametrize("puntos", [
+    [],
+    [[5, 7]],
+    [[0, 0], [32767, 32767], [0, 32767]],
+    contorno(),
+])
+def test_blob_ida_y_vuelta(puntos):
+    blob = codificar_puntos(puntos)
+
+    assert len(blob) == 4 * len(puntos)
+    assert decodificar_puntos(blob) == puntos
+
+
+@pytest.mark.parametrize("puntos", [[[-1, 0]], [[0, 32768]]])
+def test_blob_fuera_de_int16(puntos):
+    with pytest.raises(ValueError):
+        codificar_puntos(puntos)
+
+
+# ---------------------------------------------------------
+# Migración de filas con JSON
+# ---------------------------------------------------------
+
+@pytest.fixture
+def base_antigua(tmp_path):
+    """Base con el esquema anterior y tres filas: con puntos, sin puntos y fuera de int16."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'antigua.db'}")
+    filas = {1: contorno(), 2: [], 3: [[40000, 5], [40001, 5]]}
+
+    with engine.begin() as conn:
+        conn.execute(text(ESQUEMA_ANTIGUO))
+        conn.execute(
+            text("INSERT INTO inspecciones (id, resultado, puntos_defectuosos) VALUES (:id, 'RECHAZADO', :p)"),
+            [{"id": id_, "p": json.dumps(puntos)} for id_, puntos in filas.items()],
+        )
+
+    yield engine, filas
+    engine.dispose()
+
+
+def leer_filas(engine) -> dict:
+    with engine.connect() as conn:
+        return {
+            fila.id: fila for fila in conn.execute(text(
+                "SELECT id, puntos_defectuosos, puntos_blob, total_puntos, segmentos_defecto FROM inspecciones"
+            ))
+        }
+
+
+def test_migracion_pasa_los_puntos_al_blob(base_antigua):
+    engine, puntos = base_antigua
+
+    with engine.begin() as conn:
+        assert migraciones.migrar_codificacion_defectos(conn) == 3
+
+    filas = leer_filas(engine)
+    # Blob verificado: el JSON ya no hace falta
+    assert decodificar_puntos(filas[1].puntos_blob) == puntos[1]
+    assert filas[1].puntos_defectuosos is None
+    assert filas[1].total_puntos == len(puntos[1])
+    # Sin blob (no cabe en int16): el JSON es la única copia
+    assert filas[3].puntos_blob is None
+    assert json.loads(filas[3].puntos_defectuosos) == puntos[3]
+    assert all(f.segmentos_defecto is not None for f in filas.values())
+
+    # Idempotente
+    with engine.begin() as conn:
+        assert migraciones.migrar_codificacion_defectos(conn) == 0
+
+
+def test_migracion_sin_guardar_puntos_conserva_el_json(base_antigua, monkeypatch):
+    engine, puntos = base_antigua
+    monkeypatch.setattr(codificacion_defectos, "GUARDAR_PUNTOS", "no")
+
+    with engine.begin() as conn:
+        migraciones.migrar_codificacion_defectos(conn)
+
+    for id_, fila in leer_filas(engine).items():
+        assert fila.puntos_blob is None
+        assert json.loads(fila.puntos_defectuosos) == puntos[id_]
+        assert fila.total_puntos == len(puntos[id_])
+
+
+def test_migracion_blob_que_no_coincide_conserva_el_json(base_antigua, monkeypatch):
+    engine, puntos = base_antigua
+    # Un blob corrupto no debe costar los puntos
+    monkeypatch.setattr(
+        codificacion_defectos, "codificar_puntos", lambda p: codificar_puntos(p)[:-4]
+    )
+
+    with engine.begin() as conn:
+        migraciones.migrar_codificacion_defectos(conn)
+
+    assert json.loads(leer_filas(engine)[1].puntos_defectuosos) == puntos[1]
@@ -0,0 +1,118 @@
+# backend/test_db.py
+"""
+Pruebas del modo producción de la base de datos (modules/db.py): pragmas
+de WAL en cada conexión y escritor único para todas las escrituras.
+"""
+
+import threading
+import time
+
+import pytest
+from sqlalchemy import event, text
+
+from modules import crud, db
+from modules.db import EscritorBD
+
+HILOS = 6
+
+
+# ---------------------------------------------------------
+# Pragmas
+# ---------------------------------------------------------
+
+def test_modo_produccion_por_defecto():
+    assert db.PRODUCCION
+
+
+@pytest.mark.parametrize("pragma, esperado", [
+    ("journal_mode", "wal"),
+    ("synchronous", 1),  # NORMAL
+    ("busy_timeout", db.SQLITE_BUSY_TIMEOUT_MS),
+    ("cache_size", -db.SQLITE_CACHE_MB * 1024),
+    ("mmap_size", db.SQLITE_MMAP_MB * 1024 * 1024),
+])
+def test_pragmas_de_cada_conexion(base_de_datos, pragma, esperado):
+    with base_de_datos.connect() as conexion:
+        assert conexion.execute(text(f"PRAGMA {pragma}")).scalar() == esperado
+
+
+# ---------------------------------------------------------
+# Escritor único
+# ---------------------------------------------------------
+
+@pytest.fixture
+def escritor():
+    escritor = EscritorBD()
+    yield escritor
+    escritor.cerrar()
+
+
+def test_escrituras_en_un_solo_hilo_y_de_una_en_una(escritor):
+    hilos_escritores, activas, maximo = set(), [0], [0]
+    cerrojo = threading.Lock()
+
+    def escribir(i):
+        with cerrojo:
+            activas[0] += 1
+            maximo[0] = max(maximo[0], activas[0])
+        hilos_escritores.add(threading.current_thread().name)
+        time.sleep(0.01)
+        with cerrojo:
+            activas[0] -= 1
+        return i
+
+    resultados = [None] * HILOS
+
+    def llamar(i):
+        resultados[i] = escritor.ejecutar(escribir, i)
+
+    hilos = [threading.Thread(target=llamar, args=(i,)) for i in range(HILOS)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert resultados == list(range(HILOS))
+    assert maximo[0] == 1
+    assert len(hilos_escritores) == 1
+    assert hilos_escritores.pop().startswith("escritor-bd")
+
+
+def test_excepcion_llega_a_quien_llama(escritor):
+    def fallar():
+        raise ValueError("fallo al escribir")
+
+    with pytest.raises(ValueError):
+        escritor.ejecutar(fallar)
+
+    assert escritor.ejecutar(lambda: "sigue") == "sigue"
+
+
+def test_escritura_anidada_no_se_bloquea(escritor):
+    def externa():
+        return escritor.ejecutar(lambda: threading.current_thread().name)
+
+    assert escritor.ejecutar(externa).startswith("escritor-bd")
+
+
+def test_cerrar_y_volver_a_usar(escritor):
+    escritor.ejecutar(lambda: None)
+    escritor.cerrar()
+
+    assert escritor.ejecutar(lambda: 42) == 42
+
+
+def test_crud_escribe_desde_el_escritor(base_vacia, base_de_datos):
+    hilos = []
+
+    def anotar(conexion, cursor, sentencia, *args):
+        if sentencia.lstrip().upper().startswith("INSERT"):
+            hilos.append(threading.current_thread().name)
+
+    event.listen(base_de_datos, "before_cursor_execute", anotar)
+    try:
+        crud.guardar_inspeccion("APROBADO", 0.0, [])
+    finally:
+        event.remove(base_de_datos, "before_cursor_execute", anotar)
+
+    assert hilos and all(nombre.startswith("escritor-bd") for nombre in hilos)
@@ -0,0 +1,103 @@
+# backend/test_ejecutor.py
+"""
+Pruebas del control de admisión del ejecutor de análisis
+(modules/ejecutor.py): lotes que entran enteros o no entran, y plazas que
+se liberan al terminar cada trabajo (también con error o plazo excedido).
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from modules.ejecutor import ControlAdmision, ColaLlenaError, PlazoExcedidoError
+
+# Tope de espera de las pruebas para que un fallo no las cuelgue
+ESPERA_MAXIMA = 5
+
+
+def esperar(evento: threading.Event, valor=None):
+    """Trabajo que ocupa su plaza hasta que se marca `evento`."""
+    assert evento.wait(ESPERA_MAXIMA)
+    return valor
+
+
+def fallar(_entrada=None):
+    raise RuntimeError("fallo del análisis")
+
+
+def test_lote_entero_o_nada():
+    async def prueba():
+        control = ControlAdmision(concurrentes=2, cola_maxima=1)
+        liberar = threading.Event()
+        ocupados = [control.enviar(esperar, liberar, i) for i in range(2)]
+
+        # Queda 1 plaza: un lote de 2 no entra y no reserva ninguna
+        with pytest.raises(ColaLlenaError):
+            await control.ejecutar_lote(esperar, [liberar, liberar])
+        assert control.pendientes == 2
+
+        lote = asyncio.ensure_future(control.ejecutar_lote(esperar, [liberar]))
+        await asyncio.sleep(0)
+        assert control.pendientes == control.capacidad
+
+        liberar.set()
+        assert await asyncio.gather(*ocupados) == [0, 1]
+        assert await lote == [None]
+        assert control.pendientes == 0
+
+    asyncio.run(prueba())
+
+
+def test_cola_llena_rechaza_sin_esperar():
+    async def prueba():
+        control = ControlAdmision(concurrentes=1, cola_maxima=1)
+        liberar = threading.Event()
+        ocupados = [control.enviar(esperar, liberar) for _ in range(2)]
+
+        with pytest.raises(ColaLlenaError):
+            control.enviar(esperar, liberar)
+        assert (control.en_curso, control.en_cola) == (1, 1)
+
+        liberar.set()
+        await asyncio.gather(*ocupados)
+        assert control.pendientes == 0
+
+    asyncio.run(prueba())
+
+
+def test_error_del_trabajo_libera_la_plaza():
+    async def prueba():
+        control = ControlAdmision(concurrentes=1, cola_maxima=0)
+
+        with pytest.raises(RuntimeError):
+            await control.ejecutar(fallar)
+        with pytest.raises(RuntimeError):
+            await control.ejecutar_lote(fallar, [1])
+
+        assert control.pendientes == 0
+
+    asyncio.run(prueba())
+
+
+def test_plazo_excedido_conserva_la_plaza_hasta_que_termina():
+    async def prueba():
+        control = ControlAdmision(concurrentes=1, cola_maxima=0)
+        liberar = threading.Event()
+
+        with pytest.raises(PlazoExcedidoError):
+            await control.ejecutar(esperar, liberar, plazo=0.05)
+
+        # El trabajador sigue ocupado: la plaza no se ha liberado
+        assert control.pendientes == 1
+        with pytest.raises(ColaLlenaError):
+            control.enviar(esperar, liberar)
+
+        liberar.set()
+        for _ in range(100):
+            if control.pendientes == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert control.pendientes == 0
+
+    asyncio.run(prueba())
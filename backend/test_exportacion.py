@@ -0,0 +1,154 @@
+# backend/test_exportacion.py
+"""
+Pruebas de la exportación en streaming (modules/exportacion.py) y de
+/api/exportar y /api/lotes/{id}/exportar.
+"""
+
+import csv
+import gzip
+import io
+import json
+from datetime import timedelta
+
+import pytest
+
+from conftest import INICIO, sembrar
+from modules import crud_lotes, exportacion
+
+CABECERAS = ["ID", "Resultado", "Categoria", "Max Distancia", "Fecha"]
+
+
+def sembrar_exportables(n: int, lote_id: int = None) -> list:
+    """Inserta n inspecciones y devuelve sus (id, fecha), de la más reciente a la más antigua."""
+    filas = sembrar(
+        {
+            "resultado": "RECHAZADO" if i % 3 == 0 else "APROBADO",
+            "max_distancia": float(i),
+            "categoria": "Rebaba lateral" if i % 3 == 0 else "Excluido",
+            "fecha": INICIO + timedelta(minutes=i),
+            "lote_id": lote_id,
+        }
+        for i in range(n)
+    )
+    return [(f.id, f.fecha) for f in reversed(filas)]
+
+
+def leer_csv(contenido: bytes) -> list:
+    return list(csv.reader(io.StringIO(contenido.decode())))
+
+
+@pytest.fixture
+def bloques_pequenos(monkeypatch):
+    monkeypatch.setattr(exportacion, "FILAS_POR_BLOQUE", 3)
+    return 3
+
+
+# ---------------------------------------------------------
+# exportar
+# ---------------------------------------------------------
+
+def test_csv(base_vacia):
+    esperadas = sembrar_exportables(5)
+
+    filas = leer_csv(b"".join(exportacion.exportar("csv")))
+
+    assert filas[0] == CABECERAS
+    assert [int(f[0]) for f in filas[1:]] == [id_ for id_, _ in esperadas]
+    assert filas[1][4] == esperadas[0][1].isoformat()
+
+
+def test_csv_sin_inspecciones_solo_cabeceras(base_vacia):
+    assert leer_csv(b"".join(exportacion.exportar("csv"))) == [CABECERAS]
+
+
+def test_ndjson(base_vacia):
+    esperadas = sembrar_exportables(4)
+
+    lineas = b"".join(exportacion.exportar("ndjson")).decode().splitlines()
+    registros = [json.loads(linea) for linea in lineas]
+
+    assert [r["id"] for r in registros] == [id_ for id_, _ in esperadas]
+    assert set(registros[0]) == {"id", "resultado", "categoria", "max_distancia", "fecha"}
+    assert registros[0]["fecha"] == esperadas[0][1].isoformat()
+
+
+@pytest.mark.parametrize("formato", ["csv", "ndjson"])
+def test_gzip_es_el_mismo_contenido(base_vacia, bloques_pequenos, formato):
+    sembrar_exportables(10)
+
+    plano = b"".join(exportacion.exportar(formato))
+    comprimido = b"".join(exportacion.exportar(formato, comprimir=True))
+
+    assert gzip.decompress(comprimido) == plano
+
+
+@pytest.mark.parametrize("formato", ["csv", "ndjson"])
+def test_se_envia_por_bloques(base_vacia, bloques_pequenos, formato):
+    sembrar_exportables(10)
+
+    trozos = list(exportacion.exportar(formato))
+
+    # 10 filas de 3 en 3: 4 bloques, uno por trozo
+    assert len(trozos) == 4
+
+
+def test_la_consulta_no_empieza_hasta_pedir_el_primer_trozo(base_vacia):
+    contenido = exportacion.exportar("csv")
+    sembrar_exportables(2)
+
+    assert len(leer_csv(b"".join(contenido))) == 3
+
+
+def test_formato_no_valido():
+    with pytest.raises(ValueError):
+        exportacion.exportar("xml")
+
+
+def test_solo_el_lote(base_vacia):
+    lote = crud_lotes.crear_lote("EXP-1", "pruebas")
+    del_lote = sembrar_exportables(4, lote_id=lote.id)
+    sembrar_exportables(3)
+
+    filas = leer_csv(b"".join(exportacion.exportar("csv", lote_id=lote.id)))
+
+    # En orden de inspección, como listar_inspecciones_de_lote
+    assert [int(f[0]) for f in filas[1:]] == [id_ for id_, _ in reversed(del_lote)]
+
+
+# ---------------------------------------------------------
+# Endpoints
+# ---------------------------------------------------------
+
+@pytest.mark.parametrize("formato, comprimir, tipo, extension", [
+    ("csv", False, "text/csv", "csv"),
+    ("ndjson", False, "application/x-ndjson", "ndjson"),
+    ("csv", True, "application/gzip", "csv.gz"),
+])
+def test_api_exportar(base_vacia, cliente, formato, comprimir, tipo, extension):
+    sembrar_exportables(3)
+
+    respuesta = cliente.get("/api/exportar", params={"formato": formato, "gzip": comprimir})
+
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"].startswith(tipo)
+    assert respuesta.headers["content-disposition"].endswith(f"inspecciones.{extension}")
+    assert respuesta.content == b"".join(exportacion.exportar(formato, comprimir))
+
+
+def test_api_exportar_formato_no_valido(cliente):
+    assert cliente.get("/api/exportar", params={"formato": "xml"}).status_code == 400
+
+
+def test_api_exportar_lote(base_vacia, cliente):
+    lote = crud_lotes.crear_lote("EXP-2", "pruebas")
+    vacio = crud_lotes.crear_lote("EXP-3", "pruebas")
+    sembrar_exportables(2, lote_id=lote.id)
+
+    respuesta = cliente.get(f"/api/lotes/{lote.id}/exportar")
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-disposition"].endswith(f"lote_{lote.id}.csv")
+    assert len(leer_csv(respuesta.content)) == 3
+
+    assert cliente.get("/api/lotes/999999/exportar").status_code == 404
+    assert cliente.get(f"/api/lotes/{vacio.id}/exportar").status_code == 404
+    assert cliente.get(f"/api/lotes/{lote.id}/exportar", params={"formato": "xml"}).status_code == 400
@@ -0,0 +1,117 @@
+# backend/test_filtro_fotogramas.py
+"""
+Pruebas del descarte de fotogramas vacíos, saturados y desenfocados
+(modules/filtro_fotogramas.py), en los umbrales por defecto.
+"""
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from modules import analisis, filtro_fotogramas, metricas
+from modules.filtro_fotogramas import evaluar_fotograma, registrar_descarte
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+LADO = 200
+
+
+def con_material(fraccion: float) -> np.ndarray:
+    """Imagen LADO x LADO con `fraccion` de los píxeles blancos (en filas desde arriba)."""
+    imagen = np.zeros((LADO, LADO), np.uint8)
+    imagen.reshape(-1)[:round(fraccion * LADO * LADO)] = 255
+    return imagen
+
+
+def molde_ok() -> np.ndarray:
+    return cv2.imread(os.path.join(BACKEND_DIR, "molde_ok.png"), cv2.IMREAD_GRAYSCALE)
+
+
+def desenfocar(imagen: np.ndarray, sigma: float) -> np.ndarray:
+    return cv2.GaussianBlur(imagen, (0, 0), sigma)
+
+
+# ---------------------------------------------------------
+# Umbrales
+# ---------------------------------------------------------
+
+def test_umbrales_por_defecto():
+    assert filtro_fotogramas.MATERIAL_MINIMO == 0.005
+    assert filtro_fotogramas.MATERIAL_MAXIMO == 0.95
+    assert filtro_fotogramas.ANCHO_BORDE_MAXIMO == 3
+
+
+@pytest.mark.parametrize("fraccion, motivo", [
+    (0.0, "vacio"),
+    (0.004, "vacio"),
+    (0.006, None),
+    (0.94, None),
+    (0.96, "saturado"),
+    (1.0, "saturado"),
+])
+def test_material(fraccion, motivo):
+    for binaria in (False, True):
+        resultado = evaluar_fotograma(con_material(fraccion), binaria)
+
+        if motivo is None:
+            assert resultado is None
+        else:
+            assert resultado["status"] == "DESCARTADO"
+            assert resultado["motivo"] == motivo
+            assert resultado["indicadores"]["material"] == pytest.approx(fraccion, abs=1e-4)
+
+
+def test_fondo_por_debajo_del_umbral_no_cuenta_como_material():
+    imagen = np.full((LADO, LADO), analisis.UMBRAL_BINARIZACION, np.uint8)
+
+    assert evaluar_fotograma(imagen)["motivo"] == "vacio"
+
+
+@pytest.mark.parametrize("sigma, descartado", [
+    (0, False),
+    (0.5, False),
+    (1.0, False),
+    (2.0, True),
+    (4.0, True),
+])
+def test_enfoque(sigma, descartado):
+    imagen = desenfocar(molde_ok(), sigma) if sigma else molde_ok()
+
+    resultado = evaluar_fotograma(imagen)
+
+    if descartado:
+        assert resultado["motivo"] == "desenfocado"
+        assert resultado["indicadores"]["ancho_borde"] > filtro_fotogramas.ANCHO_BORDE_MAXIMO
+    else:
+        assert resultado is None
+
+
+def test_mascaras_binarias_no_se_comprueba_el_enfoque():
+    assert evaluar_fotograma(desenfocar(molde_ok(), 4.0), binaria=True) is None
+
+
+# ---------------------------------------------------------
+# Resultado del análisis
+# ---------------------------------------------------------
+
+def test_descarte_tiene_los_campos_de_un_resultado_normal(contorno_ideal):
+    vacia = cv2.imencode(".png", np.zeros((LADO, LADO), np.uint8))[1].tobytes()
+
+    resultado = analisis.analizar_molde(vacia)
+
+    assert resultado["status"] == "DESCARTADO"
+    assert resultado["motivo"] == "vacio"
+    assert resultado["max_distancia"] == 0.0
+    assert resultado["puntos_defectuosos"] == []
+    assert resultado["segmentos"] == []
+
+
+def test_registrar_descarte_cuenta_por_motivo():
+    contador = "fotogramas_descartados_saturado"
+    antes = metricas.obtener_metricas()["contadores"].get(contador, 0)
+
+    assert registrar_descarte(evaluar_fotograma(con_material(1.0)))
+    assert not registrar_descarte({"status": "APROBADO"})
+
+    assert metricas.obtener_metricas()["contadores"][contador] == antes + 1
@@ -0,0 +1,141 @@
+# backend/test_franjas.py
+"""
+Pruebas del análisis por franjas (modules/franjas.py) frente al análisis
+del fotograma completo (analisis.analizar_imagen): mismo veredicto, misma
+distancia y los mismos puntos del borde exterior, también con franjas de
+pocas filas.
+"""
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from modules import analisis, franjas
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 32 MB: una sola franja; 0.05 MB: franjas de pocas filas
+PRESUPUESTOS = [32, 0.05]
+
+
+def molde(nombre: str) -> np.ndarray:
+    return cv2.imread(os.path.join(BACKEND_DIR, nombre), cv2.IMREAD_GRAYSCALE)
+
+
+def con_ruido(imagen: np.ndarray) -> np.ndarray:
+    """Manchas sueltas lejos de la pieza y a 3 px de su borde."""
+    imagen = imagen.copy()
+    imagen[100:104, 100:104] = 255
+    imagen[300:306, 455:458] = 255
+    return imagen
+
+
+def con_huecos(imagen: np.ndarray) -> np.ndarray:
+    """Un hueco en el interior y otro a pocos píxeles del borde."""
+    imagen = imagen.copy()
+    imagen[200:240, 200:240] = 0
+    imagen[152:156, 300:304] = 0
+    return imagen
+
+
+def crudo(imagen: np.ndarray, tmp_path) -> str:
+    ruta = tmp_path / "fotograma.bin"
+    ruta.write_bytes(imagen.tobytes())
+    return str(ruta)
+
+
+def borde_exterior(imagen: np.ndarray) -> set:
+    """Píxeles del contorno exterior de la pieza mayor, como en la ruta normal."""
+    _, binaria = cv2.threshold(imagen, analisis.UMBRAL_BINARIZACION, 255, cv2.THRESH_BINARY)
+    contornos, _ = cv2.findContours(binaria, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    return {tuple(p) for p in max(contornos, key=cv2.contourArea).reshape(-1, 2)}
+
+
+@pytest.fixture
+def puntos_analizados(monkeypatch):
+    """Guarda los puntos que el análisis por franjas compara con la plantilla."""
+    capturados = {}
+    original = franjas.resultado_contorno
+
+    def capturar(puntos, *args, **kwargs):
+        capturados["puntos"] = {tuple(p) for p in np.asarray(puntos).reshape(-1, 2)}
+        return original(puntos, *args, **kwargs)
+
+    monkeypatch.setattr(franjas, "resultado_contorno", capturar)
+    return capturados
+
+
+# ---------------------------------------------------------
+# Franjas frente al fotograma completo
+# ---------------------------------------------------------
+
+@pytest.mark.parametrize("presupuesto", PRESUPUESTOS)
+@pytest.mark.parametrize("variante", [None, con_ruido, con_huecos])
+@pytest.mark.parametrize("archivo, esperado", [
+    ("molde_ok.png", "APROBADO"),
+    ("molde_rebaba.png", "RECHAZADO"),
+])
+def test_mismo_resultado_que_el_fotograma_completo(
+    contorno_ideal, monkeypatch, tmp_path, archivo, esperado, variante, presupuesto
+):
+    imagen = molde(archivo)
+    if variante is not None:
+        imagen = variante(imagen)
+    monkeypatch.setattr(franjas, "PRESUPUESTO_FRANJAS_MB", presupuesto)
+
+    completo = analisis.analizar_imagen(imagen)
+    por_franjas = franjas.analizar_por_franjas(crudo(imagen, tmp_path), "crudo", imagen.shape[1], imagen.shape[0])
+
+    assert por_franjas["status"] == completo["status"] == esperado
+    assert por_franjas["max_distancia"] == pytest.approx(completo["max_distancia"])
+
+
+@pytest.mark.parametrize("presupuesto", PRESUPUESTOS)
+def test_solo_el_borde_exterior_de_la_pieza(contorno_ideal, monkeypatch, tmp_path, puntos_analizados, presupuesto):
+    imagen = con_huecos(con_ruido(molde("molde_rebaba.png")))
+    monkeypatch.setattr(franjas, "PRESUPUESTO_FRANJAS_MB", presupuesto)
+
+    franjas.analizar_por_franjas(crudo(imagen, tmp_path), "crudo", imagen.shape[1], imagen.shape[0])
+
+    assert puntos_analizados["puntos"] == borde_exterior(imagen)
+
+
+def test_mascara_por_bits(contorno_ideal, tmp_path):
+    imagen = molde("molde_rebaba.png")
+    binaria = (imagen > analisis.UMBRAL_BINARIZACION).astype(np.uint8)
+    ruta = tmp_path / "mascara.bin"
+    ruta.write_bytes(np.packbits(binaria, axis=1).tobytes())
+
+    por_franjas = franjas.analizar_por_franjas(str(ruta), "bits", imagen.shape[1], imagen.shape[0])
+
+    assert por_franjas["status"] == analisis.analizar_imagen(imagen)["status"] == "RECHAZADO"
+
+
+# ---------------------------------------------------------
+# PNG/JPEG
+# ---------------------------------------------------------
+
+def test_codificado_no_se_analiza_por_franjas(contorno_ideal, tmp_path):
+    ruta = tmp_path / "molde.png"
+    ruta.write_bytes(cv2.imencode(".png", molde("molde_ok.png"))[1].tobytes())
+
+    resultado = franjas.analizar_por_franjas(str(ruta), "codificado")
+
+    assert resultado["status"] == "ERROR"
+    assert "PNG/JPEG" in resultado["mensaje"]
+
+
+def test_api_multipart_con_franjas_responde_400(contorno_ideal):
+    with open(os.path.join(BACKEND_DIR, "molde_ok.png"), "rb") as f:
+        datos = f.read()
+
+    respuesta = TestClient(main.app).post(
+        "/api/inspeccionar", params={"franjas": True}, files={"file": ("molde_ok.png", datos, "image/png")}
+    )
+
+    assert respuesta.status_code == 400
+    assert "PNG/JPEG" in respuesta.json()["detail"]
@@ -0,0 +1,61 @@
+# backend/test_inspeccion_multiple.py
+"""
+Pruebas del análisis por lotes (/api/inspeccionar/multiple) frente al
+análisis de cada imagen por separado.
+"""
+
+import os
+
+from fastapi.testclient import TestClient
+
+import main
+from modules import analisis, crud
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def leer(nombre: str) -> bytes:
+    with open(os.path.join(BACKEND_DIR, nombre), "rb") as f:
+        return f.read()
+
+
+def enviar(archivos):
+    """Envía (nombre, contenido) en una sola petición, con el arranque de la app."""
+    with TestClient(main.app) as cliente:
+        return cliente.post(
+            "/api/inspeccionar/multiple",
+            files=[("files", (nombre, datos, "image/png")) for nombre, datos in archivos],
+        )
+
+
+def test_lote_devuelve_lo_mismo_que_cada_imagen_por_separado(base_vacia, contorno_ideal):
+    archivos = ["molde_rebaba.png", "molde_ok.png", "molde_rebaba.png"]
+
+    respuesta = enviar((nombre, leer(nombre)) for nombre in archivos)
+
+    assert respuesta.status_code == 200
+    datos = respuesta.json()
+    assert datos["total"] == len(archivos)
+
+    for nombre, item in zip(archivos, datos["resultados"]):
+        individual = analisis.analizar_molde(leer(nombre))
+        assert item["archivo"] == nombre
+        assert item["status"] == individual["status"]
+        assert item["max_distancia"] == individual["max_distancia"]
+        assert item["puntos_defectuosos"] == individual["puntos_defectuosos"]
+        assert "id" in item
+
+
+def test_lote_solo_guarda_los_analisis_validos(base_vacia, contorno_ideal):
+    respuesta = enviar([
+        ("molde_ok.png", leer("molde_ok.png")),
+        ("roto.png", b"no es una imagen"),
+        ("molde_rebaba.png", leer("molde_rebaba.png")),
+    ])
+
+    ok, roto, rebaba = respuesta.json()["resultados"]
+    assert roto["status"] == "ERROR"
+    assert "id" not in roto
+
+    guardadas = {i.id: i.resultado for i in crud.listar_inspecciones()}
+    assert guardadas == {ok["id"]: "APROBADO", rebaba["id"]: "RECHAZADO"}
@@ -0,0 +1,42 @@
+# backend/test_lotes.py
+"""
+Pruebas de los lotes (modules/crud_lotes.py) y de /api/lotes: las cuentas
+de inspecciones salen de la base sin cargar las inspecciones.
+"""
+
+from fastapi.testclient import TestClient
+
+import main
+from modules import crud, crud_lotes
+
+CAMPOS_LOTE = {"id", "codigo_lote", "inspector", "estado", "fecha", "total_inspecciones"}
+
+
+def inspeccionar(lote, resultados):
+    for resultado in resultados:
+        inspeccion = crud.guardar_inspeccion(resultado, 0.0, [])
+        crud_lotes.agregar_inspeccion_a_lote(lote.id, inspeccion.id)
+
+
+def test_listar_lotes_cuenta_las_inspecciones(base_vacia):
+    con_tres = crud_lotes.crear_lote("L-1", "pruebas")
+    vacio = crud_lotes.crear_lote("L-2", "pruebas")
+    inspeccionar(con_tres, ["APROBADO", "RECHAZADO", "APROBADO"])
+    # Sin lote: no cuenta en ninguno
+    crud.guardar_inspeccion("APROBADO", 0.0, [])
+
+    totales = {l.id: l.total_inspecciones for l in crud_lotes.listar_lotes()}
+
+    assert totales == {con_tres.id: 3, vacio.id: 0}
+
+
+def test_api_lotes(base_vacia):
+    lote = crud_lotes.crear_lote("L-3", "pruebas")
+    inspeccionar(lote, ["RECHAZADO", "APROBADO"])
+
+    datos = TestClient(main.app).get("/api/lotes").json()
+
+    (item,) = datos["lotes"]
+    assert set(item) == CAMPOS_LOTE
+    assert item["codigo_lote"] == "L-3"
+    assert item["total_inspecciones"] == 2
@@ -0,0 +1,117 @@
+# backend/test_migraciones.py
+"""
+Pruebas de las migraciones versionadas (modules/migraciones.py): cada
+versión se aplica una vez y en orden, junto con su fila en
+schema_version, y una base antigua acaba con las columnas y los índices
+de una recién creada.
+"""
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from modules import migraciones
+from modules.db import Base
+from modules import models  # noqa: F401  (registra las tablas)
+
+
+@pytest.fixture
+def motor(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migraciones.db'}")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def espias(monkeypatch):
+    """Sustituye MIGRACIONES por tres que anotan su versión al aplicarse."""
+    aplicadas = []
+
+    def migracion(version):
+        return version, f"prueba {version}", lambda conn: aplicadas.append(version)
+
+    monkeypatch.setattr(migraciones, "MIGRACIONES", [migracion(v) for v in (1, 2, 3)])
+    return aplicadas
+
+
+def versiones_registradas(engine) -> list:
+    with engine.connect() as conn:
+        return [v for (v,) in conn.execute(text("SELECT version FROM schema_version ORDER BY version"))]
+
+
+# ---------------------------------------------------------
+# Versiones
+# ---------------------------------------------------------
+
+def test_base_nueva_queda_en_la_ultima_version(motor):
+    Base.metadata.create_all(bind=motor)
+
+    assert migraciones.version_esquema(motor) == 0
+    assert migraciones.migrar(motor) == migraciones.MIGRACIONES[-1][0]
+    assert versiones_registradas(motor) == [v for v, _, _ in migraciones.MIGRACIONES]
+
+
+def test_cada_version_una_sola_vez_y_en_orden(motor, espias):
+    assert migraciones.migrar(motor) == 3
+    assert migraciones.migrar(motor) == 3
+
+    assert espias == [1, 2, 3]
+
+
+def test_migrar_hasta_una_version(motor, espias):
+    assert migraciones.migrar(motor, hasta=1) == 1
+    assert migraciones.migrar(motor) == 3
+
+    assert espias == [1, 2, 3]
+    assert versiones_registradas(motor) == [1, 2, 3]
+
+
+def test_version_aplicada_por_otro_proceso_se_omite(motor, espias, monkeypatch):
+    migraciones.migrar(motor, hasta=2)
+    espias.clear()
+    # Otro worker aplicó 1 y 2 después de que este leyera la versión
+    monkeypatch.setattr(migraciones, "version_esquema", lambda engine: 0)
+
+    migraciones.migrar(motor)
+
+    assert espias == [3]
+
+
+def test_migracion_que_falla_no_queda_registrada(motor, monkeypatch):
+    def fallar(conn):
+        conn.execute(text("CREATE TABLE a_medias (id INTEGER)"))
+        raise RuntimeError("migración rota")
+
+    monkeypatch.setattr(migraciones, "MIGRACIONES", [(1, "rota", fallar)])
+
+    with pytest.raises(RuntimeError):
+        migraciones.migrar(motor)
+
+    assert migraciones.version_esquema(motor) == 0
+    assert not inspect(motor).has_table("a_medias")
+
+
+# ---------------------------------------------------------
+# Base antigua
+# ---------------------------------------------------------
+
+def test_base_antigua_recibe_columnas_e_indices(motor):
+    with motor.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE inspecciones (id INTEGER PRIMARY KEY, resultado TEXT, max_distancia REAL, "
+            "puntos_defectuosos TEXT, categoria TEXT, lote_id INTEGER, fecha DATETIME)"
+        ))
+        conn.execute(text("CREATE TABLE lotes (id INTEGER PRIMARY KEY, codigo_lote TEXT, fecha DATETIME)"))
+        conn.execute(text("CREATE TABLE alertas (id INTEGER PRIMARY KEY, tipo_alerta TEXT, fecha DATETIME)"))
+
+    migraciones.migrar(motor)
+
+    inspector = inspect(motor)
+    columnas = {c["name"] for c in inspector.get_columns("inspecciones")}
+    assert set(migraciones.COLUMNAS_DEFECTOS) <= columnas
+
+    indices = {
+        indice["name"]
+        for tabla in ("inspecciones", "lotes", "alertas")
+        for indice in inspector.get_indexes(tabla)
+    }
+    assert set(migraciones.INDICES_CONSULTAS) <= indices
@@ -0,0 +1,217 @@
+# backend/test_paginacion.py
+"""
+Pruebas de la paginación por cursor (keyset sobre fecha, id) de
+crud.listar_pagina y de /api/registros y /api/defectos.
+"""
+
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import text
+
+from conftest import INICIO, sembrar
+from modules import crud
+from modules.db import SessionLocal
+
+
+def sembrar_fechas(fechas, categoria="Excluido") -> list:
+    """Inserta una inspección por fecha y devuelve sus ids, en orden."""
+    return [i.id for i in sembrar({"fecha": fecha, "categoria": categoria} for fecha in fechas)]
+
+
+def recorrer(limite, categoria=None) -> list:
+    """Ids de todas las páginas, siguiendo siguiente_cursor."""
+    ids, cursor, paginas = [], None, 0
+
+    while True:
+        pagina, cursor = crud.listar_pagina(limite, cursor, categoria=categoria)
+        ids.extend(i.id for i in pagina)
+        paginas += 1
+        assert len(pagina) <= limite
+        if cursor is None:
+            return ids
+        assert paginas < 100
+
+
+def orden_esperado(ids, fechas) -> list:
+    return [i for _, i in sorted(zip(fechas, ids), reverse=True)]
+
+
+# ---------------------------------------------------------
+# listar_pagina
+# ---------------------------------------------------------
+
+def test_recorre_todas_las_filas_en_orden(base_vacia):
+    fechas = [INICIO + timedelta(minutes=i) for i in range(25)]
+    ids = sembrar_fechas(fechas)
+
+    assert recorrer(7) == orden_esperado(ids, fechas)
+
+
+def test_fechas_repetidas_no_duplican_ni_pierden_filas(base_vacia):
+    # Varias inspecciones con la misma fecha caen a ambos lados de un corte
+    fechas = [INICIO] * 5 + [INICIO + timedelta(seconds=1)] * 6 + [INICIO - timedelta(seconds=1)] * 4
+    ids = sembrar_fechas(fechas)
+
+    for limite in (1, 2, 3, 4, 5, 7, 15, 16):
+        assert recorrer(limite) == orden_esperado(ids, fechas), limite
+
+
+def test_ultima_pagina_completa_no_devuelve_cursor(base_vacia):
+    sembrar_fechas([INICIO + timedelta(minutes=i) for i in range(14)])
+
+    primera, cursor = crud.listar_pagina(7)
+    segunda, cursor = crud.listar_pagina(7, cursor)
+
+    assert len(primera) == len(segunda) == 7
+    assert cursor is None
+
+
+def test_base_vacia_una_pagina_sin_cursor(base_vacia):
+    assert crud.listar_pagina(10) == ([], None)
+
+
+def test_limite_se_recorta_al_maximo(base_vacia, monkeypatch):
+    monkeypatch.setattr(crud, "LIMITE_PAGINA_MAXIMO", 3)
+    sembrar_fechas([INICIO + timedelta(minutes=i) for i in range(5)])
+
+    pagina, cursor = crud.listar_pagina(1000)
+
+    assert len(pagina) == 3
+    assert cursor is not None
+
+
+def test_filas_nuevas_no_desplazan_las_paginas_siguientes(base_vacia):
+    fechas = [INICIO + timedelta(minutes=i) for i in range(10)]
+    ids = sembrar_fechas(fechas)
+
+    primera, cursor = crud.listar_pagina(4)
+    sembrar_fechas([INICIO + timedelta(hours=1)] * 3)
+    segunda, _ = crud.listar_pagina(4, cursor)
+
+    esperado = orden_esperado(ids, fechas)
+    assert [i.id for i in primera] == esperado[:4]
+    assert [i.id for i in segunda] == esperado[4:8]
+
+
+def test_desde_id_equivale_al_cursor(base_vacia):
+    fechas = [INICIO] * 3 + [INICIO + timedelta(minutes=i) for i in range(6)]
+    sembrar_fechas(fechas)
+
+    primera, cursor = crud.listar_pagina(4)
+    por_cursor, _ = crud.listar_pagina(4, cursor)
+    por_id, _ = crud.listar_pagina(4, desde_id=primera[-1].id)
+
+    assert [i.id for i in por_cursor] == [i.id for i in por_id]
+
+
+def test_desde_id_inexistente(base_vacia):
+    with pytest.raises(ValueError):
+        crud.listar_pagina(10, desde_id=999999)
+
+
+@pytest.mark.parametrize("cursor", ["", "no-es-base64!", "c2luLXNlcGFyYWRvcg", "MjAyNi0wMS0wMXxhYmM"])
+def test_cursor_invalido(base_vacia, cursor):
+    if not cursor:
+        # Cadena vacía = sin cursor: primera página
+        assert crud.listar_pagina(10, cursor) == ([], None)
+        return
+
+    with pytest.raises(ValueError):
+        crud.listar_pagina(10, cursor)
+
+
+def test_cursor_ida_y_vuelta():
+    assert crud.decodificar_cursor(crud.codificar_cursor("2026-01-01 08:00:00", 7)) == ("2026-01-01 08:00:00", 7)
+
+
+def test_fechas_sin_microsegundos_de_func_now(base_vacia):
+    # CURRENT_TIMESTAMP guarda "AAAA-MM-DD HH:MM:SS"; desde Python se
+    # guarda con microsegundos. Empates de ambos tipos en el mismo segundo.
+    sembrar_fechas([INICIO] * 3 + [INICIO + timedelta(seconds=1)] * 2)
+    db = SessionLocal()
+    try:
+        for _ in range(4):
+            db.execute(text(
+                "INSERT INTO inspecciones (resultado, max_distancia, categoria, fecha) "
+                "VALUES ('APROBADO', 0, 'Excluido', :fecha)"
+            ), {"fecha": INICIO.isoformat(" ")})
+        db.commit()
+        esperado = [i for (i,) in db.execute(text("SELECT id FROM inspecciones ORDER BY fecha DESC, id DESC"))]
+    finally:
+        db.close()
+
+    for limite in (1, 2, 3, 4, 8):
+        assert recorrer(limite) == esperado, limite
+
+    primera, _ = crud.listar_pagina(4)
+    resto, _ = crud.listar_pagina(100, desde_id=primera[-1].id)
+    assert [i.id for i in primera + resto] == esperado
+
+
+def test_filtro_por_categoria(base_vacia):
+    fechas = [INICIO + timedelta(minutes=i) for i in range(12)]
+    rebabas = sembrar_fechas(fechas[::2], categoria="Rebaba lateral")
+    sembrar_fechas(fechas[1::2], categoria="Excluido")
+
+    assert recorrer(2, categoria="Rebaba lateral") == orden_esperado(rebabas, fechas[::2])
+
+    pagina, cursor = crud.filtrar_por_categoria("Rebaba lateral", 4)
+    resto, _ = crud.filtrar_por_categoria("Rebaba lateral", 4, cursor)
+    assert [i.id for i in pagina + resto] == orden_esperado(rebabas, fechas[::2])
+
+
+# ---------------------------------------------------------
+# Endpoints
+# ---------------------------------------------------------
+
+def test_registros_sigue_el_cursor(base_vacia, cliente):
+    fechas = [INICIO] * 4 + [INICIO + timedelta(minutes=i) for i in range(9)]
+    ids = sembrar_fechas(fechas)
+
+    vistos, params = [], {"limit": 5, "resumen": True}
+    while True:
+        respuesta = cliente.get("/api/registros", params=params)
+        assert respuesta.status_code == 200
+        datos = respuesta.json()
+        vistos.extend(r["id"] for r in datos["inspecciones"])
+        if datos["siguiente_cursor"] is None:
+            break
+        params["cursor"] = datos["siguiente_cursor"]
+
+    assert vistos == orden_esperado(ids, fechas)
+
+
+def test_registros_sin_paginacion_devuelve_todas(base_vacia, cliente, monkeypatch):
+    monkeypatch.setattr(crud, "LIMITE_PAGINA", 3)
+    fechas = [INICIO + timedelta(minutes=i) for i in range(7)]
+    ids = sembrar_fechas(fechas)
+
+    datos = cliente.get("/api/registros", params={"resumen": True}).json()
+
+    assert set(datos) == {"inspecciones"}
+    assert [r["id"] for r in datos["inspecciones"]] == orden_esperado(ids, fechas)
+
+    completas = cliente.get("/api/inspecciones/completas", params={"resumen": True}).json()
+    assert set(completas) == {"total", "inspecciones"}
+    assert completas["total"] == 7
+
+
+def test_registros_errores_de_paginacion(base_vacia, cliente):
+    assert cliente.get("/api/registros", params={"cursor": "roto"}).status_code == 400
+    assert cliente.get("/api/registros", params={"desde_id": 999999}).status_code == 400
+    assert cliente.get("/api/registros", params={"limit": 0}).status_code == 422
+
+
+def test_defectos_pagina_por_categoria(base_vacia, cliente):
+    fechas = [INICIO + timedelta(minutes=i) for i in range(6)]
+    rebabas = sembrar_fechas(fechas[:3], categoria="Rebaba lateral")
+    sembrar_fechas(fechas[3:], categoria="Excluido")
+
+    datos = cliente.get("/api/defectos", params={"categoria": "Rebaba lateral", "limit": 2}).json()
+    resto = cliente.get(
+        "/api/defectos", params={"categoria": "Rebaba lateral", "limit": 2, "cursor": datos["siguiente_cursor"]}
+    ).json()
+
+    assert [r["id"] for r in datos["inspecciones"] + resto["inspecciones"]] == orden_esperado(rebabas, fechas[:3])
+    assert resto["siguiente_cursor"] is None
@@ -0,0 +1,81 @@
+# backend/test_plantillas.py
+"""
+Pruebas del almacén compartido de plantillas (modules/plantillas.py):
+cuándo se activa y cómo dos registros (dos procesos) ven la misma
+plantilla publicada.
+"""
+
+import numpy as np
+import pytest
+
+from modules import plantillas
+from modules.plantillas import AlmacenCompartido, RegistroPlantillas
+
+
+def cuadrado(lado: int) -> np.ndarray:
+    imagen = np.zeros((100, 100), np.uint8)
+    imagen[10:10 + lado, 10:10 + lado] = 255
+    return imagen
+
+
+# ---------------------------------------------------------
+# Activación
+# ---------------------------------------------------------
+
+@pytest.mark.parametrize("entorno, compartir", [
+    ({}, False),
+    ({"WEB_CONCURRENCY": "1"}, False),
+    ({"WEB_CONCURRENCY": "4"}, True),
+    ({"WEB_CONCURRENCY": "no-es-numero"}, False),
+    ({"EJECUTOR_ANALISIS": "procesos"}, True),
+    ({"PLANTILLAS_COMPARTIDAS": "1"}, True),
+    ({"PLANTILLAS_COMPARTIDAS": "0", "WEB_CONCURRENCY": "4"}, False),
+    ({"PLANTILLAS_COMPARTIDAS": "auto", "WEB_CONCURRENCY": "2"}, True),
+])
+def test_solo_con_varios_procesos_o_a_peticion(monkeypatch, entorno, compartir):
+    for variable in ("PLANTILLAS_COMPARTIDAS", "WEB_CONCURRENCY", "EJECUTOR_ANALISIS"):
+        monkeypatch.delenv(variable, raising=False)
+    for variable, valor in entorno.items():
+        monkeypatch.setenv(variable, valor)
+
+    assert plantillas._compartir_plantillas() is compartir
+
+
+def test_las_pruebas_no_usan_el_almacen():
+    # Un solo proceso y configuración por defecto
+    assert plantillas.registro_plantillas.compartido is None
+
+
+# ---------------------------------------------------------
+# Dos procesos
+# ---------------------------------------------------------
+
+@pytest.fixture
+def dos_registros(tmp_path):
+    almacen = tmp_path / "compartido"
+    return (
+        RegistroPlantillas(str(tmp_path), 4, AlmacenCompartido(str(almacen))),
+        RegistroPlantillas(str(tmp_path), 4, AlmacenCompartido(str(almacen))),
+    )
+
+
+def test_la_publicada_la_ve_el_otro_proceso(dos_registros):
+    publica, lectora = dos_registros
+
+    publicada = publica.registrar("cuadrado", cuadrado(40))
+    adoptada = lectora.obtener("cuadrado")
+
+    assert adoptada.generacion == publicada.generacion > 0
+    np.testing.assert_array_equal(adoptada.mapa_distancia, publicada.mapa_distancia)
+
+
+def test_una_nueva_version_se_adopta_en_el_siguiente_uso(dos_registros):
+    publica, lectora = dos_registros
+    publica.registrar("cuadrado", cuadrado(40))
+    antes = lectora.obtener("cuadrado")
+
+    nueva = publica.registrar("cuadrado", cuadrado(60))
+    despues = lectora.obtener("cuadrado")
+
+    assert despues.generacion == nueva.generacion > antes.generacion
+    assert despues.area == nueva.area != antes.area
@@ -0,0 +1,90 @@
+# backend/test_transmision.py
+"""
+Pruebas de la inspección continua por WebSocket (modules/transmision.py):
+un fotograma que rompe el analizador no cierra la conexión, y si una
+etapa falla las demás no se quedan colgadas.
+"""
+
+import asyncio
+
+import pytest
+
+import main
+from modules import crud, transmision
+from modules.transmision import SesionTransmision
+
+# Tope de espera de las pruebas para que un fallo no las cuelgue
+ESPERA_MAXIMA = 5
+
+
+def analizador(datos: bytes) -> dict:
+    if datos == b"roto":
+        raise ValueError("fotograma ilegible")
+    return {"status": "APROBADO", "max_distancia": 0.0, "puntos_defectuosos": []}
+
+
+def test_fotograma_que_falla_no_cierra_la_conexion(base_vacia, cliente, monkeypatch):
+    monkeypatch.setattr(main, "crear_analizador", lambda *args: analizador)
+
+    with cliente.websocket_connect("/ws/inspeccionar") as ws:
+        for datos in (b"roto", b"bien"):
+            ws.send_bytes(datos)
+        ws.send_text("fin")
+
+        mensajes = []
+        while not mensajes or mensajes[-1]["tipo"] != "fin":
+            mensajes.append(ws.receive_json())
+
+    resultados = [m for m in mensajes if m["tipo"] == "resultado"]
+    assert [(r["secuencia"], r["status"]) for r in resultados] == [(1, "ERROR"), (2, "APROBADO")]
+    assert "fotograma ilegible" in resultados[0]["mensaje"]
+
+    persistido = next(m for m in mensajes if m["tipo"] == "persistido")
+    assert persistido["secuencias"] == [2]
+    assert mensajes[-1] == {"tipo": "fin", "recibidos": 2, "procesados": 2, "descartados": 0}
+    assert len(crud.listar_inspecciones()) == 1
+
+
+class SocketAbierto:
+    """WebSocket falso: entrega un fotograma y luego no vuelve a recibir nada."""
+
+    def __init__(self):
+        self.enviados = []
+        self._mensajes = [{"type": "websocket.receive", "bytes": b"bien"}]
+
+    async def accept(self):
+        pass
+
+    async def receive(self):
+        if self._mensajes:
+            return self._mensajes.pop(0)
+        await asyncio.Event().wait()
+
+    async def send_json(self, mensaje):
+        self.enviados.append(mensaje)
+
+    async def close(self):
+        pass
+
+
+def test_etapa_que_falla_cancela_las_demas(monkeypatch):
+    def fallar(resultados):
+        raise RuntimeError("base de datos caída")
+
+    monkeypatch.setattr(transmision, "guardar_inspecciones", fallar)
+    monkeypatch.setattr(transmision, "LOTE_PERSISTENCIA_WS", 1)
+
+    async def prueba():
+        sesion = SesionTransmision(
+            SocketAbierto(), analizador, "descartar_antiguos", resumen=False, procesar_alerta=dict
+        )
+
+        with pytest.raises(RuntimeError, match="base de datos caída"):
+            await asyncio.wait_for(sesion.ejecutar(), ESPERA_MAXIMA)
+
+        assert transmision._conexiones_activas == 0
+        # Sin cancelarla, la recepción seguiría esperando al cliente
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+        assert [m["tipo"] for m in sesion.websocket.enviados] == ["resultado"]
+
+    asyncio.run(prueba())
@@ -0,0 +1,243 @@
+# backend/test_ventana_defectos.py
+"""
+Pruebas del anillo de veredictos recientes (modules/ventana_defectos.py):
+cuentas por ventana frente a la base, invalidación tras borrar y
+sincronización entre procesos (dos instancias sobre la misma base).
+"""
+
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+
+from conftest import INICIO, sembrar
+from modules import crud
+from modules.alert_service import AlertService, ventana_defectos
+from modules.db import SessionLocal
+from modules.models import Inspeccion
+from modules.ventana_defectos import VentanaDefectos
+
+VENTANAS = [5, 10]
+
+
+def sembrar_veredictos(veredictos, desde: int = 0) -> list:
+    """Inserta una inspección por veredicto (1 = RECHAZADO), con fechas crecientes."""
+    return sembrar(
+        {
+            "resultado": "RECHAZADO" if rechazado else "APROBADO",
+            "fecha": INICIO + timedelta(seconds=desde + i),
+        }
+        for i, rechazado in enumerate(veredictos)
+    )
+
+
+def contar_en_base(n: int) -> tuple:
+    """(total, rechazados) de las últimas n inspecciones, leídas de SQLite."""
+    db = SessionLocal()
+    try:
+        resultados = [
+            r for (r,) in db.query(Inspeccion.resultado)
+            .order_by(Inspeccion.fecha.desc(), Inspeccion.id.desc())
+            .limit(n)
+        ]
+    finally:
+        db.close()
+    return len(resultados), resultados.count("RECHAZADO")
+
+
+def borrar(filas):
+    db = SessionLocal()
+    try:
+        db.query(Inspeccion).filter(Inspeccion.id.in_([f.id for f in filas])).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def patron(n: int, desde: int = 0) -> list:
+    return [int((desde + i) % 3 == 0 or (desde + i) % 7 == 0) for i in range(n)]
+
+
+# ---------------------------------------------------------
+# Cuentas
+# ---------------------------------------------------------
+
+@pytest.mark.parametrize("filas", [0, 3, 10, 27])
+def test_siembra_coincide_con_la_base(base_vacia, filas):
+    sembrar_veredictos(patron(filas))
+    ventana = VentanaDefectos(VENTANAS, sincronizar=False)
+
+    for n in (1, 3, 5, 7, 10):
+        assert ventana.contar(n) == contar_en_base(n), n
+
+
+def test_ventana_mayor_que_la_capacidad(base_vacia):
+    assert VentanaDefectos(VENTANAS, sincronizar=False).contar(11) is None
+
+
+def test_registrar_da_la_vuelta_al_anillo(base_vacia):
+    ventana = VentanaDefectos(VENTANAS, sincronizar=False)
+    ventana.sembrar()
+
+    for inicio in range(0, 40, 4):
+        ventana.registrar(sembrar_veredictos(patron(4, inicio), desde=inicio))
+
+        for n in (2, 5, 9, 10):
+            assert ventana.contar(n) == contar_en_base(n), (inicio, n)
+
+
+def test_registrar_no_cuenta_dos_veces(base_vacia):
+    ventana = VentanaDefectos(VENTANAS, sincronizar=False)
+    filas = sembrar_veredictos([1, 0, 1])
+    ventana.sembrar()
+
+    # Ya estaban en la siembra
+    ventana.registrar(filas)
+
+    assert ventana.contar(10) == (3, 2)
+
+
+# ---------------------------------------------------------
+# Invalidación
+# ---------------------------------------------------------
+
+def test_borrar_invalida_el_anillo(base_vacia):
+    ventana = VentanaDefectos(VENTANAS, sincronizar=False)
+    filas = sembrar_veredictos([1, 1, 0, 1, 0, 0])
+    assert ventana.contar(10) == (6, 3)
+
+    borrar(filas[:2])
+    # Sin invalidar, y sin sincronizar, el anillo no ve el borrado
+    assert ventana.contar(10) == (6, 3)
+
+    ventana.invalidar()
+    assert ventana.contar(10) == contar_en_base(10) == (4, 1)
+
+
+def test_eliminar_inspeccion_invalida_la_ventana_del_servicio(base_vacia):
+    filas = sembrar_veredictos([1, 1, 0, 0])
+    antes = AlertService.calcular_porcentaje_defectos()
+    assert antes["total_rechazados"] == 2
+
+    assert crud.eliminar_inspeccion(filas[0].id)
+
+    despues = AlertService.calcular_porcentaje_defectos()
+    assert (despues["total_inspecciones"], despues["total_rechazados"]) == (3, 1)
+    assert (despues["total_inspecciones"], despues["total_rechazados"]) == contar_en_base(100)
+
+
+def test_guardar_inspeccion_actualiza_la_ventana_del_servicio(base_vacia):
+    ventana_defectos.sembrar()
+
+    crud.guardar_inspeccion("RECHAZADO", 5.0, [[1, 1]])
+    crud.guardar_inspeccion("APROBADO", 0.0, [])
+
+    assert ventana_defectos.contar(100) == (2, 1)
+
+
+# ---------------------------------------------------------
+# Varios procesos sobre la misma base
+# ---------------------------------------------------------
+
+def test_sincronizar_ve_las_escrituras_de_otro_proceso(base_vacia):
+    propia = VentanaDefectos(VENTANAS, sincronizar=True, resiembra_s=3600)
+    otra = VentanaDefectos(VENTANAS, sincronizar=True, resiembra_s=3600)
+    propia.sembrar()
+    otra.sembrar()
+
+    # Escrituras alternas: cada una registra solo las suyas
+    for inicio in range(0, 24, 3):
+        escritora = propia if inicio % 2 else otra
+        escritora.registrar(sembrar_veredictos(patron(3, inicio), desde=inicio))
+
+        for ventana in (propia, otra):
+            ventana.actualizar()
+            for n in (1, 5, 8, 10):
+                assert ventana.contar(n) == contar_en_base(n), (inicio, n)
+
+
+def test_sin_sincronizar_no_ve_las_escrituras_de_otro_proceso(base_vacia):
+    ventana = VentanaDefectos(VENTANAS, sincronizar=False)
+    ventana.sembrar()
+
+    sembrar_veredictos([1, 1, 1])
+    ventana.actualizar()
+
+    assert ventana.contar(10) == (0, 0)
+
+
+def test_resiembra_ve_los_borrados_de_otro_proceso(base_vacia):
+    filas = sembrar_veredictos([1, 0, 1, 1])
+    sin_resiembra = VentanaDefectos(VENTANAS, sincronizar=True, resiembra_s=3600)
+    con_resiembra = VentanaDefectos(VENTANAS, sincronizar=True, resiembra_s=0)
+    assert sin_resiembra.contar(10) == con_resiembra.contar(10) == (4, 3)
+
+    borrar(filas[2:])
+    sin_resiembra.actualizar()
+    con_resiembra.actualizar()
+
+    assert sin_resiembra.contar(10) == (4, 3)
+    assert con_resiembra.contar(10) == contar_en_base(10) == (2, 1)
+
+
+# ---------------------------------------------------------
+# Consultas a SQLite
+# ---------------------------------------------------------
+
+@pytest.fixture
+def sentencias(base_de_datos):
+    """Lista de las sentencias SELECT enviadas a SQLite durante la prueba."""
+    capturadas = []
+
+    def capturar(conn, cursor, sentencia, *args):
+        if sentencia.lstrip().upper().startswith("SELECT"):
+            capturadas.append(sentencia)
+
+    event.listen(base_de_datos, "before_cursor_execute", capturar)
+    yield capturadas
+    event.remove(base_de_datos, "before_cursor_execute", capturar)
+
+
+def test_en_memoria_registrar_y_contar_no_consultan(base_vacia, sentencias):
+    ventana = VentanaDefectos(VENTANAS, sincronizar=False)
+    ventana.sembrar()
+    filas = sembrar_veredictos(patron(12))
+    sentencias.clear()
+
+    ventana.registrar(filas)
+    ventana.actualizar()
+    for n in (1, 5, 7, 10):
+        assert ventana.contar(n) == contar_en_base(n)
+
+    # Solo las de contar_en_base
+    assert len(sentencias) == 4
+
+
+def test_sincronizando_una_comprobacion_por_actualizar(base_vacia, sentencias):
+    ventana = VentanaDefectos(VENTANAS, sincronizar=True, resiembra_s=3600)
+    ventana.sembrar()
+    ventana.registrar(sembrar_veredictos(patron(6)))
+    sentencias.clear()
+
+    ventana.actualizar()
+    for n in VENTANAS:
+        ventana.contar(n)
+
+    # Sin escrituras de otros procesos: solo el max(id)
+    assert len(sentencias) == 1
+    assert "max(" in sentencias[0].lower()
+
+
+def test_sincronizando_un_hueco_se_lee_en_orden(base_vacia):
+    ventana = VentanaDefectos(VENTANAS, sincronizar=True, resiembra_s=3600)
+    ventana.sembrar()
+
+    ajenas = sembrar_veredictos([1, 1])
+    propias = sembrar_veredictos([0, 0], desde=2)
+    # Las de otro proceso tienen ids menores: no se suman en registrar
+    ventana.registrar(propias)
+    assert ventana.contar(10) == (0, 0)
+
+    ventana.actualizar()
+    assert ventana.contar(10) == contar_en_base(10) == (4, 2)
+    assert ajenas[0].id < propias[0].id
@@ -50,16 +50,30 @@ with tab2:
 
     if st.button("📥 Cargar registros"):
         with st.spinner("Obteniendo datos..."):
-            response = requests.get(f"{API_URL}/api/registros")
+            # /api/registros devuelve una página cada vez: se siguen los
+            # cursores hasta la última (siguiente_cursor = null)
+            registros = []
+            params = {"limit": 1000}
+            error = False
+
+            while True:
+                response = requests.get(f"{API_URL}/api/registros", params=params)
+
+                if response.status_code != 200:
+                    error = True
+                    break
 
-            if response.status_code == 200:
                 data = response.json()
-                registros = data.get("inspecciones", [])
+                registros.extend(data.get("inspecciones", []))
 
-                if len(registros) == 0:
-                    st.info("No hay registros aún.")
-                else:
-                    df = pd.DataFrame(registros)
-                    st.dataframe(df, use_container_width=True)
-            else:
+                if not data.get("siguiente_cursor"):
+                    break
+                params["cursor"] = data["siguiente_cursor"]
+
+            if error:
                 st.error("❌ Error al obtener registros desde el backend")
+            elif len(registros) == 0:
+                st.info("No hay registros aún.")
+            else:
+                df = pd.DataFrame(registros)
+                st.dataframe(df, use_container_width=True)